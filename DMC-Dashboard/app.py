@@ -3,6 +3,8 @@ Coffee Shop Sales Dashboard
 A modular, scalable dashboard built with Dash and Dash Mantine Components
 """
 
+import os
+
 import dash
 from dash import Dash, html, dcc, Input, Output, State, callback
 import dash_mantine_components as dmc
@@ -16,6 +18,8 @@ from datetime import datetime, timedelta
 from components.filters import create_filters
 from components.kpi_cards import create_kpi_cards
 from components.charts import (
+    CHART_AGGREGATES,
+    CPU_BOUND_CHARTS,
     create_sales_trend,
     create_category_distribution,
     create_hourly_heatmap,
@@ -39,8 +43,18 @@ from components.charts import (
     create_day_distribution,
     create_temporal_evolution
 )
-from utils.data_loader import load_and_prepare_data
+from utils.data_loader import (
+    build_filter_index,
+    build_kpi_store,
+    build_period_rollup,
+    build_sales_cube,
+    compare_periods,
+    filter_sales,
+    load_and_prepare_data,
+)
 from utils.theme import get_theme
+from coffee_core import AggregationPlan, install_compression
+from coffee_core.parallel import BuilderPool
 
 # Initialize the Dash app
 app = Dash(
@@ -50,9 +64,31 @@ app = Dash(
         "https://fonts.googleapis.com/css2?family=Playfair+Display:wght@400;600;700&family=Space+Mono:wght@400;700&display=swap"
     ]
 )
+# Compress the callback payloads (brotli or gzip) on the underlying Flask server
+install_compression(app.server)
 
 # Load data
 df = load_and_prepare_data('../Data/coffee_shop_sales.csv')
+filter_index = build_filter_index(df)
+sales_cube = build_sales_cube(df)
+# KPI_DISTINCT_ERROR (e.g. 0.02) allows approximate distinct counts in the KPI cards
+kpi_store = build_kpi_store(
+    df, error=float(os.environ['KPI_DISTINCT_ERROR']) if os.environ.get('KPI_DISTINCT_ERROR') else None
+)
+# Sales per (month, category, store) next to the previous month's, for the
+# current vs previous period comparisons
+period_rollup = build_period_rollup(df)
+# Every sum/count the charts need, computed together on each callback
+chart_plan = AggregationPlan(CHART_AGGREGATES)
+# Chart builders: CHART_EXECUTOR is 'serial' (default), 'thread' or 'process'
+# (CPU_BOUND_CHARTS on a process pool). Each builder spends its time building
+# the Plotly figure under the GIL, so threads measure the same as serial and
+# processes pickle the filtered frames on every callback
+chart_pool = BuilderPool(
+    os.environ.get('CHART_EXECUTOR', 'serial'),
+    max_workers=int(os.environ['CHART_WORKERS']) if os.environ.get('CHART_WORKERS') else None,
+    process_builders=CPU_BOUND_CHARTS,
+)
 
 # App layout
 app.layout = dmc.MantineProvider(
@@ -139,7 +175,7 @@ app.layout = dmc.MantineProvider(
                         ),
                         
                         # KPI Cards
-                        html.Div(id="kpi-cards", children=create_kpi_cards(df)),
+                        html.Div(id="kpi-cards", children=create_kpi_cards(kpi_store)),
                         
                         # Charts Grid
                         dmc.Grid(
@@ -239,24 +275,24 @@ app.layout = dmc.MantineProvider(
                                     )
                                 ),
 
-                                # dmc.GridCol(
-                                #     span={"base": 12, "md": 6},
-                                #     children=dmc.Paper(
-                                #         shadow="sm",
-                                #         p="md",
-                                #         withBorder=True,
-                                #         children=html.Div(id="category_comparison")
-                                #     )
-                                # ),
-                                # dmc.GridCol(
-                                #     span={"base": 12, "md": 6},
-                                #     children=dmc.Paper(
-                                #         shadow="sm",
-                                #         p="md",
-                                #         withBorder=True,
-                                #         children=html.Div(id="category_variation")
-                                #     )
-                                # ),
+                                dmc.GridCol(
+                                    span={"base": 12, "md": 6},
+                                    children=dmc.Paper(
+                                        shadow="sm",
+                                        p="md",
+                                        withBorder=True,
+                                        children=html.Div(id="category_comparison")
+                                    )
+                                ),
+                                dmc.GridCol(
+                                    span={"base": 12, "md": 6},
+                                    children=dmc.Paper(
+                                        shadow="sm",
+                                        p="md",
+                                        withBorder=True,
+                                        children=html.Div(id="category_variation")
+                                    )
+                                ),
 
                                 dmc.GridCol(
                                     span={"base": 12, "md": 6},
@@ -361,8 +397,8 @@ app.layout = dmc.MantineProvider(
 
         Output("monthly_trend", "children"),
         Output("daily_sales_bar", "children"),
-        # Output("category_comparison", "children"),
-        # Output("category_variation", "children"),
+        Output("category_comparison", "children"),
+        Output("category_variation", "children"),
         Output("heatmap_with_totals", "children"),
         Output("price_transaction_analysis", "children"),
         Output("category_price_qty_quadrants", "children"),
@@ -384,55 +420,62 @@ app.layout = dmc.MantineProvider(
 def update_dashboard(date_range, months, stores, categories, products):
     """Update all dashboard components based on filters"""
     
-    # Filter data
-    filtered_df = df.copy()
-    
-    if date_range:
-        start_date = pd.to_datetime(date_range[0])
-        end_date = pd.to_datetime(date_range[1])
-        filtered_df = filtered_df[
-            (filtered_df['transaction_date'] >= start_date) &
-            (filtered_df['transaction_date'] <= end_date)
-        ]
-    
-    if months:
-        filtered_df = filtered_df[filtered_df['Month Name'].isin(months)]
-    
-    if stores:
-        filtered_df = filtered_df[filtered_df['store_location'].isin(stores)]
-    
-    if categories:
-        filtered_df = filtered_df[filtered_df['product_category'].isin(categories)]
-    
-    if products:
-        filtered_df = filtered_df[filtered_df['product_detail'].isin(products)]
+    # Filter data (index lookups plus one combined mask, no copy of the base frame)
+    filtered_df = filter_sales(df, date_range, months, stores, categories, products,
+                               index=filter_index)
+    # Same filters on the pre-aggregated cube, then every chart aggregation in one go
+    filtered_cube = filter_sales(sales_cube, date_range, months, stores, categories, products)
+    aggregates = chart_plan.execute(filtered_cube)
+    # KPI cards from the (date, store, category) store; it has no product
+    # dimension, so a product selection falls back to the filtered rows
+    kpi_source = filtered_df if products else filter_sales(
+        kpi_store, date_range, months, stores, categories
+    )
+    # Category sales of the selected months vs as many months before them,
+    # from the monthly rollup instead of re-filtering the rows
+    period_comparison = compare_periods(period_rollup, months, stores, categories)
     
-    # Generate all components with filtered data
-    return (
-        create_kpi_cards(filtered_df),
-        create_sales_trend(filtered_df),
-        create_category_distribution(filtered_df),
-        create_top_products(filtered_df),
-        create_hourly_heatmap(filtered_df),
-        create_store_comparison(filtered_df),
-        create_weekday_analysis(filtered_df),
-
-        create_size_distribution(filtered_df),  # ← NUEVO
+    # Generate all components on the chart pool: sum/count charts read the
+    # planned aggregates, the hourly heatmaps (the cube has no hour) and the
+    # distribution charts need the filtered rows
+    builders = [
+        (create_kpi_cards, kpi_source),
+        (create_sales_trend, aggregates),
+        (create_category_distribution, aggregates),
+        (create_top_products, aggregates),
+        (create_hourly_heatmap, filtered_df),
+        (create_store_comparison, aggregates),
+        (create_weekday_analysis, aggregates),
 
-        create_monthly_trend(filtered_df),
-        create_daily_sales_bar(filtered_df),
-        # create_category_comparison(filtered_df),
-        # create_category_variation(filtered_df),
-        create_heatmap_with_totals(filtered_df),
-        create_price_transaction_analysis(filtered_df),
-        create_category_price_qty_quadrants(filtered_df),
-        create_top_products_detailed(filtered_df),
-        create_time_distribution(filtered_df),
-        create_ticket_distribution(filtered_df),
-        create_day_distribution(filtered_df),
-        create_temporal_evolution(filtered_df)
+        (create_size_distribution, aggregates),  # ← NUEVO
 
+        (create_monthly_trend, aggregates),
+        (create_daily_sales_bar, aggregates),
+        (create_category_comparison, period_comparison),
+        (create_category_variation, period_comparison),
+        (create_heatmap_with_totals, filtered_df),
+        (create_price_transaction_analysis, filtered_df),
+        (create_category_price_qty_quadrants, aggregates),
+        (create_top_products_detailed, aggregates),
+        (create_time_distribution, filtered_df),
+        (create_ticket_distribution, filtered_df),
+        (create_day_distribution, filtered_df),
+        (create_temporal_evolution, filtered_df),
+    ]
+    components, timings = chart_pool.run(
+        [(builder.__name__, builder, data) for builder, data in builders]
     )
+    
+    # Per-builder timings, sent in the Server-Timing header when running
+    # with debug=True (browser dev tools, Network tab); outside a request
+    # (scripts, benchmarks) they are only kept in chart_pool.last_timings
+    try:
+        for name, seconds in timings.items():
+            dash.callback_context.record_timing(name, seconds)
+    except (dash.exceptions.MissingCallbackContextException, LookupError):
+        pass
+    
+    return tuple(components)
 
 if __name__ == '__main__':
     app.run(debug=True, port=8050)
@@ -0,0 +1,219 @@
+"""
+Load-time and callback benchmarks for the dashboard data layer
+
+Usage:
+    python benchmark.py [path/to/coffee_shop_sales.csv] [--repeat N] [--scale N]
+"""
+
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.data_loader import (
+    build_filter_index,
+    build_sales_cube,
+    filter_sales,
+    load_and_prepare_data,
+)
+from coffee_core import AggregationPlan, aggregate, apply_schema, memory_report, prepare_sales
+from coffee_core.cache import clear_cache
+from components.charts import (
+    CHART_AGGREGATES,
+    create_sales_trend,
+    create_category_distribution,
+    create_top_products,
+    create_hourly_heatmap,
+    create_store_comparison,
+    create_weekday_analysis,
+    create_size_distribution,
+    create_monthly_trend,
+    create_daily_sales_bar,
+    create_heatmap_with_totals,
+    create_category_price_qty_quadrants,
+    create_top_products_detailed,
+)
+
+# Builders of update_dashboard that only need sums and counts
+AGGREGATE_CHARTS = [
+    create_sales_trend,
+    create_category_distribution,
+    create_top_products,
+    create_store_comparison,
+    create_weekday_analysis,
+    create_size_distribution,
+    create_monthly_trend,
+    create_daily_sales_bar,
+    create_category_price_qty_quadrants,
+    create_top_products_detailed,
+]
+
+# Sum charts by hour: the cube has no hour, so the callback hands them the
+# filtered rows
+HOURLY_CHARTS = [
+    create_hourly_heatmap,
+    create_heatmap_with_totals,
+]
+# What those charts aggregate from the rows
+HOURLY_AGGREGATES = [
+    (['Day Name', 'Hour'], ['Total_Bill']),
+]
+
+# Filter states replayed against the callback:
+# (date_range, months, stores, categories, products)
+CALLBACK_CASES = [
+    (None, None, None, None, None),
+    (None, ['March', 'April'], ['Astoria'], None, None),
+    (['2023-02-01', '2023-05-15'], None, None, ['Coffee', 'Tea'], None),
+]
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def benchmark_cache(filepath, repeat=3):
+    """
+    Compare a cold load (CSV parse + cache write) against warm cache hits
+
+    The cache is written to a temporary directory so the benchmark never
+    touches the cache used by the running dashboard.
+    """
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        clear_cache(filepath, cache_dir)
+        cold, df = _timed(load_and_prepare_data, filepath, cache_dir=cache_dir)
+        warm = min(
+            _timed(load_and_prepare_data, filepath, cache_dir=cache_dir)[0]
+            for _ in range(repeat)
+        )
+
+    return {
+        'rows': len(df),
+        'cold_seconds': cold,
+        'warm_seconds': warm,
+        'speedup': cold / warm if warm else float('inf'),
+    }
+
+
+def benchmark_memory(filepath):
+    """Deep memory usage of the prepared frame with and without the schema"""
+    before = prepare_sales(pd.read_csv(filepath), compact=False)
+    after = apply_schema(before.copy())
+    return memory_report(before, after)
+
+
+def scale_frame(df, factor):
+    """Replicate the prepared frame `factor` times, keeping ids unique and rows chronological"""
+    if factor <= 1:
+        return df
+    step = int(df['transaction_id'].max()) + 1
+    copies = []
+    for i in range(factor):
+        copy = df.copy()
+        copy['transaction_id'] = copy['transaction_id'].astype('int64') + i * step
+        copies.append(copy)
+    scaled = pd.concat(copies, ignore_index=True)
+    return scaled.sort_values('transaction_datetime', kind='stable').reset_index(drop=True)
+
+
+def benchmark_callback(df, repeat=3):
+    """
+    Latency of the sum/count charts of update_dashboard, before and after
+    the aggregation plan
+
+    Before: every chart groups the filtered rows on its own. After, as in
+    the callback: the rows are filtered through the inverted index, the
+    cube is filtered with the same spec, a single AggregationPlan feeds
+    the sum/count charts and the hourly charts group the filtered rows.
+    Timings cover the aggregation step alone and the full chart build
+    (which includes the Plotly figure construction both paths share).
+    """
+
+    build_seconds, (index, cube) = _timed(lambda: (build_filter_index(df), build_sales_cube(df)))
+    plan = AggregationPlan(CHART_AGGREGATES)
+
+    def aggregate_before(args):
+        rows = filter_sales(df, *args)
+        return rows, [aggregate(rows, by, measures)
+                      for by, measures in CHART_AGGREGATES + HOURLY_AGGREGATES]
+
+    def aggregate_after(args):
+        rows = filter_sales(df, *args, index=index)
+        aggregates = plan.execute(filter_sales(cube, *args))
+        return aggregates, (
+            [aggregate(aggregates, by, measures) for by, measures in CHART_AGGREGATES]
+            + [aggregate(rows, by, measures) for by, measures in HOURLY_AGGREGATES]
+        )
+
+    def charts_before(args):
+        rows = filter_sales(df, *args)
+        for build in AGGREGATE_CHARTS + HOURLY_CHARTS:
+            build(rows)
+
+    def charts_after(args):
+        rows = filter_sales(df, *args, index=index)
+        aggregates = plan.execute(filter_sales(cube, *args))
+        for build in AGGREGATE_CHARTS:
+            build(aggregates)
+        for build in HOURLY_CHARTS:
+            build(rows)
+
+    def best(func, args):
+        return min(_timed(func, args)[0] for _ in range(repeat))
+
+    cases = []
+    for args in CALLBACK_CASES:
+        cases.append({
+            'filters': args,
+            'aggregate_before': best(aggregate_before, args),
+            'aggregate_after': best(aggregate_after, args),
+            'charts_before': best(charts_before, args),
+            'charts_after': best(charts_after, args),
+        })
+
+    return {
+        'rows': len(df),
+        'cube_rows': len(cube),
+        'build_seconds': build_seconds,
+        'cases': cases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('filepath', nargs='?', default='../Data/coffee_shop_sales.csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=int, default=5,
+                        help='replicate the data N times for the callback benchmark')
+    args = parser.parse_args()
+
+    result = benchmark_cache(args.filepath, repeat=args.repeat)
+    print(f"Rows:        {result['rows']:,}")
+    print(f"Cold load:   {result['cold_seconds']:.3f}s (parse + cache write)")
+    print(f"Warm load:   {result['warm_seconds']:.3f}s (best of {args.repeat})")
+    print(f"Speedup:     {result['speedup']:.1f}x")
+
+    report = benchmark_memory(args.filepath)
+    print()
+    print("Memory (deep) before/after dtype schema:")
+    print(report.to_string(float_format=lambda x: f'{x:,.1f}'))
+
+    df = scale_frame(load_and_prepare_data(args.filepath), args.scale)
+    result = benchmark_callback(df, repeat=args.repeat)
+    print()
+    print(f"Callback (sum/count charts), {result['rows']:,} rows x{args.scale}, "
+          f"cube {result['cube_rows']:,} facts, index + cube built in {result['build_seconds']:.3f}s:")
+    for case in result['cases']:
+        print(f"  filters {case['filters']}")
+        for step in ('aggregate', 'charts'):
+            before, after = case[f'{step}_before'], case[f'{step}_after']
+            print(f"    {step:<10} before {before * 1000:8.1f} ms   after {after * 1000:8.1f} ms"
+                  f"   ({before / after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
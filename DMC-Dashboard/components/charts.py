@@ -3,24 +3,55 @@ Chart components for the dashboard
 Each function creates a specific visualization
 """
 
+import os
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 from dash import dcc, html
 import dash_mantine_components as dmc
 from utils.theme import style_chart, CHART_COLORS
+from coffee_core import aggregate, collapse_points, distplot_by_group, encode_typed_arrays
+from coffee_core.serialize import DEFAULT_TYPED_ARRAY_LENGTH
+
+# (group keys, measures) read by the builders below through `aggregate`;
+# the dashboard callback computes them together with an AggregationPlan
+CHART_AGGREGATES = [
+    ('transaction_date', ['Total_Bill', 'transactions']),
+    ('product_category', ['Total_Bill']),
+    ('product_detail', ['Total_Bill']),
+    ('store_location', ['Total_Bill', 'transactions']),
+    ('Day Name', ['Total_Bill', 'transactions']),
+    ('Size', ['Total_Bill']),
+    ('Month Name', ['Total_Bill']),
+    ('Day', ['Total_Bill']),
+    ('product_category', ['unit_price', 'transaction_qty', 'Total_Bill', 'transactions']),
+    ('product_detail', ['Total_Bill', 'transaction_qty', 'transactions']),
+]
+
+# Builders of the row-level charts, the CPU-heavy ones: with
+# CHART_EXECUTOR=process they run on a process pool instead of a thread
+CPU_BOUND_CHARTS = (
+    'create_price_transaction_analysis',
+    'create_time_distribution',
+    'create_ticket_distribution',
+    'create_day_distribution',
+    'create_temporal_evolution',
+)
 
-def create_sales_trend(df):
+# The row-level charts (one point or rug mark per transaction) ship numeric
+# arrays of at least this many values as base64 typed arrays; 0 disables it
+TYPED_ARRAY_THRESHOLD = int(os.environ.get('TYPED_ARRAY_THRESHOLD', DEFAULT_TYPED_ARRAY_LENGTH))
+
+def create_sales_trend(data):
     """
     Create a time series chart showing sales trend over time
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
     # Aggregate by date
-    daily_sales = df.groupby('transaction_date').agg({
-        'Total_Bill': 'sum',
-        'transaction_id': 'count'
-    }).reset_index()
+    daily_sales = aggregate(data, 'transaction_date', ['Total_Bill', 'transactions'])
     
     # Create figure with secondary y-axis
     fig = go.Figure()
@@ -43,7 +74,7 @@ def create_sales_trend(df):
     fig.add_trace(
         go.Scatter(
             x=daily_sales['transaction_date'],
-            y=daily_sales['transaction_id'],
+            y=daily_sales['transactions'],
             name='Transactions',
             mode='lines+markers',
             line=dict(color=CHART_COLORS['secondary'], width=2, dash='dash'),
@@ -80,12 +111,14 @@ def create_sales_trend(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_category_distribution(df):
+def create_category_distribution(data):
     """
     Create a pie chart showing revenue distribution by category
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
-    category_sales = df.groupby('product_category')['Total_Bill'].sum().reset_index()
+    category_sales = aggregate(data, 'product_category')
     category_sales = category_sales.sort_values('Total_Bill', ascending=False)
     
     fig = go.Figure(
@@ -109,13 +142,15 @@ def create_category_distribution(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_hourly_heatmap(df):
+def create_hourly_heatmap(data):
     """
     Create a heatmap showing sales patterns by hour and day of week
+    
+    `data` is the filtered transactions (the SalesCube has no hour)
     """
     
     # Create pivot table
-    heatmap_data = df.groupby(['Day Name', 'Hour'])['Total_Bill'].sum().reset_index()
+    heatmap_data = aggregate(data, ['Day Name', 'Hour'])
     heatmap_pivot = heatmap_data.pivot(index='Hour', columns='Day Name', values='Total_Bill')
     
     # Order days correctly
@@ -149,17 +184,17 @@ def create_hourly_heatmap(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_top_products(df, n=10):
+def create_top_products(data, n=10):
     """
     Create a horizontal bar chart showing top products by revenue
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
     top_products = (
-        df.groupby('product_detail')['Total_Bill']
-        .sum()
-        .sort_values(ascending=True)
+        aggregate(data, 'product_detail')
+        .sort_values('Total_Bill', ascending=True)
         .tail(n)
-        .reset_index()
     )
     
     fig = go.Figure(
@@ -191,18 +226,17 @@ def create_top_products(df, n=10):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_store_comparison(df):
+def create_store_comparison(data):
     """
     Create a bar chart comparing performance across stores
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
-    store_metrics = df.groupby('store_location').agg({
-        'Total_Bill': 'sum',
-        'transaction_id': 'count'
-    }).reset_index()
+    store_metrics = aggregate(data, 'store_location', ['Total_Bill', 'transactions'])
     
     store_metrics['avg_transaction'] = (
-        store_metrics['Total_Bill'] / store_metrics['transaction_id']
+        store_metrics['Total_Bill'] / store_metrics['transactions']
     )
     
     fig = go.Figure()
@@ -228,18 +262,17 @@ def create_store_comparison(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_weekday_analysis(df):
+def create_weekday_analysis(data):
     """
     Create a bar chart showing sales patterns by day of week
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
     # Order days correctly
     day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     
-    weekday_sales = df.groupby('Day Name').agg({
-        'Total_Bill': 'sum',
-        'transaction_id': 'count'
-    }).reset_index()
+    weekday_sales = aggregate(data, 'Day Name', ['Total_Bill', 'transactions'])
     
     # Ensure correct order
     weekday_sales['Day Name'] = pd.Categorical(
@@ -274,12 +307,14 @@ def create_weekday_analysis(df):
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
 
-def create_size_distribution(df):
+def create_size_distribution(data):
     """
     Create a donut chart showing revenue distribution by product size
+
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
 
-    size_sales = df.groupby('Size')['Total_Bill'].sum().reset_index()
+    size_sales = aggregate(data, 'Size')
     size_sales = size_sales.sort_values('Total_Bill', ascending=False)
 
     fig = go.Figure(
@@ -304,15 +339,17 @@ def create_size_distribution(df):
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
 
-def create_monthly_trend(df):
+def create_monthly_trend(data):
     """
     Create monthly trend chart with average line
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
     month_order = ['January', 'February', 'March', 'April', 'May', 'June',
                    'July', 'August', 'September', 'October', 'November', 'December']
     
-    monthly_sales = df.groupby('Month Name')['Total_Bill'].sum().reset_index()
+    monthly_sales = aggregate(data, 'Month Name')
     monthly_sales['Month Name'] = pd.Categorical(
         monthly_sales['Month Name'],
         categories=month_order,
@@ -353,12 +390,14 @@ def create_monthly_trend(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_daily_sales_bar(df, month_name=None):
+def create_daily_sales_bar(data, month_name=None):
     """
     Create daily sales bar chart with average line
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
-    daily = df.groupby('Day')['Total_Bill'].sum().reset_index()
+    daily = aggregate(data, 'Day')
     avg_val = daily['Total_Bill'].mean()
     
     colors = ['#59270E' if val >= avg_val else '#c3a689' for val in daily['Total_Bill']]
@@ -391,12 +430,15 @@ def create_daily_sales_bar(df, month_name=None):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_category_comparison(df_current, df_previous):
+def create_category_comparison(comparison):
     """
     Create comparative bar chart for current vs previous period by category
+    
+    `comparison` is the per-category current and previous sales (see
+    `compare_periods`)
     """
     
-    if df_previous.empty:
+    if comparison.empty:
         return html.Div(
             dmc.Alert(
                 "No previous period data available for comparison",
@@ -405,19 +447,10 @@ def create_category_comparison(df_current, df_previous):
             )
         )
     
-    # Group by category
-    cat_current = df_current.groupby('product_category')['Total_Bill'].sum().reset_index()
-    cat_previous = df_previous.groupby('product_category')['Total_Bill'].sum().reset_index()
-    
-    # Merge
-    df_comp = pd.merge(
-        cat_current, 
-        cat_previous, 
-        on='product_category', 
-        how='outer', 
-        suffixes=('_Current', '_Previous')
-    ).fillna(0)
-    
+    df_comp = comparison.rename(columns={
+        'Total_Bill': 'Total_Bill_Current',
+        'Total_Bill_previous': 'Total_Bill_Previous'
+    })
     df_comp = df_comp.sort_values('Total_Bill_Current', ascending=True)
     
     fig = go.Figure()
@@ -457,12 +490,15 @@ def create_category_comparison(df_current, df_previous):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_category_variation(df_current, df_previous):
+def create_category_variation(comparison):
     """
     Create variation chart showing difference between periods
+    
+    `comparison` is the per-category current and previous sales (see
+    `compare_periods`), with the difference already computed
     """
     
-    if df_previous.empty:
+    if comparison.empty:
         return html.Div(
             dmc.Alert(
                 "No previous period data for comparison",
@@ -471,16 +507,8 @@ def create_category_variation(df_current, df_previous):
             )
         )
     
-    cat_current = df_current.groupby('product_category')['Total_Bill'].sum()
-    cat_previous = df_previous.groupby('product_category')['Total_Bill'].sum()
-    
-    df_diff = pd.DataFrame({
-        'Current': cat_current,
-        'Previous': cat_previous
-    }).fillna(0)
-    
-    df_diff['Difference'] = df_diff['Current'] - df_diff['Previous']
-    df_diff = df_diff.sort_values('Difference', ascending=True).reset_index()
+    df_diff = comparison.rename(columns={'Total_Bill_delta': 'Difference'})
+    df_diff = df_diff.sort_values('Difference', ascending=True).reset_index(drop=True)
     
     colors = ['#59270E' if x > 0 else '#c3a689' for x in df_diff['Difference']]
     
@@ -507,13 +535,15 @@ def create_category_variation(df_current, df_previous):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_heatmap_with_totals(df):
+def create_heatmap_with_totals(data):
     """
     Create enhanced heatmap with row and column totals
+    
+    `data` is the filtered transactions (the SalesCube has no hour)
     """
     
     # Create pivot table
-    heatmap_data = df.groupby(['Day Name', 'Hour'])['Total_Bill'].sum().reset_index()
+    heatmap_data = aggregate(data, ['Day Name', 'Hour'])
     heatmap_pivot = heatmap_data.pivot(index='Hour', columns='Day Name', values='Total_Bill')
     
     # Order days
@@ -558,20 +588,31 @@ def create_heatmap_with_totals(df):
 def create_price_transaction_analysis(df):
     """
     Create scatter plot analyzing price vs transaction quantity
+    
+    Transactions drawn at the same spot (same product, price and quantity)
+    are sent as one point, with the number of transactions in the hover
     """
     
-    fig = px.scatter(
+    points = collapse_points(
         df,
+        ['unit_price', 'transaction_qty', 'product_category', 'product_detail'],
+        measures={'Total_Bill': 'mean'},
+        grid_columns=['unit_price', 'transaction_qty']
+    )
+    
+    fig = px.scatter(
+        points,
         x='unit_price',
         y='transaction_qty',
         size='Total_Bill',
         color='product_category',
-        hover_data=['product_detail'],
+        hover_data=['product_detail', 'transactions'],
         color_discrete_sequence=['#8B4513', '#D4B896', '#C09F76', '#A67C52', '#6F3609'],
         labels={
             'unit_price': 'Unit Price ($)',
             'transaction_qty': 'Quantity',
-            'product_category': 'Category'
+            'product_category': 'Category',
+            'transactions': 'Transactions'
         }
     )
     
@@ -587,18 +628,21 @@ def create_price_transaction_analysis(df):
     
     fig = style_chart(fig, title="Price vs Transaction Quantity Analysis", height=450)
     
-    return dcc.Graph(figure=fig, config={'displayModeBar': False})
+    return dcc.Graph(figure=encode_typed_arrays(fig, TYPED_ARRAY_THRESHOLD), config={'displayModeBar': False})
 
-def create_category_price_qty_quadrants(df):
+def create_category_price_qty_quadrants(data):
     """
     Create quadrant analysis for category pricing and quantity
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
-    category_summary = df.groupby('product_category').agg({
-        'unit_price': 'mean',
-        'transaction_qty': 'sum',
-        'Total_Bill': 'sum'
-    }).reset_index()
+    category_summary = aggregate(
+        data, 'product_category',
+        ['unit_price', 'transaction_qty', 'Total_Bill', 'transactions']
+    )
+    # unit_price comes back summed; turn it into the mean price per line
+    category_summary['unit_price'] = category_summary['unit_price'] / category_summary['transactions']
     
     avg_price = category_summary['unit_price'].mean()
     avg_qty = category_summary['transaction_qty'].mean()
@@ -666,21 +710,17 @@ def create_category_price_qty_quadrants(df):
     
     return dcc.Graph(figure=fig, config={'displayModeBar': False})
 
-def create_top_products_detailed(df, n=15):
+def create_top_products_detailed(data, n=15):
     """
     Create detailed top products bar chart
+    
+    `data` is the filtered transactions, SalesCube or PlannedAggregates
     """
     
     top_products = (
-        df.groupby('product_detail')
-        .agg({
-            'Total_Bill': 'sum',
-            'transaction_qty': 'sum',
-            'transaction_id': 'count'
-        })
+        aggregate(data, 'product_detail', ['Total_Bill', 'transaction_qty', 'transactions'])
         .sort_values('Total_Bill', ascending=True)
         .tail(n)
-        .reset_index()
     )
     
     fig = go.Figure()
@@ -698,7 +738,7 @@ def create_top_products_detailed(df, n=15):
         texttemplate='$%{text:.2s}',
         textposition='outside',
         hovertemplate='<b>%{y}</b><br>Revenue: $%{x:,.2f}<br>Qty: %{customdata[0]}<br>Transactions: %{customdata[1]}<extra></extra>',
-        customdata=top_products[['transaction_qty', 'transaction_id']]
+        customdata=top_products[['transaction_qty', 'transactions']]
     ))
     
     fig.update_layout(
@@ -716,15 +756,12 @@ def create_time_distribution(df):
     Create distribution plot for sales over time
     """
     
-    stores = df['store_location'].unique()
-    hist_data = [df[df['store_location'] == store]['Hour'].tolist() for store in stores]
-    group_labels = list(stores)
-    
-    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:len(stores)]
+    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:df['store_location'].nunique()]
     
-    fig = ff.create_distplot(
-        hist_data,
-        group_labels,
+    fig = distplot_by_group(
+        df,
+        'Hour',
+        'store_location',
         bin_size=1,
         colors=colors,
         show_rug=True,
@@ -739,22 +776,19 @@ def create_time_distribution(df):
     
     fig = style_chart(fig, title="Sales Distribution by Hour (All Stores)", height=450)
     
-    return dcc.Graph(figure=fig, config={'displayModeBar': False})
+    return dcc.Graph(figure=encode_typed_arrays(fig, TYPED_ARRAY_THRESHOLD), config={'displayModeBar': False})
 
 def create_ticket_distribution(df):
     """
     Create distribution plot for ticket amounts by store
     """
     
-    stores = df['store_location'].unique()
-    hist_data = [df[df['store_location'] == loc]['Total_Bill'].dropna().tolist() for loc in stores]
-    group_labels = list(stores)
-    
-    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:len(stores)]
+    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:df['store_location'].nunique()]
     
-    fig = ff.create_distplot(
-        hist_data,
-        group_labels,
+    fig = distplot_by_group(
+        df,
+        'Total_Bill',
+        'store_location',
         bin_size=0.5,
         colors=colors,
         curve_type='kde',
@@ -770,22 +804,19 @@ def create_ticket_distribution(df):
     
     fig = style_chart(fig, title="Ticket Amount Distribution by Store", height=450)
     
-    return dcc.Graph(figure=fig, config={'displayModeBar': False})
+    return dcc.Graph(figure=encode_typed_arrays(fig, TYPED_ARRAY_THRESHOLD), config={'displayModeBar': False})
 
 def create_day_distribution(df):
     """
     Create distribution plot for sales concentration by day of month
     """
     
-    stores = df['store_location'].unique()
-    hist_data = [df[df['store_location'] == store]['Day'].tolist() for store in stores]
-    group_labels = list(stores)
-    
-    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:len(stores)]
+    colors = ['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728', '#9467bd'][:df['store_location'].nunique()]
     
-    fig = ff.create_distplot(
-        hist_data,
-        group_labels,
+    fig = distplot_by_group(
+        df,
+        'Day',
+        'store_location',
         bin_size=1,
         colors=colors,
         show_rug=True
@@ -799,7 +830,7 @@ def create_day_distribution(df):
     
     fig = style_chart(fig, title="Sales Concentration by Day of Month", height=450)
     
-    return dcc.Graph(figure=fig, config={'displayModeBar': False})
+    return dcc.Graph(figure=encode_typed_arrays(fig, TYPED_ARRAY_THRESHOLD), config={'displayModeBar': False})
 
 def create_temporal_evolution(df):
     """
@@ -13,8 +13,8 @@ def create_kpi_cards(df):
     
     Parameters:
     -----------
-    df : pd.DataFrame
-        Filtered dataframe
+    df : pd.DataFrame or KPIStore
+        Filtered dataframe, or the filtered KPI store
         
     Returns:
     --------
@@ -1 +1,8 @@
 # Utils package
+import os
+import sys
+
+# The shared coffee_core package lives at the repository root
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
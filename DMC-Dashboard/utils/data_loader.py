@@ -4,16 +4,31 @@ Data loading and preparation utilities
 
 import pandas as pd
 import numpy as np
-from datetime import datetime
 
-def load_and_prepare_data(filepath):
+# coffee_core is importable through the utils package (see utils/__init__.py)
+from coffee_core import load_sales
+from coffee_core.binning import classify_time_period  # noqa: F401 (documented helper)
+from coffee_core.cube import COUNT_MEASURE, SalesCube, aggregate
+from coffee_core.filters import filter_frame
+from coffee_core.index import InvertedIndex
+from coffee_core.kpi import KPIStore, kpi_totals
+from coffee_core.periods import PeriodRollup
+
+def load_and_prepare_data(filepath, use_cache=True, cache_dir=None):
     """
     Load and prepare the coffee shop sales data
     
+    Thin wrapper over `coffee_core.load_sales`, the preparation path
+    shared with the other dashboards.
+    
     Parameters:
     -----------
     filepath : str
         Path to the CSV file
+    use_cache : bool, optional
+        Reuse (and refresh) the columnar cache of the prepared frame
+    cache_dir : str, optional
+        Cache directory, defaults to a `.cache` folder next to the CSV
         
     Returns:
     --------
@@ -21,116 +36,167 @@ def load_and_prepare_data(filepath):
         Prepared dataframe with proper dtypes and calculated fields
     """
     
-    # Read the CSV
-    df = pd.read_csv(filepath)
-    
-    # Convert date columns
-    # Handle both date formats in the data
-    df['transaction_date'] = pd.to_datetime(
-        df['transaction_date'], 
-        format='mixed',
-        dayfirst=True
-    )
+    return load_sales(filepath, use_cache=use_cache, cache_dir=cache_dir)
 
-    df['Day'] = df['transaction_date'].dt.day
+def filter_sales(df, date_range=None, months=None, stores=None, categories=None, products=None,
+                 index=None):
+    """
+    Apply the dashboard filters with a single combined mask
     
-    # Convert time to datetime for easier manipulation
-    df['transaction_time'] = pd.to_datetime(
-        df['transaction_time'], 
-        format='%H:%M:%S'
-    ).dt.time
+    Parameters:
+    -----------
+    df : pd.DataFrame, SalesCube or KPIStore
+        Prepared dataframe, or the sales cube or KPI store (filtered on
+        their aggregates; the KPI store has no product dimension)
+    date_range : list, optional
+        [start, end] dates, both inclusive
+    months, stores, categories, products : list, optional
+        Selected values; None or empty means no restriction
+    index : InvertedIndex, optional
+        Index of `df` (see `build_filter_index`) that turns the
+        multi-select filters into row-id lookups
+        
+    Returns:
+    --------
+    pd.DataFrame, SalesCube or KPIStore
+        Filtered rows (the base frame itself when nothing is filtered out)
+    """
     
-    # Create datetime column combining date and time
-    df['transaction_datetime'] = pd.to_datetime(
-        df['transaction_date'].astype(str) + ' ' + df['transaction_time'].astype(str)
-    )
+    ranges = {}
+    if date_range:
+        ranges['transaction_date'] = (
+            pd.to_datetime(date_range[0]) if date_range[0] else None,
+            pd.to_datetime(date_range[1]) if date_range[1] else None,
+        )
     
-    # Ensure numeric columns are proper type
-    numeric_cols = ['transaction_qty', 'unit_price', 'Total_Bill', 'Hour', 'Month', 'Day of Week']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    filters = {
+        'Month Name': months,
+        'store_location': stores,
+        'product_category': categories,
+        'product_detail': products,
+    }
     
-    # Add calculated fields
-    df['revenue'] = df['transaction_qty'] * df['unit_price']
+    if isinstance(df, (SalesCube, KPIStore)):
+        return df.filter(filters, ranges)
+    return filter_frame(df, filters, ranges, index=index)
+
+def build_filter_index(df):
+    """Build the inverted index of the month, store, category and product columns once at startup"""
+    return InvertedIndex(df)
+
+def build_sales_cube(df):
+    """Roll the transactions up into the (date, store, product) cube once at startup"""
+    return SalesCube.from_transactions(df)
+
+def build_kpi_store(df, error=None):
+    """
+    Aggregate the KPI sums and distinct counts per (date, store, category) once at startup
     
-    # Add time-based features
-    df['week'] = df['transaction_date'].dt.isocalendar().week
-    df['quarter'] = df['transaction_date'].dt.quarter
-    df['is_weekend'] = df['Day of Week'].isin([5, 6])  # Saturday=5, Sunday=6
+    `error` bounds the relative error of the distinct counts allowed to be
+    estimated with HyperLogLog when that is cheaper than counting them
+    exactly; None keeps them exact.
+    """
+    return KPIStore.from_transactions(df, error=error)
+
+def build_period_rollup(df):
+    """Aggregate the sales per (month, category, store), next to the previous month's, once at startup"""
+    return PeriodRollup.from_transactions(df)
+
+def compare_periods(rollup, months=None, stores=None, categories=None):
+    """
+    Category sales of the selected months against the same number of months before them
     
-    # Add time period classification
-    df['time_period'] = df['Hour'].apply(classify_time_period)
+    Parameters:
+    -----------
+    rollup : PeriodRollup
+        See `build_period_rollup`
+    months : list, optional
+        Selected month names; the current period spans from the first to
+        the last of them. None or empty compares the last month of the data
+        with the one before it
+    stores, categories : list, optional
+        Selected values; None or empty means no restriction
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per category with Total_Bill, Total_Bill_previous and
+        Total_Bill_delta (see `PeriodRollup.compare`); empty when there is
+        no earlier period to compare with. The date range and product
+        filters do not apply, the rollup is monthly and per category
+    """
     
-    # Sort by date
-    df = df.sort_values('transaction_datetime')
+    periods = [rollup.period_of(m) for m in months or []]
+    periods = [p for p in periods if p is not None] or rollup.periods[-1:]
+    if not periods:
+        return rollup.compare(None)
     
-    return df
-
-def classify_time_period(hour):
-    """Classify hour into time periods"""
-    if 6 <= hour < 11:
-        return 'Morning'
-    elif 11 <= hour < 14:
-        return 'Lunch'
-    elif 14 <= hour < 17:
-        return 'Afternoon'
-    elif 17 <= hour < 20:
-        return 'Evening'
-    else:
-        return 'Night'
+    first, last = min(periods), max(periods)
+    filters = {'store_location': stores, 'product_category': categories}
+    return rollup.compare(last, months=(last - first).n + 1, filters=filters)
 
 def get_date_range(df):
     """Get the min and max dates from the dataframe"""
     return df['transaction_date'].min(), df['transaction_date'].max()
 
-def calculate_metrics(df):
+def calculate_metrics(source):
     """
-    Calculate key business metrics from the dataframe
+    Calculate key business metrics from the dataframe or the KPI store
     
     Parameters:
     -----------
-    df : pd.DataFrame
-        Filtered dataframe
+    source : pd.DataFrame or KPIStore
+        Filtered dataframe, or the KPI store filtered the same way (see
+        `filter_sales`), which answers in O(groups) instead of O(rows);
+        both give the same metrics
         
     Returns:
     --------
     dict
-        Dictionary containing calculated metrics
+        Dictionary containing calculated metrics. `revenue_growth` and
+        `transaction_growth` compare, in percent, the later half of the
+        days with sales in the selection with the earlier half (with an
+        odd number of days the middle one is left out); 0 with 30
+        transactions or fewer
     """
     
+    totals = kpi_totals(source)
+    n_rows = totals[COUNT_MEASURE]
     metrics = {
-        'total_revenue': df['Total_Bill'].sum(),
-        'total_transactions': len(df),
-        'total_quantity': df['transaction_qty'].sum(),
-        'avg_transaction': df['Total_Bill'].mean(),
-        'avg_items_per_transaction': df['transaction_qty'].mean(),
-        'unique_products': df['product_detail'].nunique(),
-        'unique_customers': len(df),  # Each transaction as a customer visit
+        'total_revenue': totals['Total_Bill'],
+        'total_transactions': n_rows,
+        'total_quantity': totals['transaction_qty'],
+        'avg_transaction': totals['Total_Bill'] / n_rows if n_rows else np.nan,
+        'avg_items_per_transaction': totals['transaction_qty'] / n_rows if n_rows else np.nan,
+        'unique_products': totals['distinct_products'],
+        'unique_customers': n_rows,  # Each transaction as a customer visit
     }
     
-    # Calculate growth rates if enough data
-    if len(df) > 30:
-        df_sorted = df.sort_values('transaction_date')
-        recent = df_sorted.tail(len(df_sorted)//2)
-        previous = df_sorted.head(len(df_sorted)//2)
+    # Calculate growth rates if enough data: the later half of the days with
+    # sales in the selection against the earlier half (the middle day of an
+    # odd count is in neither), from the daily totals
+    if n_rows > 30:
+        daily = aggregate(source, 'transaction_date', ['Total_Bill', COUNT_MEASURE])
+        half = len(daily) // 2
+        previous = daily.iloc[:half].sum(numeric_only=True)
+        recent = daily.iloc[len(daily) - half:].sum(numeric_only=True)
         
-        metrics['revenue_growth'] = (
-            (recent['Total_Bill'].sum() - previous['Total_Bill'].sum()) / 
-            previous['Total_Bill'].sum() * 100
-        )
-        metrics['transaction_growth'] = (
-            (len(recent) - len(previous)) / len(previous) * 100
-        )
+        metrics['revenue_growth'] = _growth(recent['Total_Bill'], previous['Total_Bill'])
+        metrics['transaction_growth'] = _growth(recent[COUNT_MEASURE], previous[COUNT_MEASURE])
     else:
         metrics['revenue_growth'] = 0
         metrics['transaction_growth'] = 0
     
     return metrics
 
+def _growth(recent, previous):
+    """Percentage change from `previous` to `recent`; 0 without a previous value"""
+    return (recent - previous) / previous * 100 if previous else 0
+
 def get_top_products(df, n=10):
     """Get top N products by revenue"""
     return (
-        df.groupby('product_detail')
+        df.groupby('product_detail', observed=True)
         .agg({
             'Total_Bill': 'sum',
             'transaction_qty': 'sum',
@@ -144,7 +210,7 @@ def get_top_products(df, n=10):
 def get_category_summary(df):
     """Get summary statistics by category"""
     return (
-        df.groupby('product_category')
+        df.groupby('product_category', observed=True)
         .agg({
             'Total_Bill': 'sum',
             'transaction_qty': 'sum',
@@ -6,6 +6,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import os
+import sys
+
+# El paquete compartido coffee_core vive en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from coffee_core import filter_frame, global_aggregates, load_sales
 
 # --- CARGA Y PROCESAMIENTO DE DATOS ---
 def load_data():
@@ -19,15 +24,12 @@ def load_data():
         df = pd.DataFrame() 
         return df
 
-    df = pd.read_csv(file_path)
-    df['transaction_date'] = pd.to_datetime(df['transaction_date'], dayfirst=True)
-    df['Month_Name'] = df['transaction_date'].dt.month_name()
-    df['Day'] = df['transaction_date'].dt.day
-    df['Day Name'] = df['transaction_date'].dt.day_name()
-    df['Total_Bill'] = df['unit_price'] * df['transaction_qty']
-    return df
+    # Preparación, tipos y caché compartidos con el resto de dashboards
+    return load_sales(file_path)
 
 df_master = load_data()
+# Agregados sobre todo el dataset (no dependen del mes): se calculan una sola vez
+agregados_globales = global_aggregates(df_master) if not df_master.empty else None
 meses_lista = ["January", "February", "March", "April", "May", "June"]
 
 # --- APP INITIALIZATION ---
@@ -88,10 +90,10 @@ app.layout = html.Div([dcc.Location(id="url"), sidebar, content])
 @app.callback(Output("page-content", "children"), 
               [Input("url", "pathname"), Input("month-filter", "value")])
 def render_page_content(pathname, mes_seleccionado):
-    # Filtrado de datos
-    df = df_master.copy()
+    # Filtrado de datos (sin copiar df_master)
+    df = df_master
     if mes_seleccionado != "Todas":
-        df = df[df['Month_Name'] == mes_seleccionado]
+        df = filter_frame(df_master, {'Month Name': mes_seleccionado})
 
     if pathname == "/":
         return layout_overview(df)
@@ -100,7 +102,7 @@ def render_page_content(pathname, mes_seleccionado):
     elif pathname == "/behavior":
         return layout_behavior(df)
     elif pathname == "/advanced":
-        return layout_advanced(df_master)
+        return layout_advanced(agregados_globales)
     return html.Div([html.H1("404: Not found")], className="p-3")
 
 # --- FUNCIONES DE LAYOUT (EQUIVALENTES A TUS FUNCIONES EN STREAMLIT) ---
@@ -118,7 +120,7 @@ def create_kpi_cards(df_filtered):
 
 def layout_overview(df):
     # Gráfico de Categorías
-    cat_data = df.groupby('product_category')['Total_Bill'].sum().sort_values(ascending=True).reset_index()
+    cat_data = df.groupby('product_category', observed=True)['Total_Bill'].sum().sort_values(ascending=True).reset_index()
     fig_cat = px.bar(cat_data, x='Total_Bill', y='product_category', orientation='h', 
                      color_discrete_sequence=['#6f4e37'], template="simple_white")
 
@@ -136,7 +138,7 @@ def layout_overview(df):
         html.Hr(),
         html.H3("Resumen de Categorías"),
         dash_table.DataTable(
-            data=df.groupby('product_category')['Total_Bill'].sum().reset_index().to_dict('records'),
+            data=df.groupby('product_category', observed=True)['Total_Bill'].sum().reset_index().to_dict('records'),
             columns=[{"name": i, "id": i} for i in ['product_category', 'Total_Bill']],
             style_table={'overflowX': 'auto'},
             style_cell={'textAlign': 'left', 'padding': '10px'},
@@ -161,7 +163,7 @@ def layout_monthly(df, mes):
 def layout_behavior(df):
     # Heatmap simplificado
     orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    pivot = df.pivot_table(index='Hour', columns='Day Name', values='Total_Bill', aggfunc='sum').reindex(columns=orden_dias).fillna(0)
+    pivot = df.pivot_table(index='Hour', columns='Day Name', values='Total_Bill', aggfunc='sum', observed=True).reindex(columns=orden_dias).fillna(0)
     fig_heat = px.imshow(pivot, color_continuous_scale=[[0, '#fdf5e6'], [1, '#59270E']])
     
     return html.Div([
@@ -171,9 +173,9 @@ def layout_behavior(df):
         # Aquí podrías añadir el gráfico de burbujas que tienes en Streamlit
     ])
 
-def layout_advanced(df_full):
-    # Gráfico de áreas temporal
-    df_temporal = df_full.groupby(['transaction_date', 'store_location'])['Total_Bill'].sum().reset_index()
+def layout_advanced(agregados):
+    # Gráfico de áreas temporal, sobre el total diario por tienda precalculado
+    df_temporal = agregados['daily_by_store']
     fig_area = px.area(df_temporal, x="transaction_date", y="Total_Bill", color="store_location",
                        color_discrete_sequence=['#3d2b1f', '#6f4e37', '#c3a689'], template="simple_white")
     
@@ -10,6 +10,11 @@ import plotly.express as px
 import pandas as pd
 from datetime import datetime
 import os
+import sys
+
+# El paquete compartido coffee_core vive en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from coffee_core import filter_frame, get_dataset
 
 # Configuración de la aplicación
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
@@ -19,10 +24,11 @@ app.title = "Coffee Shop Dashboard"
 # FUNCIONES DE CARGA Y PROCESAMIENTO DE DATOS
 # ============================================================================
 
-def load_data():
-    """Carga los datos desde el archivo CSV en la carpeta Data"""
-    # Intentar cargar desde diferentes rutas posibles
-    
+# Conjunto de datos residente en memoria, compartido por todos los callbacks
+dataset = None
+
+def find_data_path():
+    """Busca el archivo de datos en las rutas posibles"""
     possible_paths = [
         'Data/coffee_shop_sales.csv',
         './Data/sample_data.txt',
@@ -30,21 +36,25 @@ def load_data():
         'sample_data.txt'
     ]
     
-    df = None
     for path in possible_paths:
         if os.path.exists(path):
-            #df = pd.read_csv(path, sep='\t')
-            df = pd.read_csv(path)
-            print(f"✓ Datos cargados desde: {path}")
-            break
-    
-    if df is None:
-        raise FileNotFoundError("No se encontró el archivo de datos en ninguna de las rutas esperadas")
+            return path
     
-    # Limpiar nombres de columnas
-    df.columns = df.columns.str.strip()
-    
-    return df
+    raise FileNotFoundError("No se encontró el archivo de datos en ninguna de las rutas esperadas")
+
+def load_data():
+    """Devuelve los datos ya cargados en memoria.
+    
+    El CSV se lee una sola vez por proceso; después solo se vuelve a leer
+    si el archivo cambia en disco (se comprueba como mucho cada pocos segundos).
+    Si solo se le añadieron filas al final, se leen únicamente las nuevas.
+    """
+    global dataset
+    if dataset is None:
+        path = find_data_path()
+        dataset = get_dataset(path, incremental=True)
+        print(f"✓ Datos cargados desde: {path}")
+    return dataset.frame
 
 def calculate_metrics(df):
     """Calcula las métricas principales del dashboard"""
@@ -66,7 +76,7 @@ def get_sales_by_hour(df):
 def get_sales_by_day(df):
     """Agrupa ventas por día de la semana"""
     days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    sales_by_day = df.groupby('Day Name')['Total_Bill'].sum().reset_index()
+    sales_by_day = df.groupby('Day Name', observed=True)['Total_Bill'].sum().reset_index()
     sales_by_day.columns = ['Day', 'Total']
     # Ordenar por el orden correcto de días
     sales_by_day['Day'] = pd.Categorical(sales_by_day['Day'], categories=days_order, ordered=True)
@@ -75,21 +85,21 @@ def get_sales_by_day(df):
 
 def get_sales_by_category(df):
     """Agrupa ventas por categoría de producto"""
-    sales_by_category = df.groupby('product_category')['Total_Bill'].sum().reset_index()
+    sales_by_category = df.groupby('product_category', observed=True)['Total_Bill'].sum().reset_index()
     sales_by_category.columns = ['Category', 'Total']
     return sales_by_category
 
 def get_sales_by_location(df):
     """Agrupa ventas por ubicación de tienda"""
-    sales_by_location = df.groupby('store_location')['Total_Bill'].sum().reset_index()
+    sales_by_location = df.groupby('store_location', observed=True)['Total_Bill'].sum().reset_index()
     sales_by_location.columns = ['Location', 'Total']
     sales_by_location = sales_by_location.sort_values('Total', ascending=False)
     return sales_by_location
 
 def get_top_products(df, top_n=10):
     """Obtiene los productos más vendidos"""
-    df['Product'] = df['product_type'] + ' - ' + df['product_detail']
-    top_products = df.groupby('Product').agg({
+    product = (df['product_type'].astype(str) + ' - ' + df['product_detail'].astype(str)).rename('Product')
+    top_products = df.groupby(product).agg({
         'transaction_qty': 'sum',
         'Total_Bill': 'sum'
     }).reset_index()
@@ -99,20 +109,11 @@ def get_top_products(df, top_n=10):
 
 def get_sales_trend(df):
     """Obtiene la tendencia de ventas por fecha"""
+    # transaction_date ya llega como fecha desde el loader compartido
+    # (coffee_core.dates), así que no hay que volver a convertirla; groupby
+    # descarta las fechas vacías y ordena cronológicamente
     sales_trend = df.groupby('transaction_date')['Total_Bill'].sum().reset_index()
     sales_trend.columns = ['Date', 'Total']
-    
-    # Convertir fechas
-    try:
-        sales_trend['Date'] = pd.to_datetime(sales_trend['Date'], format='%d/%m/%Y', errors='coerce')
-    except:
-        try:
-            sales_trend['Date'] = pd.to_datetime(sales_trend['Date'], format='%d-%m-%Y', errors='coerce')
-        except:
-            sales_trend['Date'] = pd.to_datetime(sales_trend['Date'], dayfirst=True, errors='coerce')
-    
-    sales_trend = sales_trend.dropna(subset=['Date'])
-    sales_trend = sales_trend.sort_values('Date')
     return sales_trend
 
 # ============================================================================
@@ -455,15 +456,14 @@ def create_kpi_card(id, icon, title, value, change, color):
 def update_dashboard(selected_location, selected_month):
     """Actualiza todos los componentes del dashboard basado en los filtros"""
     
-    # Cargar datos
+    # Datos residentes en memoria (sin releer el CSV en cada callback)
     df = load_data()
     
-    # Aplicar filtros
-    filtered_df = df.copy()
-    if selected_location != 'Todas':
-        filtered_df = filtered_df[filtered_df['store_location'] == selected_location]
-    if selected_month != 'Todos':
-        filtered_df = filtered_df[filtered_df['Month Name'] == selected_month]
+    # Aplicar filtros con el índice invertido del dataset (sin copiar df)
+    filtered_df = filter_frame(df, {
+        'store_location': None if selected_location == 'Todas' else selected_location,
+        'Month Name': None if selected_month == 'Todos' else selected_month,
+    }, index=dataset.index)
     
     # Calcular métricas
     metrics = calculate_metrics(filtered_df)
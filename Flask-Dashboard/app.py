@@ -1,56 +1,154 @@
 from flask import Flask, render_template, request, jsonify
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 import os
-import json
-import plotly
+import sys
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# El paquete compartido coffee_core vive en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from coffee_core import (
+    LRUCache, aggregate, figure_to_json, filter_frame, get_dataset, global_aggregates,
+    install_compression, kpi_totals
+)
+from plotly.offline import get_plotlyjs_version
 
 app = Flask(__name__)
+# Respuestas HTML comprimidas con brotli o gzip según el navegador
+install_compression(app)
+
+@app.context_processor
+def plotlyjs_url():
+    # plotly.js de la misma versión que plotly.py (decodifica los typed arrays)
+    return {'plotlyjs_url': f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"}
 
 # --- CARGA DE DATOS ---
-def load_data():
-    base_path = os.path.dirname(__file__)
-    file_path = os.path.join(base_path, "data", "coffee_shop_sales.csv")
-    df = pd.read_csv(file_path)
-
-    df['transaction_date'] = pd.to_datetime(df['transaction_date'], dayfirst=True)
-    df['Month_Name'] = df['transaction_date'].dt.month_name()
-    df['Day'] = df['transaction_date'].dt.day
-    df['Day_Name'] = df['transaction_date'].dt.day_name()
-    df['Total_Bill'] = df['unit_price'] * df['transaction_qty']
-    
-    return df
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "coffee_shop_sales.csv")
+
+# Error relativo admitido en los conteos distintos de los KPIs (p. ej. 0.02):
+# si calcularlos exactos cuesta más que un HyperLogLog por grupo, se estiman
+# con él; vacío los mantiene siempre exactos
+KPI_DISTINCT_ERROR = float(os.environ['KPI_DISTINCT_ERROR']) if os.environ.get('KPI_DISTINCT_ERROR') else None
+
+# Filas leídas y preparadas por bloque en las cargas completas del CSV (p. ej.
+# 100000), para acotar la memoria en máquinas pequeñas; vacío lo lee entero
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', 0)) or None
+
+# Dataset residente (preparación, tipos y caché compartidos con el resto de
+# dashboards); si al CSV solo se le añaden filas, se leen únicamente las
+# nuevas y se agregan al DataFrame, al índice, al cubo, a los KPIs y al
+# resumen mensual sin recargar todo
+dataset = get_dataset(DATA_PATH, incremental=True, kpi_error=KPI_DISTINCT_ERROR,
+                      chunksize=CSV_CHUNK_SIZE)
+
+# Serializador de figuras: 'auto' (orjson si está instalado), 'orjson' o 'json'
+FIGURE_JSON_ENGINE = os.environ.get('FIGURE_JSON_ENGINE', 'auto')
+# Arrays numéricos con al menos estos puntos se envían como typed arrays
+# base64 de plotly.js (0 los desactiva)
+TYPED_ARRAY_THRESHOLD = int(os.environ.get('TYPED_ARRAY_THRESHOLD', 1000))
+
+# Caché LRU de las vistas renderizadas, por (ruta, mes, versión del dataset)
+VIEW_CACHE_SIZE = int(os.environ.get('VIEW_CACHE_SIZE', 64))
+cache_vistas = LRUCache(VIEW_CACHE_SIZE)
+
+# Precalentamiento de la caché al arrancar (PREWARM=0 lo desactiva) con
+# PREWARM_WORKERS procesos (por defecto, uno por CPU)
+PREWARM = os.environ.get('PREWARM', '1') != '0'
+PREWARM_WORKERS = int(os.environ.get('PREWARM_WORKERS', 0)) or None
+
+_datos = {'version': None, 'df': None, 'cubo': None, 'kpis': None, 'periodos': None, 'globales': None}
+_datos_lock = threading.Lock()
+
+def get_datos():
+    # DataFrame, cubo pre-agregado (fecha, tienda, producto), KPIs por
+    # (fecha, tienda, categoría), resumen (mes, categoría, tienda) con el mes
+    # anterior y versión siempre consistentes entre sí; el dataset los
+    # mantiene al día
+    df, cubo, kpis, periodos, version = dataset.snapshot(cube=True, kpis=True, periods=True)
+    with _datos_lock:
+        if _datos['version'] != version:
+            # Datos nuevos: se recalculan los agregados globales, que no
+            # dependen del mes, y se descartan las vistas de la versión anterior
+            _datos.update(version=version, df=df, cubo=cubo, kpis=kpis, periodos=periodos,
+                          globales=global_aggregates(cubo))
+            cache_vistas.clear()
+        return (_datos['df'], _datos['cubo'], _datos['kpis'], _datos['periodos'],
+                _datos['globales'], version)
 
 # Cargar datos al inicio
-df = load_data()
+get_datos()
+
+# Endpoints de las vistas cacheadas, los que se precalientan
+vistas_cacheadas = []
+
+def vista_cacheada(mes_por_defecto):
+    # La vista solo depende del mes y de los datos: se renderiza una vez por
+    # (ruta, mes, versión) y las visitas siguientes se sirven desde memoria
+    def decorador(vista):
+        vistas_cacheadas.append(vista.__name__)
+        @functools.wraps(vista)
+        def envoltura():
+            month = request.args.get('month', mes_por_defecto)
+            df, cubo, kpis, periodos, globales, version = get_datos()
+            clave = (request.endpoint, month, version)
+            return cache_vistas.get_or_compute(
+                clave, lambda: vista(month, df, cubo, kpis, periodos, globales)
+            )
+        return envoltura
+    return decorador
 
 # --- FUNCIONES AUXILIARES ---
-def get_filtered_data(month_name=None):
+def get_filtered_data(df, month_name=None):
+    # Sin copia: los gráficos solo leen el DataFrame filtrado
+    if month_name and month_name != "Todas":
+        return filter_frame(df, {'Month Name': month_name})
+    return df
+
+def get_filtered_cube(cubo, month_name=None):
+    if month_name and month_name != "Todas":
+        return cubo.filter({'Month Name': month_name})
+    return cubo
+
+def get_filtered_kpis(kpis, month_name=None):
     if month_name and month_name != "Todas":
-        return df[df['Month_Name'] == month_name].copy()
-    return df.copy()
+        return kpis.filter({'Month Name': month_name})
+    return kpis
 
-def get_previous_month_data(month_name):
-    meses_lista = ["January", "February", "March", "April", "May", "June"]
-    if month_name in meses_lista:
-        idx = meses_lista.index(month_name)
-        if idx > 0:
-            return df[df['Month_Name'] == meses_lista[idx-1]].copy()
-    return pd.DataFrame()
+def get_meses(periodos, todas=True):
+    # Meses con ventas en orden de calendario, sin suponer enero-junio
+    return (["Todas"] if todas else []) + periodos.month_names()
+
+def get_previous_month(periodos, month_name):
+    # Mes de calendario anterior, si tuvo ventas (None para el primero)
+    return periodos.previous_month(month_name)
+
+def get_comparativa_mes_anterior(periodos, month_name):
+    # Ventas por categoría del mes y del anterior, desde el resumen mensual
+    # (vacío si no hay mes anterior)
+    return periodos.compare(month_name, by='product_category')
+
+def get_previous_month_kpis(kpis, periodos, month_name):
+    mes_anterior = get_previous_month(periodos, month_name)
+    return kpis.filter({'Month Name': mes_anterior}) if mes_anterior else None
 
 def calc_delta(act, ant):
     return ((act - ant) / ant) * 100 if ant is not None and ant > 0 else None
 
-def get_kpi_metrics(df_filtered, df_ant=None):
-    v_act = df_filtered['Total_Bill'].sum()
-    q_act = df_filtered['transaction_qty'].sum()
-    t_act = df_filtered['transaction_id'].nunique()
+def get_kpi_metrics(kpis_filtered, kpis_ant=None):
+    # Totales desde el almacén de KPIs (o desde filas): O(grupos), no O(filas)
+    act = kpi_totals(kpis_filtered)
+    v_act = act['Total_Bill']
+    q_act = act['transaction_qty']
+    t_act = act['distinct_transactions']
 
-    v_ant = df_ant['Total_Bill'].sum() if df_ant is not None and not df_ant.empty else None
-    q_ant = df_ant['transaction_qty'].sum() if df_ant is not None and not df_ant.empty else None
-    t_ant = df_ant['transaction_id'].nunique() if df_ant is not None and not df_ant.empty else None
+    ant = kpi_totals(kpis_ant) if kpis_ant is not None and not kpis_ant.empty else {}
+    v_ant = ant.get('Total_Bill')
+    q_ant = ant.get('transaction_qty')
+    t_ant = ant.get('distinct_transactions')
 
     metrics = {
         'ventas': {
@@ -69,14 +167,17 @@ def get_kpi_metrics(df_filtered, df_ant=None):
     return metrics
 
 # --- FUNCIONES DE GRÁFICOS ---
+def fig_json(fig):
+    return figure_to_json(fig, engine=FIGURE_JSON_ENGINE, typed_arrays=TYPED_ARRAY_THRESHOLD)
+
 def create_ventas_categorias(df_filtered):
     fig_cat = px.bar(
-        df_filtered.groupby('product_category')['Total_Bill'].sum().sort_values(ascending=True).reset_index(),
+        df_filtered.groupby('product_category', observed=True)['Total_Bill'].sum().sort_values(ascending=True).reset_index(),
         x='Total_Bill', y='product_category', orientation='h',
         color_discrete_sequence=['#6f4e37'],
         template="simple_white"
     )
-    return json.dumps(fig_cat, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_cat)
 
 def create_ventas_tiendas(df_filtered):
     fig_pie = px.pie(
@@ -84,20 +185,20 @@ def create_ventas_tiendas(df_filtered):
         hole=0.5,
         color_discrete_sequence=['#3d2b1f', '#6f4e37', '#c3a689']
     )
-    return json.dumps(fig_pie, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_pie)
 
-def create_ventas_mensuales(df_all):
-    meses_ordenados = ["January", "February", "March", "April", "May", "June"]
-    df_mensual = df_all.groupby('Month_Name')['Total_Bill'].sum().reindex(meses_ordenados).reset_index()
+def create_ventas_mensuales(ventas_mes, meses_ordenados):
+    # ventas_mes: agregado global precalculado (Month Name, Total_Bill)
+    df_mensual = ventas_mes.set_index('Month Name')['Total_Bill'].reindex(meses_ordenados).reset_index()
     promedio = df_mensual['Total_Bill'].mean()
     
     colores = ['#59270E' if val >= promedio else '#c3a689' for val in df_mensual['Total_Bill']]
     
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=df_mensual['Month_Name'], y=df_mensual['Total_Bill'], marker_color=colores))
+    fig.add_trace(go.Bar(x=df_mensual['Month Name'], y=df_mensual['Total_Bill'], marker_color=colores))
     fig.add_hline(y=promedio, line_dash="dot", line_color="#3d2b1f")
     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400)
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig)
 
 def create_ventas_diarias(df_filtered):
     daily = df_filtered.groupby('Day')['Total_Bill'].sum().reset_index()
@@ -109,17 +210,15 @@ def create_ventas_diarias(df_filtered):
     fig.add_hline(y=avg_val, line_dash="dot", line_color="#3d2b1f", 
                   annotation_text=f"Promedio: ${avg_val:,.0f}")
     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400)
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig)
 
-def create_comparativa_categorias(df_actual, df_anterior):
-    if df_anterior.empty:
+def create_comparativa_categorias(comparativa):
+    # comparativa: ventas por categoría del mes y del anterior (PeriodRollup.compare)
+    if comparativa.empty:
         return None
     
-    cat_act = df_actual.groupby('product_category')['Total_Bill'].sum().reset_index()
-    cat_ant = df_anterior.groupby('product_category')['Total_Bill'].sum().reset_index()
-    
-    df_comp = pd.merge(cat_act, cat_ant, on='product_category', how='outer', 
-                       suffixes=('_Actual', '_Anterior')).fillna(0)
+    df_comp = comparativa.rename(columns={'Total_Bill': 'Total_Bill_Actual',
+                                          'Total_Bill_previous': 'Total_Bill_Anterior'})
     df_comp = df_comp.sort_values('Total_Bill_Actual', ascending=True)
 
     fig = go.Figure()
@@ -147,16 +246,16 @@ def create_comparativa_categorias(df_actual, df_anterior):
         height=500,
         margin=dict(l=0, r=0, t=30, b=0)
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig)
 
-def create_mapa_calor(df_filtered):
+def create_mapa_calor(fuente):
     orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     
-    pivot_table = df_filtered.pivot_table(
+    # fuente son las transacciones filtradas: el cubo no tiene la hora
+    pivot_table = aggregate(fuente, ['Hour', 'Day Name']).pivot(
         index='Hour',
-        columns='Day_Name',
-        values='Total_Bill',
-        aggfunc='sum'
+        columns='Day Name',
+        values='Total_Bill'
     ).reindex(columns=orden_dias).fillna(0)
 
     fig_heat = px.imshow(
@@ -168,18 +267,18 @@ def create_mapa_calor(df_filtered):
     )
     
     fig_heat.update_layout(height=400, margin=dict(b=0))
-    return json.dumps(fig_heat, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_heat)
 
-def create_totales_dia(df_filtered):
+def create_totales_dia(fuente):
     orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    totales_dia = df_filtered.groupby('Day_Name')['Total_Bill'].sum().reindex(orden_dias).reset_index()
+    totales_dia = aggregate(fuente, 'Day Name').set_index('Day Name')['Total_Bill'].reindex(orden_dias).reset_index()
     promedio = totales_dia['Total_Bill'].mean()
     
     colores = ['#59270E' if x >= promedio else '#c3a689' for x in totales_dia['Total_Bill']]
 
     fig_bar = go.Figure()
     fig_bar.add_trace(go.Bar(
-        x=totales_dia['Day_Name'],
+        x=totales_dia['Day Name'],
         y=totales_dia['Total_Bill'],
         marker_color=colores,
         text=[f"${x:,.0f}" for x in totales_dia['Total_Bill']],
@@ -197,10 +296,10 @@ def create_totales_dia(df_filtered):
     )
     fig_bar.update_yaxes(visible=False)
     
-    return json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_bar)
 
 def create_matriz_estrategica(df_filtered):
-    cat_analisis = df_filtered.groupby('product_category').agg({
+    cat_analisis = df_filtered.groupby('product_category', observed=True).agg({
         'unit_price': 'mean',
         'transaction_qty': 'mean',
         'Total_Bill': 'sum'
@@ -239,7 +338,7 @@ def create_matriz_estrategica(df_filtered):
     fig.add_annotation(x=cat_analisis['unit_price'].min(), y=cat_analisis['transaction_qty'].min(),
                 text="Underperformers", showarrow=False, opacity=0.3)
 
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder), avg_price, avg_qty
+    return fig_json(fig), avg_price, avg_qty
 
 def create_analisis_precio(df_filtered):
     precio_analisis = df_filtered.groupby('unit_price').agg({
@@ -266,10 +365,10 @@ def create_analisis_precio(df_filtered):
         plot_bgcolor='rgba(0,0,0,0)'
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig)
 
 def create_top_productos(df_filtered):
-    top_productos = df_filtered.groupby('product_type')['transaction_qty'].sum().sort_values(
+    top_productos = df_filtered.groupby('product_type', observed=True)['transaction_qty'].sum().sort_values(
         ascending=False).head(10).reset_index()
     
     fig_top = px.bar(
@@ -283,10 +382,10 @@ def create_top_productos(df_filtered):
     
     fig_top.update_layout(yaxis={'categoryorder':'total ascending'})
     
-    return json.dumps(fig_top, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_top)
 
-def create_distribucion_temporal(df_all):
-    df_temporal = df_all.groupby(['transaction_date', 'store_location'])['Total_Bill'].sum().reset_index()
+def create_distribucion_temporal(df_temporal):
+    # df_temporal: agregado global precalculado (transaction_date, store_location, Total_Bill)
 
     fig = px.area(
         df_temporal, 
@@ -306,14 +405,13 @@ def create_distribucion_temporal(df_all):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
 
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig)
 
-def create_evolucion_temporal(df_filtered):
-    temporal_df = df_filtered.groupby('Day').agg({
-        'Total_Bill': 'sum',
-        'transaction_qty': 'sum',
-        'transaction_id': 'nunique'
-    }).reset_index()
+def create_evolucion_temporal(kpis_filtrado):
+    # Transacciones distintas por día del mes desde el almacén de KPIs
+    temporal_df = aggregate(
+        kpis_filtrado, 'Day', ['Total_Bill', 'transaction_qty', 'distinct_transactions']
+    ).rename(columns={'distinct_transactions': 'transaction_id'})
     
     temporal_df['ticket_promedio'] = temporal_df['Total_Bill'] / temporal_df['transaction_id']
 
@@ -368,10 +466,10 @@ def create_evolucion_temporal(df_filtered):
         height=500
     )
 
-    return json.dumps(fig_temporal, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig_json(fig_temporal)
 
 def get_tabla_resumen(df_filtered):
-    resumen = df_filtered.groupby('product_category').agg({
+    resumen = df_filtered.groupby('product_category', observed=True).agg({
         'Total_Bill': 'sum', 
         'unit_price': 'mean', 
         'transaction_qty': 'sum'
@@ -383,23 +481,24 @@ def get_tabla_resumen(df_filtered):
 # --- RUTAS ---
 @app.route('/')
 def index():
+    periodos = get_datos()[3]
     return render_template('overview.html', 
-                         meses=["Todas", "January", "February", "March", "April", "May", "June"])
+                         meses=get_meses(periodos))
 
 @app.route('/overview')
-def overview():
-    month = request.args.get('month', 'Todas')
-    df_filtered = get_filtered_data(month)
+@vista_cacheada('Todas')
+def overview(month, df, cubo, kpis, periodos, globales):
+    df_filtered = get_filtered_data(df, month)
     
-    metrics = get_kpi_metrics(df_filtered)
+    metrics = get_kpi_metrics(get_filtered_kpis(kpis, month))
     
     graph_categorias = create_ventas_categorias(df_filtered)
     graph_tiendas = create_ventas_tiendas(df_filtered)
-    graph_mensual = create_ventas_mensuales(df)
+    graph_mensual = create_ventas_mensuales(globales['monthly'], get_meses(periodos, todas=False))
     tabla = get_tabla_resumen(df_filtered)
     
     return render_template('overview.html',
-                         meses=["Todas", "January", "February", "March", "April", "May", "June"],
+                         meses=get_meses(periodos),
                          selected_month=month,
                          metrics=metrics,
                          graph_categorias=graph_categorias,
@@ -408,25 +507,25 @@ def overview():
                          tabla=tabla)
 
 @app.route('/monthly')
-def monthly():
-    month = request.args.get('month', 'January')
+@vista_cacheada('January')
+def monthly(month, df, cubo, kpis, periodos, globales):
     
     if month == 'Todas':
         return render_template('monthly.html',
-                             meses=["January", "February", "March", "April", "May", "June"],
+                             meses=get_meses(periodos, todas=False),
                              selected_month=month,
                              show_warning=True)
     
-    df_filtered = get_filtered_data(month)
-    df_anterior = get_previous_month_data(month)
+    df_filtered = get_filtered_data(df, month)
     
-    metrics = get_kpi_metrics(df_filtered, df_anterior)
+    metrics = get_kpi_metrics(get_filtered_kpis(kpis, month),
+                              get_previous_month_kpis(kpis, periodos, month))
     graph_diarias = create_ventas_diarias(df_filtered)
-    graph_comparativa = create_comparativa_categorias(df_filtered, df_anterior)
+    graph_comparativa = create_comparativa_categorias(get_comparativa_mes_anterior(periodos, month))
     tabla = get_tabla_resumen(df_filtered)
     
     return render_template('monthly.html',
-                         meses=["January", "February", "March", "April", "May", "June"],
+                         meses=get_meses(periodos, todas=False),
                          selected_month=month,
                          show_warning=False,
                          metrics=metrics,
@@ -436,19 +535,20 @@ def monthly():
                          mes_nombre=month)
 
 @app.route('/behavior')
-def behavior():
-    month = request.args.get('month', 'Todas')
-    df_filtered = get_filtered_data(month)
+@vista_cacheada('Todas')
+def behavior(month, df, cubo, kpis, periodos, globales):
+    df_filtered = get_filtered_data(df, month)
     
-    metrics = get_kpi_metrics(df_filtered)
+    metrics = get_kpi_metrics(get_filtered_kpis(kpis, month))
+    cubo_filtrado = get_filtered_cube(cubo, month)
     graph_calor = create_mapa_calor(df_filtered)
-    graph_totales = create_totales_dia(df_filtered)
+    graph_totales = create_totales_dia(cubo_filtrado)
     graph_precio = create_analisis_precio(df_filtered)
     graph_matriz, avg_price, avg_qty = create_matriz_estrategica(df_filtered)
     graph_top = create_top_productos(df_filtered)
     
     return render_template('behavior.html',
-                         meses=["Todas", "January", "February", "March", "April", "May", "June"],
+                         meses=get_meses(periodos),
                          selected_month=month,
                          metrics=metrics,
                          graph_calor=graph_calor,
@@ -460,18 +560,102 @@ def behavior():
                          avg_qty=f"{avg_qty:.2f}")
 
 @app.route('/advanced')
-def advanced():
-    month = request.args.get('month', 'Todas')
-    df_filtered = get_filtered_data(month)
-    
-    graph_distribucion = create_distribucion_temporal(df)
-    graph_evolucion = create_evolucion_temporal(df_filtered)
+@vista_cacheada('Todas')
+def advanced(month, df, cubo, kpis, periodos, globales):
+    graph_distribucion = create_distribucion_temporal(globales['daily_by_store'])
+    graph_evolucion = create_evolucion_temporal(get_filtered_kpis(kpis, month))
     
     return render_template('advanced.html',
-                         meses=["Todas", "January", "February", "March", "April", "May", "June"],
+                         meses=get_meses(periodos),
                          selected_month=month,
                          graph_distribucion=graph_distribucion,
                          graph_evolucion=graph_evolucion)
 
+# --- PRECALENTAMIENTO ---
+# Solo lo lanzan explícitamente `python app.py` o el hook on_starting de
+# gunicorn (gunicorn.conf.py), nunca la importación del módulo
+estado_precalentamiento = {'listo': True, 'total': 0, 'completadas': 0,
+                           'errores': 0, 'segundos': None}
+_estado_lock = threading.Lock()
+
+def actualizar_estado(**cambios):
+    with _estado_lock:
+        estado_precalentamiento.update(cambios)
+
+def sumar_estado(campo):
+    with _estado_lock:
+        estado_precalentamiento[campo] += 1
+
+def renderizar_vista(endpoint, month):
+    # Se ejecuta en los procesos del pool: heredan por fork los datos ya
+    # cargados, así que solo viaja de vuelta el HTML
+    vista = app.view_functions[endpoint].__wrapped__
+    df, cubo, kpis, periodos, globales, version = get_datos()
+    with app.test_request_context(f'/{endpoint}', query_string={'month': month}):
+        return version, vista(month, df, cubo, kpis, periodos, globales)
+
+def crear_pool_precalentamiento():
+    # Hacer fork con otros hilos vivos puede copiar a los hijos locks tomados
+    # (logging, caché, pandas) y bloquearlos: solo se usa un pool de procesos
+    # desde el hilo principal de un proceso sin más hilos. En cualquier otro
+    # caso, o sin fork (Windows, macOS por defecto), un pool de hilos
+    if ('fork' in multiprocessing.get_all_start_methods()
+            and threading.current_thread() is threading.main_thread()
+            and threading.active_count() == 1):
+        return ProcessPoolExecutor(PREWARM_WORKERS, mp_context=multiprocessing.get_context('fork'))
+    return ThreadPoolExecutor(PREWARM_WORKERS)
+
+def precalentar_vistas():
+    # Renderiza en paralelo todas las combinaciones (ruta, mes) y las guarda
+    # en la caché de vistas; /ready informa del resultado
+    inicio = time.perf_counter()
+    actualizar_estado(listo=False, total=0, completadas=0, errores=0, segundos=None)
+    try:
+        _, _, _, periodos, _, version = get_datos()
+        meses = get_meses(periodos)
+        combinaciones = [(endpoint, mes) for endpoint in vistas_cacheadas for mes in meses]
+        actualizar_estado(total=len(combinaciones))
+
+        with crear_pool_precalentamiento() as pool:
+            tareas = {pool.submit(renderizar_vista, endpoint, mes): (endpoint, mes)
+                      for endpoint, mes in combinaciones}
+            for tarea in as_completed(tareas):
+                endpoint, mes = tareas[tarea]
+                try:
+                    version_vista, html = tarea.result()
+                except Exception:
+                    app.logger.exception("Error precalentando %s (%s)", endpoint, mes)
+                    sumar_estado('errores')
+                    continue
+                # Si los datos cambiaron mientras tanto, la vista ya no sirve
+                if version_vista == get_datos()[-1]:
+                    cache_vistas.put((endpoint, mes, version_vista), html)
+                sumar_estado('completadas')
+    except Exception:
+        # Sin precalentar, las vistas se renderizan en la primera visita
+        app.logger.exception("Error precalentando las vistas")
+        sumar_estado('errores')
+    finally:
+        # Termina pase lo que pase, con los errores contados
+        actualizar_estado(listo=True, segundos=round(time.perf_counter() - inicio, 3))
+
+@app.route('/ready')
+def ready():
+    """
+    Sonda de vida: responde siempre 200
+
+    El precalentamiento termina antes de que el servidor acepte peticiones
+    (`python app.py` y el hook on_starting de gunicorn), así que nunca hay
+    que esperarlo; el JSON informa de su resultado (total, completadas,
+    errores y segundos).
+    """
+    with _estado_lock:
+        estado = dict(estado_precalentamiento)
+    return jsonify(estado)
+
 if __name__ == '__main__':
+    # Con el recargador de debug solo el proceso hijo (WERKZEUG_RUN_MAIN)
+    # sirve peticiones; se precalienta antes de aceptar tráfico
+    if PREWARM and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        precalentar_vistas()
     app.run(debug=True, host='0.0.0.0', port=5000)
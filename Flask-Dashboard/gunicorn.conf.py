@@ -0,0 +1,19 @@
+# Configuración de gunicorn: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+# La app (datos, índices y caché de vistas) se carga una vez en el proceso
+# maestro y los workers la heredan por fork
+preload_app = True
+
+
+def on_starting(server):
+    # Precalienta la caché en el hilo principal del maestro, antes de crear
+    # los workers: todos arrancan con las vistas ya renderizadas
+    import app
+
+    if app.PREWARM:
+        app.precalentar_vistas()
+        server.log.info("Vistas precalentadas: %s", app.estado_precalentamiento)
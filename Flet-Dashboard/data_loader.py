@@ -3,44 +3,51 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+import os
+import sys
+
+# El paquete compartido coffee_core vive en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from coffee_core import SalesDataset, filter_frame
+
 
 class CoffeeDataLoader:
     def __init__(self, filepath: str = "coffee_shop_sales.csv"):
         self.filepath = filepath
         self.df = None
+        self.index = None
+        # Sin vigilancia automática: los datos se actualizan con refresh_data()
+        self.dataset = SalesDataset(filepath, check_interval=None, incremental=True)
         self.load_data()
         
     def load_data(self):
         """Carga y preprocesa los datos del CSV"""
         try:
-            self.df = pd.read_csv(self.filepath)
-            self._preprocess_data()
+            self.dataset.reload()
+            # Índices de filtrado: fechas ordenadas (búsqueda binaria) y valores -> filas
+            self.df, self.index = self.dataset.frame, self.dataset.index
             print(f"Datos cargados: {len(self.df)} registros")
         except Exception as e:
             print(f"Error cargando datos: {e}")
             self.df = pd.DataFrame()
-    
-    def _preprocess_data(self):
-        """Preprocesa los datos para análisis"""
-        if self.df is None or self.df.empty:
-            return
-            
-        # Convertir fechas y horas
-        self.df['transaction_date'] = pd.to_datetime(self.df['transaction_date'], dayfirst=True)
-        self.df['transaction_time'] = pd.to_datetime(self.df['transaction_time'], format='%H:%M:%S').dt.time
-        self.df['transaction_datetime'] = pd.to_datetime(
-            self.df['transaction_date'].astype(str) + ' ' + self.df['transaction_time'].astype(str)
-        )
-        
-        # Extraer información adicional
-        self.df['hour'] = self.df['transaction_datetime'].dt.hour
-        self.df['day_of_week'] = self.df['transaction_datetime'].dt.dayofweek
-        self.df['month'] = self.df['transaction_datetime'].dt.month
-        self.df['day_name'] = self.df['transaction_datetime'].dt.day_name()
-        self.df['month_name'] = self.df['transaction_datetime'].dt.month_name()
-        
-        # Calcular ingresos totales por transacción
-        self.df['revenue'] = self.df['transaction_qty'] * self.df['unit_price']
+
+    def refresh_data(self) -> bool:
+        """Incorpora las filas añadidas al CSV desde la última lectura
+
+        Solo se leen y preparan las líneas nuevas (desde el último byte
+        leído); si el archivo se reescribió, se recarga completo.
+        Devuelve True si los datos cambiaron.
+        """
+        try:
+            if not self.dataset.refresh():
+                return False
+            self.df, self.index = self.dataset.frame, self.dataset.index
+            refresh = self.dataset.last_refresh
+            print(f"Datos actualizados ({refresh['mode']}): +{refresh['rows']} registros")
+            return True
+        except Exception as e:
+            print(f"Error actualizando datos: {e}")
+            return False
     
     def _is_valid_dataframe(self):
         """Verifica si el DataFrame es válido para operaciones"""
@@ -73,7 +80,7 @@ class CoffeeDataLoader:
         """Obtiene los productos más vendidos"""
         if not self._is_valid_dataframe():
             return pd.DataFrame()
-        return self.df.groupby(['product_category', 'product_type', 'product_detail']).agg({
+        return self.df.groupby(['product_category', 'product_type', 'product_detail'], observed=True).agg({
             'transaction_qty': 'sum',
             'revenue': 'sum'
         }).reset_index().sort_values('revenue', ascending=False).head(n)
@@ -82,7 +89,7 @@ class CoffeeDataLoader:
         """Obtiene rendimiento por tienda"""
         if not self._is_valid_dataframe():
             return pd.DataFrame()
-        return self.df.groupby(['store_id', 'store_location']).agg({
+        return self.df.groupby(['store_id', 'store_location'], observed=True).agg({
             'transaction_id': 'count',
             'revenue': 'sum',
             'transaction_qty': 'sum'
@@ -92,13 +99,13 @@ class CoffeeDataLoader:
         """Obtiene ventas por hora del día"""
         if not self._is_valid_dataframe():
             return pd.DataFrame()
-        return self.df.groupby('hour')['revenue'].sum().reset_index()
+        return self.df.groupby('Hour')['revenue'].sum().reset_index()
     
     def get_category_sales(self) -> pd.DataFrame:
         """Obtiene ventas por categoría"""
         if not self._is_valid_dataframe():
             return pd.DataFrame()
-        return self.df.groupby('product_category')['revenue'].sum().reset_index()
+        return self.df.groupby('product_category', observed=True)['revenue'].sum().reset_index()
     
     def get_recent_transactions(self, n: int = 10) -> pd.DataFrame:
         """Obtiene transacciones recientes"""
@@ -117,49 +124,43 @@ class CoffeeDataLoader:
         if not self._is_valid_dataframe():
             return pd.DataFrame()
             
-        df_filtered = self.df.copy()
-        
-        # Filtrar por fecha
-        if start_date:
-            df_filtered = df_filtered[df_filtered['transaction_date'] >= start_date]
-        if end_date:
-            df_filtered = df_filtered[df_filtered['transaction_date'] <= end_date]
-        
-        # Filtrar por tienda
-        if store_ids:
-            df_filtered = df_filtered[df_filtered['store_id'].isin(store_ids)]
-        
-        # Filtrar por categoría
-        if categories:
-            df_filtered = df_filtered[df_filtered['product_category'].isin(categories)]
-        
-        # Filtrar por precio
-        df_filtered = df_filtered[df_filtered['unit_price'] >= min_price]
-        if max_price:
-            df_filtered = df_filtered[df_filtered['unit_price'] <= max_price]
-        
-        return df_filtered
+        # Rango de fechas por búsqueda binaria y el resto en una sola máscara, sin copiar self.df
+        return filter_frame(
+            self.df,
+            filters={
+                'store_id': store_ids,
+                'product_category': categories,
+            },
+            ranges={
+                'transaction_date': (start_date or None, end_date or None),
+                'unit_price': (min_price, max_price or None),
+            },
+            index=self.index
+        )
     
     def get_time_period_data(self, filters):
-        """Obtiene datos basados en filtros de año/mes"""
-        from datetime import datetime, timedelta
-        
+        """Obtiene datos basados en filtros de año/mes, tienda y categoría"""
         if not self._is_valid_dataframe():
             return pd.DataFrame()
         
-        # Comenzar con todo el dataset
-        filtered_df = self.df.copy()
-        
-        # Filtrar por año
+        # Año como rango de fechas y meses por la columna Month, en una sola máscara
         year = filters.get('year', 2023)
-        filtered_df = filtered_df[filtered_df['transaction_date'].dt.year == year]
-        
-        # Filtrar por meses
         months = filters.get('months', ['all'])
-        if 'all' not in months and months:
-            filtered_df = filtered_df[filtered_df['transaction_date'].dt.month.isin(months)]
-        
-        return filtered_df
+        store = filters.get('store', 'Todos')
+        category = filters.get('category', 'Todos')
+        
+        return filter_frame(
+            self.df,
+            filters={
+                'Month': None if 'all' in months else months,
+                'store_location': None if store == 'Todos' else store,
+                'product_category': None if category == 'Todos' else category,
+            },
+            ranges={
+                'transaction_date': (pd.Timestamp(year, 1, 1), pd.Timestamp(year, 12, 31)),
+            },
+            index=self.index
+        )
     
     def get_time_period_data_legacy(self, period='last_30_days'):
         """Método legacy para períodos relativos (mantenido por compatibilidad)"""
@@ -30,19 +30,9 @@ class DashboardPage:
     
     def _apply_filters(self):
         """Aplica los filtros actuales a los datos"""
-        # Obtener datos filtrados usando la nueva estructura
+        # Año, meses, tienda y categoría se resuelven con una sola máscara
         filtered_df = self.data_loader.get_time_period_data(self.current_filters)
         
-        # Aplicar filtro de tienda
-        store = self.current_filters.get('store', 'Todos')
-        if store != 'Todos':
-            filtered_df = filtered_df[filtered_df['store_location'] == store]
-        
-        # Aplicar filtro de categoría
-        category = self.current_filters.get('category', 'Todos')
-        if category != 'Todos':
-            filtered_df = filtered_df[filtered_df['product_category'] == category]
-        
         return filtered_df
     
     def _build_content(self):
@@ -67,7 +57,7 @@ class DashboardPage:
             
             # Obtener datos para gráficos
             daily_sales = filtered_df.groupby('transaction_date')['revenue'].sum().reset_index()
-            category_sales = filtered_df.groupby('product_category')['revenue'].sum().reset_index()
+            category_sales = filtered_df.groupby('product_category', observed=True)['revenue'].sum().reset_index()
             recent_transactions = filtered_df.sort_values('transaction_datetime', ascending=False).head(5)
         
         # Preparar datos para gráficos
@@ -17,7 +17,7 @@ class SalesPage:
         
         # Preparar datos para gráficos
         hourly_data = hourly_sales['revenue'].tolist() if not hourly_sales.empty else []
-        hourly_labels = [f"{h}:00" for h in hourly_sales['hour'].tolist()] if not hourly_sales.empty else []
+        hourly_labels = [f"{h}:00" for h in hourly_sales['Hour'].tolist()] if not hourly_sales.empty else []
         
         # Gráfico de ventas por hora
         hourly_chart = SalesChartCard.create(
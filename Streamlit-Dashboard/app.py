@@ -2,8 +2,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 import os
+import sys
+
+# El paquete compartido coffee_core vive en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from coffee_core import (
+    KPIStore, PeriodRollup, aggregate, distplot_by_group, filter_frame, global_aggregates,
+    kpi_totals, load_sales
+)
 
 # --- CONFIGURACIÓN Y ESTILO ---
 st.set_page_config(page_title="Coffee Shop Sales Analysis", layout="wide")
@@ -25,43 +32,56 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- CARGA DE DATOS ---
+# Filas leídas y preparadas por bloque al cargar el CSV (p. ej. 100000), para
+# acotar la memoria en máquinas pequeñas; vacío lo lee entero
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', 0)) or None
+
 @st.cache_data
 def load_data():
     base_path = os.path.dirname(__file__)
     file_path = os.path.join(base_path, "..", "Data", "coffee_shop_sales.csv")
-    df = pd.read_csv(file_path)
-
     #df = pd.read_csv("../Data/coffee_shop_sales.csv") # streamlit cloud no detecta el csv
-    df['transaction_date'] = pd.to_datetime(df['transaction_date'], dayfirst=True)
 
-    df['Month_Name'] = df['transaction_date'].dt.month_name()
-    df['Day'] = df['transaction_date'].dt.day
-    #df['Hour'] = df['transaction_date'].dt.hour
-    #df['transaction_time'] = pd.to_datetime(df['transaction_time'])
-    #df['Hour'] = df['transaction_time'].dt.hour  # ya tenemos columna hora
-    df['Day_Name'] = df['transaction_date'].dt.day_name()
+    # Preparación, tipos y caché compartidos con el resto de dashboards
+    return load_sales(file_path, chunksize=CSV_CHUNK_SIZE)
+
+@st.cache_resource
+def load_kpis():
+    # KPIs por (fecha, tienda, categoría): las tarjetas no recorren las filas
+    return KPIStore.from_transactions(load_data())
 
-    # Mantenemos Total_Bill como numérico por si acaso
-    df['Total_Bill'] = df['unit_price'] * df['transaction_qty']
-    return df
+@st.cache_resource
+def load_periodos():
+    # Resumen (mes, categoría, tienda) con el mes anterior y la diferencia
+    return PeriodRollup.from_transactions(load_data())
+
+@st.cache_resource
+def load_global_aggregates():
+    # Agregados sobre todo el dataset (no dependen del filtro): una sola vez
+    return global_aggregates(load_data())
 
 df = load_data()
+kpis = load_kpis()
+periodos = load_periodos()
+globales = load_global_aggregates()
 
 # --- FUNCIONES DE VISUALIZACIÓN ---
 
-def metricas_kpi(df_filtered, df_ant=None):
+def metricas_kpi(kpis_filtrado, kpis_ant=None):
     col1, col2, col3 = st.columns(3)
     
     def calc_delta(act, ant):
         return ((act - ant) / ant) * 100 if ant is not None and ant > 0 else None
 
-    v_act = df_filtered['Total_Bill'].sum()
-    q_act = df_filtered['transaction_qty'].sum()
-    t_act = df_filtered['transaction_id'].nunique()
+    act = kpi_totals(kpis_filtrado)
+    v_act = act['Total_Bill']
+    q_act = act['transaction_qty']
+    t_act = act['distinct_transactions']
 
-    v_ant = df_ant['Total_Bill'].sum() if df_ant is not None and not df_ant.empty else None
-    q_ant = df_ant['transaction_qty'].sum() if df_ant is not None and not df_ant.empty else None
-    t_ant = df_ant['transaction_id'].nunique() if df_ant is not None and not df_ant.empty else None
+    ant = kpi_totals(kpis_ant) if kpis_ant is not None and not kpis_ant.empty else {}
+    v_ant = ant.get('Total_Bill')
+    q_ant = ant.get('transaction_qty')
+    t_ant = ant.get('distinct_transactions')
 
     with col1:
         st.metric("Ventas Totales", f"${v_act:,.2f}", f"{calc_delta(v_act, v_ant):.2f}%" if v_ant else None)
@@ -73,7 +93,7 @@ def metricas_kpi(df_filtered, df_ant=None):
 def ventas_categorias_productos(df_filtered):
     st.subheader("Ventas por Categoría")
     fig_cat = px.bar(
-        df_filtered.groupby('product_category')['Total_Bill'].sum().sort_values(ascending=True).reset_index(),
+        df_filtered.groupby('product_category', observed=True)['Total_Bill'].sum().sort_values(ascending=True).reset_index(),
         x='Total_Bill', y='product_category', orientation='h',
         color_discrete_sequence=['#6f4e37'],
         template="simple_white"
@@ -89,16 +109,16 @@ def ventas_tiendas(df_filtered):
     )
     st.plotly_chart(fig_pie, use_container_width=True)
 
-def ventas_mensuales_tendencia(df_all):
+def ventas_mensuales_tendencia(ventas_mes, meses_ordenados):
+    # ventas_mes: agregado global precalculado (Month Name, Total_Bill)
     st.subheader("Tendencia Mensual Global")
-    meses_ordenados = ["January", "February", "March", "April", "May", "June"]
-    df_mensual = df_all.groupby('Month_Name')['Total_Bill'].sum().reindex(meses_ordenados).reset_index()
+    df_mensual = ventas_mes.set_index('Month Name')['Total_Bill'].reindex(meses_ordenados).reset_index()
     promedio = df_mensual['Total_Bill'].mean()
     
     colores = ['#59270E' if val >= promedio else '#c3a689' for val in df_mensual['Total_Bill']]
     
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=df_mensual['Month_Name'], y=df_mensual['Total_Bill'], marker_color=colores))
+    fig.add_trace(go.Bar(x=df_mensual['Month Name'], y=df_mensual['Total_Bill'], marker_color=colores))
     fig.add_hline(y=promedio, line_dash="dot", line_color="#3d2b1f")
     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400)
     st.plotly_chart(fig, use_container_width=True)
@@ -115,25 +135,23 @@ def ventas_diarias_barra(df_filtered, mes_nombre):
     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400)
     st.plotly_chart(fig, use_container_width=True)
 
-def ventas_variacion_categoria(df_actual, df_anterior):
+def ventas_variacion_categoria(comparativa):
     st.subheader("Variación de Ventas vs Mes Anterior ($)")
     
-    if df_anterior.empty:
+    if comparativa.empty:
         st.info("No hay datos del mes anterior para comparar.")
         return
 
-    # 1. Calcular ventas por categoría para ambos meses
-    cat_act = df_actual.groupby('product_category')['Total_Bill'].sum()
-    cat_ant = df_anterior.groupby('product_category')['Total_Bill'].sum()
-    
-    # 2. Crear DataFrame de comparación
-    df_diff = pd.DataFrame({
-        'Actual': cat_act,
-        'Anterior': cat_ant
-    }).fillna(0)
+    # 1. Ventas por categoría de ambos meses y su diferencia, ya calculadas
+    #    en el resumen mensual
+    df_diff = comparativa.rename(columns={
+        'Total_Bill': 'Actual',
+        'Total_Bill_previous': 'Anterior',
+        'Total_Bill_delta': 'Diferencia'
+    })
     
-    df_diff['Diferencia'] = df_diff['Actual'] - df_diff['Anterior']
-    df_diff = df_diff.sort_values('Diferencia', ascending=True).reset_index()
+    # 2. Ordenar por diferencia
+    df_diff = df_diff.sort_values('Diferencia', ascending=True).reset_index(drop=True)
     
     # 3. Lógica de color: Café oscuro para positivo, Gris/Crema para negativo
     df_diff['Color'] = ['#59270E' if x > 0 else '#c3a689' for x in df_diff['Diferencia']]
@@ -162,19 +180,18 @@ def ventas_variacion_categoria(df_actual, df_anterior):
     
     st.plotly_chart(fig_diff, use_container_width=True)
 
-def ventas_comparativas_categoria(df_actual, df_anterior):
+def ventas_comparativas_categoria(comparativa):
     st.subheader("Comparativa de Ventas: Mes Actual vs Mes Anterior")
     
-    if df_anterior.empty:
-        st.info("Selecciona un mes a partir de Febrero para ver la comparativa con el mes anterior.")
+    if comparativa.empty:
+        st.info("Selecciona un mes a partir del segundo con datos para ver la comparativa con el mes anterior.")
         return
 
-    # 1. Agrupar ventas por categoría para ambos periodos
-    cat_act = df_actual.groupby('product_category')['Total_Bill'].sum().reset_index()
-    cat_ant = df_anterior.groupby('product_category')['Total_Bill'].sum().reset_index()
+    # 1. Ventas por categoría de ambos periodos (resumen mensual)
+    df_comp = comparativa.rename(columns={'Total_Bill': 'Total_Bill_Actual',
+                                          'Total_Bill_previous': 'Total_Bill_Anterior'})
     
-    # 2. Unir ambos dataframes
-    df_comp = pd.merge(cat_act, cat_ant, on='product_category', how='outer', suffixes=('_Actual', '_Anterior')).fillna(0)
+    # 2. Ordenar por ventas del mes actual
     df_comp = df_comp.sort_values('Total_Bill_Actual', ascending=True)
 
     # 3. Crear el gráfico de barras agrupadas
@@ -213,7 +230,7 @@ def ventas_comparativas_categoria(df_actual, df_anterior):
 
 def tabla_resumen(df_filtered):
     st.subheader("Resumen Ejecutivo de Categorías")
-    resumen = df_filtered.groupby('product_category').agg({'Total_Bill': 'sum', 'unit_price': 'mean', 'transaction_qty': 'sum'}).reset_index()
+    resumen = df_filtered.groupby('product_category', observed=True).agg({'Total_Bill': 'sum', 'unit_price': 'mean', 'transaction_qty': 'sum'}).reset_index()
     resumen['% sales'] = (resumen['Total_Bill'] / resumen['Total_Bill'].sum()) * 100
     st.dataframe(resumen.style.format({'Total_Bill': '${:,.2f}', 'unit_price': '${:,.2f}', '% sales': '{:.2f}%'}), use_container_width=True)
 
@@ -228,7 +245,8 @@ def mapa_calor_horarios(df_filtered):
         index='Hour',
         columns='Day Name',
         values='Total_Bill',
-        aggfunc='sum'
+        aggfunc='sum',
+        observed=True
     ).reindex(columns=orden_dias)
 
     # 2. Crear el Heatmap con Plotly
@@ -250,17 +268,16 @@ def mapa_calor_horarios(df_filtered):
     
     st.plotly_chart(fig, use_container_width=True)
 
-def mapa_calor_con_totales(df_filtered):
+def mapa_calor_con_totales(fuente):
     st.subheader("Patrón de Tráfico: Horas vs. Días")
     
-    # 1. Preparar los datos
+    # 1. Preparar los datos (transacciones filtradas: el cubo no tiene la hora)
     orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     
-    pivot_table = df_filtered.pivot_table(
+    pivot_table = aggregate(fuente, ['Hour', 'Day Name']).pivot(
         index='Hour',
-        columns='Day_Name',
-        values='Total_Bill',
-        aggfunc='sum'
+        columns='Day Name',
+        values='Total_Bill'
     ).reindex(columns=orden_dias).fillna(0)
 
     # 2. Crear el Heatmap
@@ -276,7 +293,7 @@ def mapa_calor_con_totales(df_filtered):
     st.plotly_chart(fig_heat, use_container_width=True)
 
     # 3. Crear los Totales por Día (La barra de abajo)
-    totales_dia = df_filtered.groupby('Day_Name')['Total_Bill'].sum().reindex(orden_dias).reset_index()
+    totales_dia = aggregate(fuente, 'Day Name').set_index('Day Name')['Total_Bill'].reindex(orden_dias).reset_index()
     promedio = totales_dia['Total_Bill'].mean()
     
     # Aplicamos tu lógica de color: café oscuro si supera el promedio
@@ -284,7 +301,7 @@ def mapa_calor_con_totales(df_filtered):
 
     fig_bar = go.Figure()
     fig_bar.add_trace(go.Bar(
-        x=totales_dia['Day_Name'],
+        x=totales_dia['Day Name'],
         y=totales_dia['Total_Bill'],
         marker_color=colores,
         text=[f"${x:,.0f}" for x in totales_dia['Total_Bill']],
@@ -308,7 +325,7 @@ def mapa_calor_con_totales(df_filtered):
 
 def top_productos_barra(df_filtered):
     st.subheader("Top 10 Productos por Volumen")
-    top_productos = df_filtered.groupby('product_type')['transaction_qty'].sum().sort_values(ascending=False).head(10).reset_index()
+    top_productos = df_filtered.groupby('product_type', observed=True)['transaction_qty'].sum().sort_values(ascending=False).head(10).reset_index()
     
     # Cambiamos marker_color por color_discrete_sequence
     fig_top = px.bar(
@@ -363,7 +380,7 @@ def analisis_categoria_precio_qty(df_filtered):
     st.subheader("Relación Precio vs Cantidad por Categoría")
     
     # 1. Agrupamos por categoría para obtener los promedios
-    cat_analisis = df_filtered.groupby('product_category').agg({
+    cat_analisis = df_filtered.groupby('product_category', observed=True).agg({
         'unit_price': 'mean',
         'transaction_qty': 'mean',
         'Total_Bill': 'sum' # Usaremos el total para el tamaño de la burbuja
@@ -398,7 +415,7 @@ def analisis_categoria_precio_qty_cuadrantes(df_filtered):
     st.subheader("🎯 Matriz Estratégica: Precio vs Volumen")
     
     # 1. Agrupamos por categoría
-    cat_analisis = df_filtered.groupby('product_category').agg({
+    cat_analisis = df_filtered.groupby('product_category', observed=True).agg({
         'unit_price': 'mean',
         'transaction_qty': 'mean',
         'Total_Bill': 'sum'
@@ -473,7 +490,7 @@ def ventas_por_dia_semana(df_filtered):
     orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     
     # Agrupamos y reordenamos
-    dia_semana = df_filtered.groupby('Day Name')['Total_Bill'].sum().reindex(orden_dias).reset_index()
+    dia_semana = df_filtered.groupby('Day Name', observed=True)['Total_Bill'].sum().reindex(orden_dias).reset_index()
     promedio = dia_semana['Total_Bill'].mean()
     
     # Color condicional: Café oscuro si supera el promedio
@@ -492,12 +509,11 @@ def ventas_por_dia_semana(df_filtered):
     
     st.plotly_chart(fig, use_container_width=True)
 
-def distribucion_ventas_tiempo(df):
+def distribucion_ventas_tiempo(df_temporal):
     st.subheader("Distribución de Ventas por Tienda en el Tiempo")
     st.markdown("Visualización de la intensidad de ventas desde Enero a Junio")
 
-    # 1. Agrupamos por fecha y tienda para tener el total diario
-    df_temporal = df.groupby(['transaction_date', 'store_location'])['Total_Bill'].sum().reset_index()
+    # 1. Total diario por fecha y tienda: agregado global precalculado al cargar
 
     # 2. Crear el gráfico de áreas (Ridgeline effect)
     # Usamos px.area para que se vea la "distribución" de la masa de ventas
@@ -525,24 +541,13 @@ def distribucion_avanzada_tiendas(df):
     st.subheader("Análisis de Densidad: ¿Cuándo se vende más en el mes?")
     st.markdown("Este gráfico muestra la 'masa' de ventas. Las curvas más altas indican los días de mayor actividad.")
 
-    tiendas = df['store_location'].unique()
-    
-    # Preparamos los datos: El día del mes para cada transacción de cada tienda
-    # Usamos el valor del día repetido según el monto de la venta para dar peso
-    hist_data = []
-    group_labels = []
-
-    for tienda in tiendas:
-        # Extraemos los días donde hubo ventas para esa tienda
-        dias_tienda = df[df['store_location'] == tienda]['Day']
-        hist_data.append(dias_tienda)
-        group_labels.append(tienda)
-
-    # Crear el Distplot (Histograma + Curva suave)
+    # Crear el Distplot (Histograma + Curva suave) del día del mes de cada
+    # transacción, un grupo por tienda calculado en una sola pasada
     # bin_size=1 porque los días van de 1 en 1
-    fig = ff.create_distplot(
-        hist_data, 
-        group_labels, 
+    fig = distplot_by_group(
+        df,
+        'Day',
+        'store_location',
         bin_size=1,
         show_hist=False, # Si prefieres solo las curvas elegantes, ponlo en False
         colors=['#3d2b1f', '#6f4e37', '#c3a689']
@@ -562,22 +567,18 @@ def distribucion_avanzada_tiendas(df):
 def distribucion_avanzada_estilo_oscuro(df):
     st.subheader("Gráficos Avanzados: Histograma Múltiple")
     
-    # 1. Preparar los datos
-    # Filtramos por tienda y obtenemos los valores de venta (Total_Bill)
-    tiendas = df['store_location'].unique()
-    
-    # Creamos una lista de arrays con los datos de cada tienda
-    hist_data = [df[df['store_location'] == loc]['Total_Bill'].dropna() for loc in tiendas]
-    group_labels = list(tiendas)
+    # 1. Los valores de venta (Total_Bill) se agrupan por tienda dentro de
+    # distplot_by_group, sin separar el dataframe tienda por tienda
 
     # 2. Definir los colores exactos de tu imagen (Verde, Naranja, Azul)
     colores_vivos = ['#2ca02c', '#ff7f0e', '#1f77b4'] 
 
     # 3. Crear el distplot
     # bin_size: ajusta el ancho de las barras (0.5 o 1 suele funcionar bien para tickets de café)
-    fig = ff.create_distplot(
-        hist_data, 
-        group_labels, 
+    fig = distplot_by_group(
+        df,
+        'Total_Bill',
+        'store_location',
         bin_size=.5,
         colors=colores_vivos,
         curve_type='kde', # 'kde' para la línea suave
@@ -602,19 +603,13 @@ def distribucion_avanzada_estilo_oscuro(df):
 def grafico_distribucion_dias(df):
     st.subheader("Concentración de Ventas por Día del Mes")
     
-    # 1. Preparar los datos tal cual tu ejemplo: una lista de listas
-    # Filtramos el número del día (1-31) por cada tienda
-    tiendas = df['store_location'].unique()
-    
-    # Esta es la estructura que buscabas: hist_data = [lista_tienda1, lista_tienda2...]
-    hist_data = [df[df['store_location'] == tienda]['Day'].tolist() for tienda in tiendas]
-    group_labels = list(tiendas)
-
+    # 1. El número del día (1-31) de cada transacción, un grupo por tienda
     # 2. Crear el distplot
     # bin_size=1 es ideal porque hablamos de días individuales
-    fig = ff.create_distplot(
-        hist_data, 
-        group_labels, 
+    fig = distplot_by_group(
+        df,
+        'Day',
+        'store_location',
         bin_size=1,
         colors=['#2ca02c', '#ff7f0e', '#1f77b4'], # Verde, Naranja, Azul de tu imagen
         show_rug=True # Las rayitas en la base que dan el toque "Advanced"
@@ -707,22 +702,26 @@ def evolucion_temporal_avanzada(df_filtered):
 
 # --- NAVEGACIÓN Y FILTROS ---
 pagina = st.sidebar.radio("Navegación:", ["Overview", "Monthly Sales", "Shopper Behavior", "Advanced Analytics"])
-meses_lista = ["January", "February", "March", "April", "May", "June"]
+# Meses con ventas en orden de calendario (no se supone enero-junio)
+meses_lista = periodos.month_names()
 mes_seleccionado = st.sidebar.selectbox("Mes:", ["Todas"] + meses_lista)
 
-df_filtered = df.copy()
+# Sin copia: df_filtered es el propio df cuando no hay filtro activo
+df_filtered = df
+kpis_filtrado = kpis
 if mes_seleccionado != "Todas":
-    df_filtered = df_filtered[df_filtered['Month_Name'] == mes_seleccionado]
+    df_filtered = filter_frame(df, {'Month Name': mes_seleccionado})
+    kpis_filtrado = kpis.filter({'Month Name': mes_seleccionado})
 
 # --- RENDER ---
 if pagina == "Overview":
     st.title("📊 Coffee Overview")
-    metricas_kpi(df_filtered)
+    metricas_kpi(kpis_filtrado)
     st.markdown("---")
     c1, c2 = st.columns([6, 4])
     with c1: ventas_categorias_productos(df_filtered)
     with c2: ventas_tiendas(df_filtered)
-    ventas_mensuales_tendencia(df)
+    ventas_mensuales_tendencia(globales['monthly'], meses_lista)
     tabla_resumen(df_filtered)
 
 elif pagina == "Monthly Sales":
@@ -731,11 +730,13 @@ elif pagina == "Monthly Sales":
     else:
         st.title(f"📈 Análisis Detallado: {mes_seleccionado}")
         
-        # Obtener mes anterior (Ya lo tienes en tu código)
-        idx = meses_lista.index(mes_seleccionado)
-        df_ant = df[df['Month_Name'] == meses_lista[idx-1]] if idx > 0 else pd.DataFrame()
+        # Mes de calendario anterior y comparativa por categoría, desde el
+        # resumen mensual (sin volver a filtrar ni agrupar las filas)
+        mes_anterior = periodos.previous_month(mes_seleccionado)
+        comparativa = periodos.compare(mes_seleccionado, by='product_category')
+        kpis_ant = kpis.filter({'Month Name': mes_anterior}) if mes_anterior else None
         
-        metricas_kpi(df_filtered, df_ant)
+        metricas_kpi(kpis_filtrado, kpis_ant)
         
         st.markdown("---")
         
@@ -745,14 +746,14 @@ elif pagina == "Monthly Sales":
             ventas_diarias_barra(df_filtered, mes_seleccionado)
         with col_der:
             # Llamamos a la nueva función de dos barras por categoría
-            ventas_comparativas_categoria(df_filtered, df_ant)
+            ventas_comparativas_categoria(comparativa)
             
         tabla_resumen(df_filtered)
 
 elif pagina == "Shopper Behavior":
     st.title("👥 Comportamiento del Consumidor")
     
-    metricas_kpi(df_filtered)
+    metricas_kpi(kpis_filtrado)
     st.markdown("---")
     
     # Fila 1: Heatmap (Ancho completo)
@@ -774,7 +775,7 @@ elif pagina == "Shopper Behavior":
     top_productos_barra(df_filtered)
 
 if pagina == "Advanced Analytics":
-    distribucion_ventas_tiempo(df) # Enviamos el df completo para que el análisis sea global
+    distribucion_ventas_tiempo(globales['daily_by_store']) # Agregado global: el análisis no depende del mes
     #distribucion_avanzada_tiendas(df)
     #distribucion_avanzada_estilo_oscuro(df)
     #grafico_distribucion_dias(df)
@@ -0,0 +1,49 @@
+"""
+Shared data layer for the coffee shop sales dashboards
+
+Every front-end loads its data through `load_sales`, so they all share
+one column schema, one set of dtypes and one on-disk cache. Long-running
+servers keep the prepared frame resident through `get_dataset`.
+"""
+
+from coffee_core.compress import install_compression
+from coffee_core.cube import SalesCube, aggregate
+from coffee_core.dataset import SalesDataset, get_dataset
+from coffee_core.distplot import create_distplot, distplot_by_group
+from coffee_core.downsample import collapse_points
+from coffee_core.filters import filter_frame
+from coffee_core.index import InvertedIndex
+from coffee_core.kpi import KPIStore, kpi_totals
+from coffee_core.loader import DEFAULT_DATA_PATH, load_sales, prepare_sales
+from coffee_core.lru import LRUCache
+from coffee_core.periods import PeriodRollup
+from coffee_core.planner import AggregationPlan
+from coffee_core.schema import apply_schema, memory_report
+from coffee_core.serialize import encode_typed_arrays, figure_to_json
+from coffee_core.summary import global_aggregates
+
+__all__ = [
+    'AggregationPlan',
+    'DEFAULT_DATA_PATH',
+    'InvertedIndex',
+    'KPIStore',
+    'LRUCache',
+    'PeriodRollup',
+    'SalesCube',
+    'SalesDataset',
+    'aggregate',
+    'apply_schema',
+    'collapse_points',
+    'create_distplot',
+    'distplot_by_group',
+    'encode_typed_arrays',
+    'figure_to_json',
+    'filter_frame',
+    'get_dataset',
+    'global_aggregates',
+    'install_compression',
+    'kpi_totals',
+    'load_sales',
+    'memory_report',
+    'prepare_sales',
+]
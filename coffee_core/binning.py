@@ -0,0 +1,120 @@
+"""
+Vectorized labels derived from the hour and the calendar
+
+The time period of a transaction only depends on its hour, its day name
+and weekend flag on its weekday and its month name on its month, so they
+are computed as integer codes with NumPy and returned as categoricals
+built from those codes: no Python call and no string per row. The
+result has the dtype `apply_schema` gives these columns (ordered, with
+the declared categories).
+"""
+
+import numpy as np
+import pandas as pd
+
+from coffee_core.schema import DAY_ORDER, MONTH_ORDER
+
+# (first hour, label) of every period of the day, in order; hours before
+# the first start, past 24 or missing fall in the last period, which
+# wraps past midnight
+TIME_PERIODS = [
+    (6, 'Morning'),
+    (11, 'Lunch'),
+    (14, 'Afternoon'),
+    (17, 'Evening'),
+    (20, 'Night'),
+]
+
+# Weekend days in `dayofweek` numbering (Monday=0)
+WEEKEND_DAYS = (5, 6)
+
+
+def time_period_codes(hours, periods=TIME_PERIODS):
+    """
+    Index in `periods` of the period of each hour
+
+    Parameters:
+    -----------
+    hours : array-like
+        Hours of the day, possibly fractional or missing
+    periods : list of tuple, optional
+        (first hour, label) pairs with strictly increasing first hours
+
+    Returns:
+    --------
+    np.ndarray
+        int64 codes in range(len(periods))
+    """
+
+    starts = np.array([start for start, _ in periods], dtype=np.float64)
+    if not len(starts) or np.any(np.diff(starts) <= 0):
+        raise ValueError(f"period start hours must be strictly increasing, got {starts.tolist()}")
+    hours = np.asarray(hours, dtype=np.float64)
+    hours = np.where((hours >= 0) & (hours < 24), hours, np.nan)
+    # digitize puts hours before the first start in bin 0 and NaN past the last
+    bins = np.digitize(hours, starts)
+    return np.where(bins == 0, len(starts), bins) - 1
+
+
+def bin_time_periods(hours, periods=TIME_PERIODS):
+    """
+    Period of the day of each hour, as an ordered categorical
+
+    Parameters:
+    -----------
+    hours : pd.Series or array-like
+        Hours of the day
+    periods : list of tuple, optional
+        (first hour, label) pairs, see `TIME_PERIODS`
+
+    Returns:
+    --------
+    pd.Series or pd.Categorical
+        A Series aligned with `hours` when it is one
+    """
+
+    codes = time_period_codes(hours, periods)
+    return _categorical(codes, [label for _, label in periods], hours)
+
+
+def classify_time_period(hour, periods=TIME_PERIODS):
+    """Period of the day of a single hour (see `bin_time_periods` for columns)"""
+    return periods[time_period_codes([hour], periods)[0]][1]
+
+
+def day_names(day_of_week):
+    """Day names of `dayofweek` numbers (Monday=0), as an ordered categorical"""
+    return _categorical(_codes(day_of_week, len(DAY_ORDER)), DAY_ORDER, day_of_week)
+
+
+def month_names(months):
+    """Month names of month numbers (January=1), as an ordered categorical"""
+    return _categorical(_codes(months, len(MONTH_ORDER), offset=1), MONTH_ORDER, months)
+
+
+def weekend_flags(day_of_week, weekend=WEEKEND_DAYS):
+    """Boolean flags of the `dayofweek` numbers falling on the weekend"""
+    flags = np.isin(np.asarray(day_of_week, dtype=np.float64), weekend)
+    if isinstance(day_of_week, pd.Series):
+        return pd.Series(flags, index=day_of_week.index, name=day_of_week.name)
+    return flags
+
+
+def _codes(numbers, n_labels, offset=0):
+    # Out-of-range or missing numbers get the missing-value code -1
+    numbers = np.asarray(numbers, dtype=np.float64) - offset
+    valid = (numbers >= 0) & (numbers < n_labels) & (numbers == np.floor(numbers))
+    return np.where(valid, np.nan_to_num(numbers), -1).astype(np.int64)
+
+
+def _categorical(codes, labels, like):
+    # A label repeated in several periods (e.g. 'Night' from 0 and from 20)
+    # is one category
+    categories = list(dict.fromkeys(labels))
+    if len(categories) < len(labels):
+        remap = np.array([categories.index(label) for label in labels])
+        codes = np.where(codes >= 0, remap[codes], -1)
+    values = pd.Categorical.from_codes(codes, categories=categories, ordered=True)
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index, name=like.name)
+    return values
@@ -0,0 +1,160 @@
+"""
+Columnar cache for the prepared sales dataframe
+
+The prepared frame is stored as Parquet next to the source CSV, together
+with a small JSON sidecar holding the CSV fingerprint (size, mtime and
+content hash) and the cache schema version. A cache entry is only reused
+when the fingerprint and the schema version both match.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Bump whenever the preparation logic changes the shape or dtypes of the frame
+CACHE_SCHEMA_VERSION = 4
+
+CACHE_DIR_NAME = '.cache'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(filepath):
+    """Return the BLAKE2b hex digest of a file, read in 1 MiB chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(filepath, with_hash=True):
+    """
+    Build the fingerprint used to validate a cache entry
+
+    Parameters:
+    -----------
+    filepath : str
+        Path to the source CSV
+    with_hash : bool
+        Whether to include the content hash (requires reading the file)
+
+    Returns:
+    --------
+    dict
+        size, mtime_ns, schema_version and optionally the content hash
+    """
+
+    stat = os.stat(filepath)
+    fingerprint = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'schema_version': CACHE_SCHEMA_VERSION,
+    }
+    if with_hash:
+        fingerprint['hash'] = file_hash(filepath)
+    return fingerprint
+
+
+def cache_paths(filepath, cache_dir=None):
+    """Return the (parquet, metadata) paths for the cache of a CSV"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return (
+        os.path.join(cache_dir, f'{stem}.parquet'),
+        os.path.join(cache_dir, f'{stem}.meta.json'),
+    )
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, payload):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(payload, fh)
+    os.replace(tmp_path, path)
+
+
+def read_cache(filepath, cache_dir=None):
+    """
+    Return the cached prepared dataframe for a CSV, or None on a miss
+
+    Size and mtime are checked first; the content hash is only computed
+    when they disagree with the stored fingerprint (e.g. the file was
+    touched or copied), in which case a matching hash still counts as a
+    hit and the stored metadata is refreshed.
+    """
+
+    if not PARQUET_AVAILABLE:
+        return None
+
+    parquet_path, meta_path = cache_paths(filepath, cache_dir)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(parquet_path):
+        return None
+    if meta.get('schema_version') != CACHE_SCHEMA_VERSION:
+        return None
+
+    current = file_fingerprint(filepath, with_hash=False)
+    if current['size'] != meta.get('size'):
+        return None
+    if current['mtime_ns'] != meta.get('mtime_ns'):
+        current['hash'] = file_hash(filepath)
+        if current['hash'] != meta.get('hash'):
+            return None
+        _write_json(meta_path, current)
+
+    try:
+        return pd.read_parquet(parquet_path)
+    except Exception:
+        # A corrupt or partially written entry behaves like a miss
+        return None
+
+
+def write_cache(df, filepath, cache_dir=None, fingerprint=None):
+    """
+    Store a prepared dataframe in the cache for a CSV
+
+    The parquet file is written first and the metadata last, both through
+    a temporary file and an atomic rename, so readers never see a
+    metadata entry pointing at an incomplete parquet file.
+    """
+
+    if not PARQUET_AVAILABLE:
+        return False
+
+    parquet_path, meta_path = cache_paths(filepath, cache_dir)
+    if fingerprint is None:
+        fingerprint = file_fingerprint(filepath)
+
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        tmp_path = f'{parquet_path}.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, parquet_path)
+        _write_json(meta_path, fingerprint)
+    except OSError:
+        # Read-only deployments simply run without a cache
+        return False
+    return True
+
+
+def clear_cache(filepath, cache_dir=None):
+    """Remove the cache entry for a CSV, if any"""
+    for path in cache_paths(filepath, cache_dir):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,138 @@
+"""
+HTTP response compression for the Flask-based front-ends
+
+Dashboard pages embed their figures as JSON, so responses easily reach
+megabytes of highly repetitive text. `install_compression` registers an
+`after_request` hook on a Flask app (the Flask dashboard, or `app.server`
+of a Dash app) that compresses text responses with brotli when the
+client accepts it and the `brotli` package is installed, and with gzip
+otherwise. Compressed bodies are memoized by content digest, so a page
+served from a view cache is not compressed again on every request.
+"""
+
+import gzip
+import hashlib
+
+from coffee_core.lru import LRUCache
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain',
+    'application/json', 'application/javascript', 'text/javascript',
+}
+
+# Bodies below this size are sent as is: the saving would not pay the CPU
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_MEMO_SIZE = 32
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    """Supported content codings, in order of preference"""
+    return ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+
+
+def negotiate_encoding(accept_encoding, encodings=None):
+    """
+    Pick the content coding to use for a request
+
+    Parameters:
+    -----------
+    accept_encoding : str
+        Value of the request's Accept-Encoding header
+    encodings : list, optional
+        Candidate codings in order of preference, defaults to
+        `available_encodings()`
+
+    Returns:
+    --------
+    str or None
+        The accepted coding with the highest q-value (ties go to the
+        preferred one), or None if the client accepts none of them
+    """
+
+    qualities = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings or available_encodings():
+        q = qualities.get(encoding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    """Compress `data` (bytes) with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+def install_compression(app, min_size=DEFAULT_MIN_SIZE, memo_size=DEFAULT_MEMO_SIZE):
+    """
+    Compress the text responses of a Flask app
+
+    Parameters:
+    -----------
+    app : flask.Flask
+        Application to hook (for Dash, pass `app.server`)
+    min_size : int, optional
+        Smallest body, in bytes, worth compressing
+    memo_size : int, optional
+        Number of compressed bodies kept, keyed by coding and digest
+
+    Returns:
+    --------
+    LRUCache
+        The memo of compressed bodies
+    """
+
+    from flask import request
+
+    memo = LRUCache(memo_size)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        # Caches in between must not serve one coding to every client
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        data = response.get_data()
+        if encoding is None or len(data) < min_size:
+            return response
+
+        key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+        response.set_data(memo.get_or_compute(key, lambda: compress(data, encoding)))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return memo
@@ -0,0 +1,243 @@
+"""
+Pre-aggregated sales cube
+
+Most charts are sums of `Total_Bill`, `transaction_qty` or a transaction
+count over a handful of dimensions. `SalesCube` rolls the transactions up
+once into a fact table at (date, store, product) grain, carrying the
+attributes that depend only on those keys (month and day names, store
+location, product category, size, ...) and additive measures. Any sum or
+count over those dimensions can then be answered from the facts, which are
+smaller than the raw rows: 11.5k facts for the 20k shipped rows, 16k for
+400k rows.
+
+The hour is not a cube dimension. At (date, hour, store, product) grain
+the shipped rows gave 19.2k facts, nearly one per transaction; the only
+charts that group by hour (the hour x day heatmaps) read the filtered rows.
+"""
+
+import pandas as pd
+
+from coffee_core.filters import filter_frame
+from coffee_core.index import InvertedIndex
+from coffee_core.schema import unify_schema
+
+CUBE_GRAIN = ['transaction_date', 'store_id', 'product_id']
+
+# Attributes functionally determined by the grain columns
+CUBE_ATTRIBUTES = [
+    'Month Name', 'Month', 'Day Name', 'Day of Week', 'Day',
+    'store_location',
+    'product_category', 'product_type', 'product_detail', 'Size',
+]
+
+# unit_price is summed so averages can be derived as unit_price / transactions
+SUM_MEASURES = ['Total_Bill', 'revenue', 'transaction_qty', 'unit_price']
+COUNT_MEASURE = 'transactions'
+
+
+class SalesCube:
+    """
+    Fact table of the sales at (date, store, product) grain
+
+    Parameters:
+    -----------
+    facts : pd.DataFrame
+        Pre-aggregated facts, as built by `from_transactions`
+    index : InvertedIndex, optional
+        Index of `facts`, used by `filter`
+    """
+
+    def __init__(self, facts, index=None):
+        self.facts = facts
+        self.index = index
+        self.dimensions = [c for c in facts.columns if c not in SUM_MEASURES and c != COUNT_MEASURE]
+        self.measures = [c for c in facts.columns if c in SUM_MEASURES or c == COUNT_MEASURE]
+
+    @classmethod
+    def from_transactions(cls, df):
+        """
+        Roll the prepared transactions up into a cube
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Prepared sales dataframe
+
+        Returns:
+        --------
+        SalesCube
+            Cube sorted by date, with its own filter index
+        """
+
+        facts = roll_up(df)
+        return cls(facts, InvertedIndex(facts))
+
+    def extended(self, rows):
+        """
+        Cube after adding transactions to the ones it was built from
+
+        Facts dated before the earliest new transaction cannot share a
+        grain key with the new rows, so they are kept as they are; only
+        the facts from that date on are rolled up again together with the
+        new rows. Appends during the day therefore re-aggregate one day of
+        facts, not the whole history.
+
+        Parameters:
+        -----------
+        rows : pd.DataFrame
+            New prepared transactions, with the dtypes of the frame the
+            cube was built from (see `coffee_core.ingest.append_rows`)
+
+        Returns:
+        --------
+        SalesCube
+            New cube with its own filter index; `self` is left untouched
+        """
+
+        if rows.empty:
+            return self
+        facts, added = unify_schema(self.facts, roll_up(rows))
+        split = int(facts['transaction_date'].searchsorted(added['transaction_date'].min(), side='left'))
+
+        # The new rows carry the same columns, so the grain and attribute
+        # keys are the cube's dimensions
+        tail = (
+            pd.concat([facts.iloc[split:], added], ignore_index=True)
+            .groupby(self.dimensions, observed=True, dropna=False, sort=True)[self.measures]
+            .sum()
+            .reset_index()
+        )
+        facts = pd.concat([facts.iloc[:split], tail], ignore_index=True)
+        index = self.index.extended(facts, split) if self.index is not None else None
+        return SalesCube(facts, index)
+
+    def __len__(self):
+        return len(self.facts)
+
+    def filter(self, filters=None, ranges=None):
+        """
+        Restrict the cube to the facts matching the filters
+
+        Parameters:
+        -----------
+        filters : dict, optional
+            dimension -> value or list-like of values, as in `filter_frame`
+        ranges : dict, optional
+            dimension -> (low, high), both inclusive
+
+        Returns:
+        --------
+        SalesCube
+            Cube over the matching facts (`self` when nothing is filtered out)
+        """
+
+        self._check_columns(list(filters or {}) + list(ranges or {}))
+        facts = filter_frame(self.facts, filters, ranges, index=self.index)
+        if facts is self.facts:
+            return self
+        return SalesCube(facts)
+
+    def query(self, by, measures=('Total_Bill',), filters=None, ranges=None):
+        """
+        Aggregate the measures over the given dimensions
+
+        Parameters:
+        -----------
+        by : str or list
+            Dimension(s) to group by; empty for grand totals
+        measures : list, optional
+            Measures to return; `transactions` is the row count of the
+            underlying transactions, the others are sums
+        filters : dict, optional
+            See `filter`
+        ranges : dict, optional
+            See `filter`
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per observed combination of `by`, sorted by it
+        """
+
+        by = [by] if isinstance(by, str) else list(by)
+        measures = list(measures)
+        self._check_columns(by)
+        missing = [m for m in measures if m not in self.measures]
+        if missing:
+            raise ValueError(f"Not a cube measure: {', '.join(missing)}")
+
+        facts = self.filter(filters, ranges).facts
+        if not by:
+            return pd.DataFrame({m: [facts[m].sum()] for m in measures})
+        return facts.groupby(by, observed=True)[measures].sum().reset_index()
+
+    def _check_columns(self, columns):
+        missing = [c for c in columns if c not in self.dimensions]
+        if missing:
+            raise ValueError(f"Not a cube dimension: {', '.join(missing)}")
+
+
+def roll_up(df):
+    """
+    Fact table of prepared transactions at the cube grain
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Prepared sales dataframe
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per grain and attribute combination, sorted by date
+    """
+
+    keys = [c for c in CUBE_GRAIN + CUBE_ATTRIBUTES if c in df.columns]
+    measures = [m for m in SUM_MEASURES if m in df.columns] + [COUNT_MEASURE]
+
+    # Grouping on the attributes too keeps the cube exact even if an
+    # attribute is not fully determined by the grain; sorting on the
+    # date first keeps the facts chronological for the date index
+    return (
+        df.groupby(keys, observed=True, dropna=False, sort=True)
+        .agg(**measure_aggregations(measures))
+        .reset_index()
+    )
+
+
+def measure_aggregations(measures):
+    """Named aggregations computing `measures` from transaction rows"""
+    return {
+        m: ('transaction_id', 'count') if m == COUNT_MEASURE else (m, 'sum')
+        for m in measures
+    }
+
+
+def aggregate(source, by, measures=('Total_Bill',)):
+    """
+    Sum measures by dimensions from either raw transactions or a cube
+
+    Chart builders call this so they can be fed a (filtered) `SalesCube`
+    or precomputed `PlannedAggregates` when available and raw rows
+    otherwise, with identical output.
+
+    Parameters:
+    -----------
+    source : pd.DataFrame, SalesCube or PlannedAggregates
+        Prepared transactions, or any object with a `query(by, measures)`
+    by : str or list
+        Column(s) to group by
+    measures : list, optional
+        Sum columns, plus `transactions` for the transaction count
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per observed combination of `by`, sorted by it
+    """
+
+    if not isinstance(source, pd.DataFrame):
+        return source.query(by, measures)
+
+    by = [by] if isinstance(by, str) else list(by)
+    return source.groupby(by, observed=True).agg(**measure_aggregations(measures)).reset_index()
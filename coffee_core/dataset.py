@@ -0,0 +1,271 @@
+"""
+Process-level holder for the prepared sales dataframe
+
+Dashboard callbacks should never read the CSV themselves. A `SalesDataset`
+keeps the prepared frame resident in memory and only reloads it when the
+source file changes on disk. The file is stat'ed at most once every
+`check_interval` seconds, so steady-state access is a lock-free attribute
+read. Every successful reload bumps `version`, which downstream caches can
+use as part of their keys, and rebuilds the `InvertedIndex` of the filter
+columns.
+
+With `incremental=True` a file that only had lines appended is not
+reloaded: the dataset reads the new lines from the byte offset where the
+previous read stopped, prepares only those rows and appends them, extending
+the index, the sales cube, the KPI store and the monthly rollup instead of rebuilding them (see
+`coffee_core.ingest`). Any other change still triggers a full reload.
+"""
+
+import os
+import threading
+import time
+
+from coffee_core.cube import SalesCube
+from coffee_core.index import InvertedIndex
+from coffee_core.ingest import TailState, append_rows, read_appended, read_columns
+from coffee_core.kpi import KPIStore
+from coffee_core.loader import DEFAULT_DATA_PATH, load_sales, prepare_sales
+from coffee_core.periods import PeriodRollup
+
+# Seconds between two stat() calls on the source file
+DEFAULT_CHECK_INTERVAL = 5.0
+# Full loads retried when the file keeps changing while being read
+MAX_LOAD_ATTEMPTS = 3
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class SalesDataset:
+    """
+    Resident copy of the prepared sales dataframe with reload semantics
+
+    Parameters:
+    -----------
+    filepath : str, optional
+        Path to the CSV file, defaults to `DEFAULT_DATA_PATH`
+    check_interval : float, optional
+        Minimum seconds between file-change checks. 0 checks on every
+        access, None disables watching (reload only via `reload()`)
+    use_cache : bool, optional
+        Forwarded to `load_sales`
+    incremental : bool, optional
+        Ingest appended lines instead of reloading the whole file
+    kpi_error : float, optional
+        Error bound of the approximate distinct counts of the KPI store
+        (see `KPIStore.from_transactions`); None keeps them exact
+    chunksize : int, optional
+        Rows read and prepared at a time on full loads, to bound their
+        peak memory (see `load_sales`); None reads the file at once
+    """
+
+    def __init__(self, filepath=None, check_interval=DEFAULT_CHECK_INTERVAL, use_cache=True,
+                 incremental=False, kpi_error=None, chunksize=None):
+        self.filepath = os.path.abspath(filepath or DEFAULT_DATA_PATH)
+        self.check_interval = check_interval
+        self.use_cache = use_cache
+        self.incremental = incremental
+        self.kpi_error = kpi_error
+        self.chunksize = chunksize
+        self.version = 0
+        self.loaded_at = None
+        self.index = None
+        # {'mode': 'load' or 'append', 'rows': int, 'seconds': float}
+        self.last_refresh = None
+        self._df = None
+        self._cube = None
+        self._kpis = None
+        self._periods = None
+        self._stat = None
+        self._tail = None
+        self._columns = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self):
+        """The prepared dataframe, reloaded first if the source file changed"""
+        if self._df is None or self._check_due():
+            self.refresh()
+        return self._df
+
+    def cube_snapshot(self):
+        """
+        Return the current frame, its `SalesCube` and their version
+
+        Returns:
+        --------
+        tuple
+            (pd.DataFrame, SalesCube, int)
+        """
+
+        df, cube, _, _, version = self.snapshot(cube=True)
+        return df, cube, version
+
+    def snapshot(self, cube=False, kpis=False, periods=False):
+        """
+        Return the current frame with the requested aggregates, consistently
+
+        Everything is read under the reload lock, so a cache keyed by the
+        version never stores results computed from another frame. The
+        sales cube, the KPI store and the monthly rollup are built on first
+        use and then kept up to date with the frame: appended rows extend
+        them, full reloads drop them.
+
+        Parameters:
+        -----------
+        cube : bool, optional
+            Include the `SalesCube`
+        kpis : bool, optional
+            Include the `KPIStore`
+        periods : bool, optional
+            Include the `PeriodRollup`
+
+        Returns:
+        --------
+        tuple
+            (pd.DataFrame, SalesCube or None, KPIStore or None,
+            PeriodRollup or None, int)
+        """
+
+        self.frame
+        with self._lock:
+            if cube and self._cube is None:
+                self._cube = SalesCube.from_transactions(self._df)
+            if kpis and self._kpis is None:
+                self._kpis = KPIStore.from_transactions(self._df, error=self.kpi_error)
+            if periods and self._periods is None:
+                self._periods = PeriodRollup.from_transactions(self._df)
+            return (
+                self._df,
+                self._cube if cube else None,
+                self._kpis if kpis else None,
+                self._periods if periods else None,
+                self.version,
+            )
+
+    def refresh(self):
+        """
+        Reload the frame if the source file changed since the last load
+
+        Returns:
+        --------
+        bool
+            True if the frame was (re)loaded or rows were appended
+        """
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            stat = self._file_stat()
+            if self._df is not None and stat == self._stat:
+                return False
+            if self._df is not None and self._can_tail(stat):
+                return self._ingest(stat)
+            self._load(stat)
+            return True
+
+    def reload(self):
+        """Unconditionally reload the frame from disk"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._load(self._file_stat())
+
+    def _check_due(self):
+        if self.check_interval is None:
+            return False
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def _file_stat(self):
+        stat = os.stat(self.filepath)
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def _can_tail(self, stat):
+        size, _, inode = stat
+        return self.incremental and self._tail is not None and self._tail.is_append(size, inode)
+
+    def _load(self, stat):
+        # Readers keep using the previous frame until the new one is ready
+        started = time.perf_counter()
+        for _ in range(MAX_LOAD_ATTEMPTS):
+            df = load_sales(self.filepath, use_cache=self.use_cache, chunksize=self.chunksize)
+            loaded_stat = self._file_stat()
+            # Unchanged during the read: the frame holds exactly stat.size bytes
+            if loaded_stat == stat:
+                break
+            stat = loaded_stat
+        else:
+            stat = None
+
+        self.index = InvertedIndex(df)
+        self._df = df
+        self._cube = None
+        self._kpis = None
+        self._periods = None
+        self._stat = stat
+        self._tail = None
+        if self.incremental and stat is not None:
+            self._tail = TailState.at_end(self.filepath, stat[0])
+            self._columns = read_columns(self.filepath)
+        self._finish('load', len(df), started)
+
+    def _ingest(self, stat):
+        started = time.perf_counter()
+        raw, tail = read_appended(self._tail, self._columns)
+        self._stat = stat
+        if raw.empty:
+            # Only a partial line so far: keep the offset and wait
+            return False
+
+        start = len(self._df)
+        rows = prepare_sales(raw)
+        df, in_order = append_rows(self._df, rows)
+        self.index = self.index.extended(df, start) if in_order else InvertedIndex(df)
+        if self._cube is not None:
+            self._cube = self._cube.extended(rows)
+        if self._kpis is not None:
+            self._kpis = self._kpis.extended(rows)
+        if self._periods is not None:
+            self._periods = self._periods.extended(rows)
+        self._df = df
+        self._tail = tail
+        self._finish('append', len(raw), started)
+        return True
+
+    def _finish(self, mode, rows, started):
+        self.loaded_at = time.time()
+        self.version += 1
+        self.last_refresh = {'mode': mode, 'rows': rows, 'seconds': time.perf_counter() - started}
+
+
+def get_dataset(filepath=None, check_interval=DEFAULT_CHECK_INTERVAL, incremental=False,
+                kpi_error=None, chunksize=None):
+    """
+    Return the process-wide `SalesDataset` for a CSV file
+
+    The first call for a given path creates the holder; later calls return
+    the same instance, so every callback in the process shares one frame.
+
+    Parameters:
+    -----------
+    filepath : str, optional
+        Path to the CSV file, defaults to `DEFAULT_DATA_PATH`
+    check_interval : float, optional
+        Used only when the holder is created
+    incremental, kpi_error, chunksize : optional
+        Used only when the holder is created, see `SalesDataset`
+
+    Returns:
+    --------
+    SalesDataset
+        Shared holder for `filepath`
+    """
+
+    key = os.path.abspath(filepath or DEFAULT_DATA_PATH)
+    with _registry_lock:
+        dataset = _registry.get(key)
+        if dataset is None:
+            dataset = _registry[key] = SalesDataset(
+                key, check_interval=check_interval, incremental=incremental, kpi_error=kpi_error,
+                chunksize=chunksize,
+            )
+    return dataset
@@ -0,0 +1,122 @@
+"""
+Date parsing through the distinct date strings
+
+A sales export holds a few hundred distinct dates for hundreds of
+thousands of rows, sometimes written in more than one format (e.g.
+'03-06-2023' and '03/06/2023'). `parse_dates` factorizes the column,
+detects on a sample of the distinct strings which of the known formats
+are present, parses every distinct string once with those explicit
+formats and broadcasts the result back with the factorized codes.
+Strings matching none of the detected formats go through the remaining
+formats and, last, pandas' per-element inference (day first), so any
+date the loader used to accept still parses. Rows that cannot be parsed
+at all are reported.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Formats tried in order; day-first, like the export
+DATE_FORMATS = (
+    '%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d', '%d-%m-%y', '%d/%m/%y',
+)
+# Distinct strings inspected to detect the formats in use
+SAMPLE_SIZE = 1000
+# Failing rows quoted in the error message
+MAX_REPORTED = 5
+
+
+def detect_formats(values, formats=DATE_FORMATS):
+    """
+    Formats among `formats` needed to parse `values`
+
+    Formats are tried in order, each on the values the previous ones left
+    unparsed, and kept when they parse at least one of them.
+
+    Parameters:
+    -----------
+    values : array-like
+        Date strings, e.g. a sample of the distinct ones
+    formats : sequence of str, optional
+        Candidate strptime formats
+
+    Returns:
+    --------
+    list of str
+        Detected formats, in the order they were tried
+    """
+
+    return _parse_greedy(pd.Series(values, dtype=object), formats)[1]
+
+
+def parse_dates(values, formats=DATE_FORMATS, sample_size=SAMPLE_SIZE, errors='raise'):
+    """
+    Parse a column of date strings, each distinct string once
+
+    Parameters:
+    -----------
+    values : pd.Series
+        Raw date strings; a datetime column is returned as is
+    formats : sequence of str, optional
+        Candidate strptime formats, see `DATE_FORMATS`
+    sample_size : int, optional
+        Distinct strings on which the formats are detected
+    errors : str, optional
+        'raise' raises ValueError naming the rows that cannot be parsed,
+        'coerce' leaves them NaT
+
+    Returns:
+    --------
+    tuple
+        (datetime64[ns] Series aligned with `values`, np.ndarray with the
+        positions of the rows that could not be parsed; missing values are
+        NaT and not reported)
+    """
+
+    if errors not in ('raise', 'coerce'):
+        raise ValueError(f"errors must be 'raise' or 'coerce', got {errors!r}")
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values, np.array([], dtype=np.int64)
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    # Detecting the formats on the sample parses it; the distinct strings
+    # past the sample try the detected formats first, then the others
+    parsed, detected = _parse_greedy(uniques[:sample_size], formats)
+    if len(uniques) > sample_size:
+        rest, _ = _parse_greedy(
+            uniques[sample_size:], detected + [fmt for fmt in formats if fmt not in detected]
+        )
+        parsed = pd.concat([parsed, rest])
+
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(
+            uniques[missing].astype(str), format='mixed', dayfirst=True, errors='coerce'
+        )
+
+    # Trailing NaT so the -1 code of missing values maps onto it
+    dates = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))[codes]
+    failed = np.flatnonzero(parsed.isna().to_numpy()[codes] & (codes >= 0))
+    if len(failed) and errors == 'raise':
+        examples = ', '.join(f"{pos}: {values.iloc[pos]!r}" for pos in failed[:MAX_REPORTED])
+        raise ValueError(f"{len(failed)} rows have unparseable dates (row: value) {examples}")
+    return pd.Series(dates, index=values.index, name=values.name), failed
+
+
+def _parse_greedy(strings, formats):
+    # Each format parses what the previous ones left; returns the parsed
+    # values (NaT where none matched) and the formats that matched any
+    parsed = pd.Series(pd.NaT, index=strings.index, dtype='datetime64[ns]')
+    remaining = strings.dropna()
+    used = []
+    for fmt in formats:
+        if remaining.empty:
+            break
+        attempt = pd.to_datetime(remaining, format=fmt, errors='coerce')
+        matched = attempt.notna()
+        if matched.any():
+            used.append(fmt)
+            parsed[attempt.index[matched]] = attempt[matched]
+            remaining = remaining[~matched]
+    return parsed, used
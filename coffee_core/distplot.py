@@ -0,0 +1,195 @@
+"""
+Distribution plots with a bounded payload
+
+`plotly.figure_factory.create_distplot` ships every value three times: as
+the input of a client-side histogram, as one rug mark each, and through
+a KDE evaluated with scipy over the full sample. Its cost in the server,
+on the wire and in the browser grows with the number of transactions.
+
+`create_distplot` here takes the same arguments and produces the same
+figure layout, but the histogram is binned on the server and drawn as
+bars, the rug only carries the distinct positions (marks at the same x
+overlap anyway), and the KDE is a binned FFT convolution. All groups are
+computed together by `coffee_core.density`, so `distplot_by_group` can
+take the value and group columns of a frame without slicing it once per
+group. The size of the figure depends on the value range, not on the
+number of rows.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from coffee_core.density import (
+    HISTNORMS,
+    group_codes,
+    group_stats,
+    grouped_histograms,
+    grouped_kde,
+    grouped_normal,
+    grouped_unique,
+    weighted_sample,
+)
+from coffee_core.downsample import DEFAULT_MAX_POINTS
+
+# Same palette as plotly.figure_factory
+DEFAULT_COLORS = [
+    'rgb(31, 119, 180)', 'rgb(255, 127, 14)', 'rgb(44, 160, 44)',
+    'rgb(214, 39, 40)', 'rgb(148, 103, 189)', 'rgb(140, 86, 75)',
+    'rgb(227, 119, 194)', 'rgb(127, 127, 127)', 'rgb(188, 189, 34)',
+    'rgb(23, 190, 207)',
+]
+
+def _validate(curve_type, histnorm):
+    if curve_type not in ('kde', 'normal'):
+        raise ValueError(f"curve_type must be 'kde' or 'normal', got {curve_type!r}")
+    if histnorm not in HISTNORMS:
+        raise ValueError(f"histnorm must be one of {HISTNORMS}, got {histnorm!r}")
+
+
+def _build_figure(values, codes, group_labels, bin_size, curve_type, colors,
+                  show_hist, show_curve, show_rug, histnorm, max_rug_points):
+    # values/codes: every non-missing value with the index of its group;
+    # after this single pass only the distinct (group, value) pairs remain
+    n_groups = len(group_labels)
+    colors = colors or DEFAULT_COLORS
+    bin_size = np.broadcast_to(np.asarray(bin_size, dtype=float), (n_groups,))
+    values, codes, weights = weighted_sample(values, codes, n_groups)
+    stats = group_stats(values, codes, n_groups, weights)
+
+    if show_hist:
+        histograms = grouped_histograms(
+            values, codes, n_groups, bin_size, histnorm, weights=weights, stats=stats,
+        )
+    if show_curve:
+        density = grouped_kde if curve_type == 'kde' else grouped_normal
+        grids, curves_y = density(values, codes, n_groups, weights=weights, stats=stats)
+    if show_rug:
+        positions = grouped_unique(values, codes, n_groups, max_rug_points, distinct=True)
+
+    hists, curves, rugs = [], [], []
+    for index, label in enumerate(group_labels):
+        if stats['count'][index] == 0:
+            continue
+        color = colors[index % len(colors)]
+        common = dict(xaxis='x1', name=label, legendgroup=label, marker=dict(color=color))
+
+        if show_hist:
+            centers, heights = histograms[index]
+            hists.append(dict(
+                type='bar', x=centers, y=heights, width=bin_size[index],
+                yaxis='y1', opacity=0.7, **common,
+            ))
+
+        # A density needs some spread (scipy raises on a constant sample)
+        draw_curve = show_curve and not np.isnan(curves_y[index, 0])
+        if draw_curve:
+            curve = curves_y[index]
+            if histnorm == 'probability':
+                curve = curve * bin_size[index]
+            curves.append(dict(
+                type='scatter', x=grids[index], y=curve, yaxis='y1', mode='lines',
+                showlegend=not show_hist, **common,
+            ))
+
+        if show_rug:
+            rugs.append(dict(
+                type='scatter', x=positions[index], y=[label] * len(positions[index]),
+                yaxis='y2', mode='markers', showlegend=not (show_hist or draw_curve),
+                **{**common, 'marker': dict(color=color, symbol='line-ns-open')},
+            ))
+
+    layout = dict(
+        barmode='overlay',
+        hovermode='closest',
+        legend=dict(traceorder='reversed'),
+        xaxis1=dict(domain=[0.0, 1.0], anchor='y2', zeroline=False),
+    )
+    if show_rug:
+        layout['yaxis1'] = dict(domain=[0.35, 1], anchor='free', position=0.0)
+        layout['yaxis2'] = dict(domain=[0, 0.25], anchor='x1', dtick=1, showticklabels=False)
+    else:
+        layout['yaxis1'] = dict(domain=[0.0, 1], anchor='free', position=0.0)
+
+    return go.Figure(data=hists + curves + rugs, layout=layout)
+
+
+def create_distplot(hist_data, group_labels, bin_size=1.0, curve_type='kde', colors=None,
+                    show_hist=True, show_curve=True, show_rug=True,
+                    histnorm='probability density', max_rug_points=DEFAULT_MAX_POINTS):
+    """
+    Histogram, density curve and rug per group, like `ff.create_distplot`
+
+    Parameters:
+    -----------
+    hist_data : list
+        One array-like of values per group
+    group_labels : list
+        Group names, same length as `hist_data`
+    bin_size : float or list, optional
+        Histogram bin width, for all groups or per group
+    curve_type : str, optional
+        'kde' or 'normal'
+    colors : list, optional
+        Group colors, defaults to the plotly palette
+    show_hist, show_curve, show_rug : bool, optional
+        Which parts to draw
+    histnorm : str, optional
+        'probability density' or 'probability'
+    max_rug_points : int, optional
+        Maximum rug marks per group
+
+    Returns:
+    --------
+    go.Figure
+    """
+
+    if len(hist_data) != len(group_labels):
+        raise ValueError("hist_data and group_labels must have the same length")
+    _validate(curve_type, histnorm)
+
+    arrays = [np.asarray(values, dtype=float).ravel() for values in hist_data]
+    values = np.concatenate(arrays) if arrays else np.empty(0)
+    codes = np.repeat(np.arange(len(arrays)), [len(array) for array in arrays])
+    present = ~np.isnan(values)
+    return _build_figure(
+        values[present], codes[present], list(group_labels), bin_size, curve_type, colors,
+        show_hist, show_curve, show_rug, histnorm, max_rug_points,
+    )
+
+
+def distplot_by_group(df, column, by, bin_size=1.0, curve_type='kde', colors=None,
+                      show_hist=True, show_curve=True, show_rug=True,
+                      histnorm='probability density', max_rug_points=DEFAULT_MAX_POINTS):
+    """
+    `create_distplot` of one column, one group per value of another
+
+    Equivalent to passing `[df.loc[df[by] == g, column] for g in
+    df[by].unique()]`, but the groups are never materialized: the group
+    column is factorized once and every statistic is computed for all
+    groups in a single pass.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Rows to plot
+    column : str
+        Numeric column whose distribution is drawn
+    by : str
+        Column defining the groups, in order of first appearance
+    bin_size, curve_type, colors, show_hist, show_curve, show_rug, histnorm, max_rug_points
+        As in `create_distplot`
+
+    Returns:
+    --------
+    go.Figure
+    """
+
+    _validate(curve_type, histnorm)
+
+    codes, labels = group_codes(df[by])
+    values = df[column].to_numpy(dtype=float)
+    present = (codes >= 0) & ~np.isnan(values)
+    return _build_figure(
+        values[present], codes[present], list(labels), bin_size, curve_type, colors,
+        show_hist, show_curve, show_rug, histnorm, max_rug_points,
+    )
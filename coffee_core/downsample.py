@@ -0,0 +1,105 @@
+"""
+Point reduction for charts that draw one mark per transaction
+
+A scatter of every transaction sends, and makes the browser draw, as many
+markers as there are rows, although most of them land on exactly the same
+spot (same product, price and quantity). `collapse_points` merges rows
+that would be drawn identically into one point carrying the number of
+transactions it stands for, and falls back to snapping the coordinates to
+a grid when the distinct points still exceed the cap. `unique_marks`
+does the same for rug marks, which only have an x position.
+"""
+
+import numpy as np
+
+from coffee_core.cube import COUNT_MEASURE
+
+# Upper bound on the markers a collapsed scatter or rug sends to the browser
+DEFAULT_MAX_POINTS = 5000
+
+
+def _snap(values, bins):
+    # Replace each value by the centre of its cell in `bins` equal-width cells
+    values = np.asarray(values, dtype=float)
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not np.isfinite(low) or high == low:
+        return values
+    width = (high - low) / bins
+    cells = np.minimum(np.floor((values - low) / width), bins - 1)
+    return low + (cells + 0.5) * width
+
+
+def collapse_points(df, columns, measures=None, grid_columns=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Merge rows that would be drawn as the same scatter point
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Rows to plot
+    columns : list
+        Columns that position or identify a point (coordinates, color,
+        hover labels); rows equal on all of them become one point
+    measures : dict, optional
+        column -> aggregation ('mean', 'sum', ...) for the other columns
+        the chart reads, e.g. the marker size
+    grid_columns : list, optional
+        Numeric columns of `columns` that may be snapped to a grid when
+        there are more than `max_points` distinct points
+    max_points : int, optional
+        Maximum number of points returned
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per point with `columns`, `measures` and `transactions`
+        (rows merged into it), in order of first appearance so that
+        categorical colors are assigned as for the raw rows
+    """
+
+    columns = list(columns)
+    aggregations = {column: (column, func) for column, func in (measures or {}).items()}
+    aggregations[COUNT_MEASURE] = (columns[0], 'size')
+
+    def collapse(frame):
+        return frame.groupby(columns, observed=True, sort=False).agg(**aggregations).reset_index()
+
+    points = collapse(df)
+    if len(points) > max_points and grid_columns:
+        # Aggregated binning: share the point budget between the label
+        # combinations, then split it evenly across the grid axes
+        labels = [column for column in columns if column not in grid_columns]
+        combinations = df.groupby(labels, observed=True).ngroups if labels else 1
+        bins = max(1, int((max_points / max(combinations, 1)) ** (1 / len(grid_columns))))
+        snapped = df.assign(**{column: _snap(df[column], bins) for column in grid_columns})
+        points = collapse(snapped)
+    if len(points) > max_points:
+        # Too many distinct labels: keep the heaviest points
+        points = points.nlargest(max_points, COUNT_MEASURE).sort_index()
+    return points.reset_index(drop=True)
+
+
+def unique_marks(values, max_points=DEFAULT_MAX_POINTS):
+    """
+    Distinct positions of a rug plot with their multiplicities
+
+    Parameters:
+    -----------
+    values : array-like
+        One value per transaction
+    max_points : int, optional
+        Maximum number of marks; beyond it values are snapped to a grid of
+        `max_points` cells over their range
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        (positions, counts), positions sorted ascending
+    """
+
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    positions, counts = np.unique(values, return_counts=True)
+    if len(positions) > max_points:
+        positions, counts = np.unique(_snap(values, max_points), return_counts=True)
+    return positions, counts
@@ -0,0 +1,164 @@
+"""
+Copy-free filtering of the prepared sales dataframe
+
+All active filters are folded into one boolean mask with in-place numpy
+operations, and the frame is indexed exactly once at the end. When an
+`InvertedIndex` built for the frame is supplied, the indexed filters are
+resolved to row ids (and sorted date ranges to a slice) first, and the
+remaining conditions are only evaluated on those rows. When no filter is
+active, or every row passes, the base frame itself is returned instead of
+a copy, so callers must treat the result as read-only.
+"""
+
+import numpy as np
+import pandas as pd
+
+LIST_TYPES = (list, tuple, set, frozenset, np.ndarray, pd.Index, pd.Series)
+
+
+def is_list_like(value):
+    """Whether a filter value is a collection of values (membership filter)"""
+    return isinstance(value, LIST_TYPES)
+
+
+def is_active(value):
+    """Whether a filter value actually restricts the rows (None and empty lists do not)"""
+    if value is None:
+        return False
+    if is_list_like(value):
+        return len(value) > 0
+    return True
+
+
+def _combine_conditions(column_getter, filters=None, ranges=None):
+    mask = None
+
+    def combine(condition):
+        nonlocal mask
+        condition = np.asarray(condition, dtype=bool)
+        if mask is None:
+            # The first condition is always a fresh array, safe to reuse
+            mask = condition
+        else:
+            np.logical_and(mask, condition, out=mask)
+
+    for column, value in (filters or {}).items():
+        if not is_active(value):
+            continue
+        series = column_getter(column)
+        if is_list_like(value):
+            combine(series.isin(list(value)).to_numpy())
+        else:
+            combine((series == value).to_numpy())
+
+    for column, (low, high) in (ranges or {}).items():
+        series = column_getter(column)
+        if low is not None:
+            combine((series >= low).to_numpy())
+        if high is not None:
+            combine((series <= high).to_numpy())
+
+    return mask
+
+
+def build_mask(df, filters=None, ranges=None):
+    """
+    Combine every active filter into a single boolean mask
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to filter
+    filters : dict, optional
+        column -> value (equality) or list-like of values (membership).
+        None or empty list-likes are ignored
+    ranges : dict, optional
+        column -> (low, high), both inclusive; either bound may be None
+
+    Returns:
+    --------
+    np.ndarray or None
+        Boolean mask aligned with `df`, or None if no filter is active
+    """
+
+    return _combine_conditions(df.__getitem__, filters, ranges)
+
+
+def select_rows(df, filters=None, ranges=None, index=None):
+    """
+    Resolve all filters to the positions of the matching rows
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to filter
+    filters : dict, optional
+        See `build_mask`
+    ranges : dict, optional
+        See `build_mask`
+    index : InvertedIndex, optional
+        Index built for `df`; ignored if it belongs to another frame
+
+    Returns:
+    --------
+    slice, np.ndarray or None
+        A contiguous `slice` when only sorted date ranges apply, otherwise
+        sorted row positions; None if no filter is active
+    """
+
+    rows = None
+    if index is not None and index.covers(df):
+        rows, filters, ranges = index.select(filters, ranges)
+
+    if rows is None:
+        mask = build_mask(df, filters, ranges)
+        return None if mask is None else np.flatnonzero(mask)
+
+    # Only the candidate rows are compared against the remaining filters
+    if isinstance(rows, slice):
+        mask = _combine_conditions(lambda column: df[column].iloc[rows], filters, ranges)
+        return rows if mask is None else rows.start + np.flatnonzero(mask)
+
+    mask = _combine_conditions(lambda column: df[column].take(rows), filters, ranges)
+    return rows if mask is None else rows[mask]
+
+
+def filter_frame(df, filters=None, ranges=None, index=None):
+    """
+    Apply all filters to `df` with a single final take
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to filter
+    filters : dict, optional
+        See `build_mask`
+    ranges : dict, optional
+        See `build_mask`
+    index : InvertedIndex, optional
+        Index built for `df`, used to resolve the indexed columns and the
+        sorted date ranges
+
+    Returns:
+    --------
+    pd.DataFrame
+        The filtered rows, or `df` itself when nothing is filtered out
+    """
+
+    if index is None or not index.covers(df):
+        mask = build_mask(df, filters, ranges)
+        if mask is None or mask.all():
+            return df
+        return df[mask]
+
+    rows = select_rows(df, filters, ranges, index)
+    if rows is None:
+        return df
+    if isinstance(rows, slice):
+        # Contiguous date window: a positional slice, no gather
+        if rows.stop - rows.start == len(df):
+            return df
+        return df.iloc[rows]
+    if len(rows) == len(df):
+        return df
+    return df.take(rows)
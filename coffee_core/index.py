@@ -0,0 +1,324 @@
+"""
+Inverted indexes over the low-cardinality filter columns
+
+For each indexed column the row ids are grouped by value once, at load
+time: a stable argsort of the value codes gives, for every distinct value,
+a contiguous and already sorted run of row ids (a posting list). A
+multi-select filter is then the union of a few runs, and further filters
+only look at the codes of the surviving rows, so the cost of a query grows
+with the number of selected rows rather than with the size of the frame.
+
+The prepared frame is sorted chronologically, so the date columns need no
+posting lists: a `SortedColumn` resolves an inclusive range to a
+contiguous slice with two binary searches.
+"""
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from coffee_core.filters import is_active, is_list_like
+
+INDEXED_COLUMNS = ['Month Name', 'store_location', 'product_category', 'product_detail']
+SORTED_COLUMNS = ['transaction_date', 'transaction_datetime']
+
+
+class Postings:
+    """
+    Posting lists for a single column
+
+    Parameters:
+    -----------
+    series : pd.Series
+        Column to index; categorical columns reuse their codes
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+
+        self.codes = codes
+        self.lookup = {value: code for code, value in enumerate(uniques)}
+        # Stable sort keeps row ids ascending inside each value's run;
+        # missing values (code -1) sort first and are never looked up
+        self.order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self.offsets = np.concatenate(([0], np.cumsum(counts))) + np.count_nonzero(codes < 0)
+
+    def extended(self, series, start):
+        """
+        Postings of `series`, whose rows before `start` are the indexed ones
+
+        Rows from `start` on are new (any indexed rows past `start` are
+        dropped). Only the new rows are sorted; they are inserted at the
+        end of their runs, so the cost is a copy of the posting lists
+        rather than a sort of the whole column.
+
+        Returns:
+        --------
+        Postings
+        """
+
+        tail = series.iloc[start:]
+        old_codes = self.codes[:start]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            n_values = len(series.cat.categories)
+            tail_codes = tail.cat.codes.to_numpy()
+            lookup = {value: code for code, value in enumerate(series.cat.categories)}
+            if len(lookup) != len(self.lookup) or any(lookup.get(v) != c for v, c in self.lookup.items()):
+                # Categories were added (see unify_schema): existing runs keep
+                # their relative order as long as the old codes map increasingly
+                remap = np.array([lookup.get(value, -1) for value in self.lookup] + [-1])
+                if (remap[:-1] < 0).any() or (np.diff(remap[:-1]) <= 0).any():
+                    return Postings(series)
+                old_codes = remap[old_codes]
+        else:
+            lookup = dict(self.lookup)
+            local_codes, uniques = pd.factorize(tail)
+            mapping = np.array([lookup.setdefault(value, len(lookup)) for value in uniques] + [-1])
+            tail_codes = mapping[local_codes]
+            n_values = len(lookup)
+
+        # Runs are shifted by one so missing values (code -1) are run 0
+        order = self.order
+        if start < len(self.codes):
+            order = order[order < start]
+        old_counts = np.bincount(old_codes.astype(np.int64) + 1, minlength=n_values + 1)
+        new_counts = np.bincount(tail_codes.astype(np.int64) + 1, minlength=n_values + 1)
+
+        # New entries go right after the existing ones of their run, which
+        # is a single insert (one copy of the posting lists)
+        new_order = np.argsort(tail_codes, kind='stable')
+        run_ends = np.cumsum(old_counts)
+        merged = np.insert(
+            order, run_ends[tail_codes[new_order].astype(np.int64) + 1], new_order + start
+        )
+        starts = np.concatenate(([0], np.cumsum(old_counts + new_counts)))
+
+        postings = Postings.__new__(Postings)
+        postings.codes = np.concatenate((old_codes, tail_codes))
+        postings.lookup = lookup
+        postings.order = merged
+        postings.offsets = starts[1:]
+        return postings
+
+    def value_codes(self, values):
+        """Codes of the requested values that occur in the column"""
+        return [self.lookup[value] for value in values if value in self.lookup]
+
+    def rows(self, codes):
+        """Sorted row ids holding any of `codes`"""
+        parts = [self.order[self.offsets[code]:self.offsets[code + 1]] for code in codes]
+        if not parts:
+            return np.empty(0, dtype=self.order.dtype)
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+    def size(self, codes):
+        """Number of rows holding any of `codes`"""
+        return sum(int(self.offsets[code + 1] - self.offsets[code]) for code in codes)
+
+
+class SortedColumn:
+    """
+    Binary-search access to a column stored in ascending order
+
+    Missing values are allowed only at the end, where the chronological
+    sort puts them; they never match a range.
+
+    Parameters:
+    -----------
+    series : pd.Series
+        Ascending datetime64 column
+    """
+
+    def __init__(self, series):
+        values = series.to_numpy()
+        n_valid = len(values) - int(np.count_nonzero(pd.isna(values)))
+        self.values = values[:n_valid]
+        self.is_sorted = (
+            not pd.isna(values[:n_valid]).any()
+            and pd.Index(self.values).is_monotonic_increasing
+        )
+
+    def extended(self, series, start):
+        """
+        Sorted access to `series`, whose rows before `start` are the indexed ones
+
+        When the new rows are in order and follow the indexed ones, only
+        they are checked; otherwise the column is scanned again.
+
+        Returns:
+        --------
+        SortedColumn
+        """
+
+        values = series.to_numpy()
+        tail = values[start:]
+        if (
+            not self.is_sorted
+            or len(self.values) != start
+            or pd.isna(tail).any()
+            or (start and len(tail) and tail[0] < self.values[-1])
+            or not pd.Index(tail).is_monotonic_increasing
+        ):
+            return SortedColumn(series)
+        column = SortedColumn.__new__(SortedColumn)
+        column.values = values
+        column.is_sorted = True
+        return column
+
+    def range_slice(self, low=None, high=None):
+        """Positions [start, stop) of the rows with low <= value <= high"""
+        start = 0 if low is None else int(np.searchsorted(self.values, self._coerce(low), side='left'))
+        stop = len(self.values) if high is None else int(np.searchsorted(self.values, self._coerce(high), side='right'))
+        return start, max(start, stop)
+
+    def _coerce(self, bound):
+        return pd.Timestamp(bound).to_datetime64().astype(self.values.dtype)
+
+
+class InvertedIndex:
+    """
+    Value -> sorted row ids indexes for a prepared sales frame
+
+    Besides the posting lists, ascending date columns get a `SortedColumn`
+    so date ranges resolve to a slice. The index is tied to the frame it
+    was built from; `covers` tells whether it can answer queries against a
+    given frame.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Prepared frame, in its final row order
+    columns : list, optional
+        Columns to index, defaults to `INDEXED_COLUMNS`
+    sorted_columns : list, optional
+        Range columns, defaults to `SORTED_COLUMNS`; columns that turn
+        out not to be sorted are skipped
+    """
+
+    def __init__(self, df, columns=None, sorted_columns=None):
+        self.n_rows = len(df)
+        self._frame = weakref.ref(df)
+        self.postings = {
+            column: Postings(df[column])
+            for column in (columns or INDEXED_COLUMNS)
+            if column in df.columns
+        }
+        self.sorted = {}
+        for column in (sorted_columns or SORTED_COLUMNS):
+            if column in df.columns:
+                sorted_column = SortedColumn(df[column])
+                if sorted_column.is_sorted:
+                    self.sorted[column] = sorted_column
+
+    def extended(self, df, start):
+        """
+        Index of `df`, whose rows before `start` are those of the indexed frame
+
+        Used after appending rows: the posting lists and sorted columns
+        are extended with rows [start, len(df)) instead of being rebuilt.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            New frame; its first `start` rows must equal the indexed ones
+        start : int
+            First new row
+
+        Returns:
+        --------
+        InvertedIndex
+            Index tied to `df`
+        """
+
+        if start > self.n_rows:
+            raise ValueError(f"start ({start}) is past the indexed rows ({self.n_rows})")
+
+        index = InvertedIndex.__new__(InvertedIndex)
+        index.n_rows = len(df)
+        index._frame = weakref.ref(df)
+        index.postings = {
+            column: postings.extended(df[column], start)
+            for column, postings in self.postings.items()
+        }
+        index.sorted = {}
+        for column, sorted_column in self.sorted.items():
+            sorted_column = sorted_column.extended(df[column], start)
+            if sorted_column.is_sorted:
+                index.sorted[column] = sorted_column
+        return index
+
+    def covers(self, df):
+        """Whether this index was built for `df`"""
+        return self._frame() is df
+
+    def select(self, filters, ranges=None):
+        """
+        Resolve the indexed part of a filter spec
+
+        Parameters:
+        -----------
+        filters : dict
+            column -> value or list-like of values, as in `filter_frame`
+        ranges : dict, optional
+            column -> (low, high), as in `filter_frame`
+
+        Returns:
+        --------
+        tuple
+            (rows, remaining filters, remaining ranges). `rows` is None if
+            no indexed filter is active, a `slice` when only sorted ranges
+            apply, and otherwise an array of sorted row ids
+        """
+
+        remaining = {}
+        wanted = []
+        for column, value in (filters or {}).items():
+            if not is_active(value):
+                continue
+            if column not in self.postings:
+                remaining[column] = value
+                continue
+            postings = self.postings[column]
+            codes = postings.value_codes(value if is_list_like(value) else [value])
+            wanted.append((postings.size(codes), postings, codes))
+
+        # Intersect all sorted ranges into a single [start, stop) window
+        remaining_ranges = {}
+        window = None
+        for column, (low, high) in (ranges or {}).items():
+            if column not in self.sorted:
+                remaining_ranges[column] = (low, high)
+                continue
+            if low is None and high is None:
+                continue
+            start, stop = self.sorted[column].range_slice(low, high)
+            if window is not None:
+                start, stop = max(start, window[0]), min(stop, window[1])
+            window = (start, max(start, stop))
+
+        if not wanted:
+            rows = None if window is None else slice(*window)
+            return rows, remaining, remaining_ranges
+
+        # Start from the most selective filter, then narrow the candidates
+        # by looking up their codes in the other columns
+        wanted.sort(key=lambda item: item[0])
+        _, postings, codes = wanted[0]
+        rows = postings.rows(codes)
+        if window is not None:
+            # Row ids are sorted, so the window is another binary search
+            rows = rows[np.searchsorted(rows, window[0]):np.searchsorted(rows, window[1])]
+        for _, postings, codes in wanted[1:]:
+            if not len(rows):
+                break
+            rows = rows[np.isin(postings.codes[rows], codes)]
+
+        return rows, remaining, remaining_ranges
@@ -0,0 +1,141 @@
+"""
+Incremental ingestion of rows appended to the sales CSV
+
+The POS export appends transactions to the CSV during the day. Instead of
+re-reading and re-preparing the whole file on every change, a loader can
+remember the byte offset where its last read stopped and, as long as the
+file only grew, read just the complete lines past that offset
+(`read_appended`), prepare them on their own and append them to the
+resident frame (`append_rows`).
+
+`TailState` records what is needed to tell an append from a rewrite: the
+file identity, the header line and the bytes just before the offset. If
+any of them changed, the caller must fall back to a full reload.
+"""
+
+import io
+import os
+
+import pandas as pd
+
+from coffee_core.schema import unify_schema
+
+# Bytes before the offset compared to detect a rewritten file
+SIGNATURE_SIZE = 256
+NEWLINE = b'\n'
+
+
+class TailState:
+    """
+    Position of the last complete line read from a CSV file
+
+    Parameters:
+    -----------
+    filepath : str
+        Path to the CSV file
+    offset : int
+        Bytes already ingested; must be the end of a complete line
+    """
+
+    def __init__(self, filepath, offset):
+        self.filepath = filepath
+        self.offset = offset
+        self.inode = os.stat(filepath).st_ino
+        with open(filepath, 'rb') as fh:
+            self.header = fh.readline()
+            self.signature = _read_at(fh, max(0, offset - SIGNATURE_SIZE), offset)
+
+    @classmethod
+    def at_end(cls, filepath, size):
+        """
+        State after a full read of the first `size` bytes
+
+        Returns:
+        --------
+        TailState or None
+            None when the file does not end with a complete line at
+            `size`: the partial row was parsed, so the file cannot be
+            tailed safely until the next full load
+        """
+
+        with open(filepath, 'rb') as fh:
+            if size == 0 or _read_at(fh, size - 1, size) != NEWLINE:
+                return None
+        return cls(filepath, size)
+
+    def is_append(self, size, inode):
+        """Whether the file only had lines appended since this state"""
+        if inode != self.inode or size <= self.offset:
+            return False
+        with open(self.filepath, 'rb') as fh:
+            if fh.readline() != self.header:
+                return False
+            start = max(0, self.offset - SIGNATURE_SIZE)
+            return _read_at(fh, start, self.offset) == self.signature
+
+
+def _read_at(fh, start, stop):
+    fh.seek(start)
+    return fh.read(stop - start)
+
+
+def read_appended(state, columns):
+    """
+    Parse the complete lines written after `state.offset`
+
+    Parameters:
+    -----------
+    state : TailState
+        Position of the previous read
+    columns : list
+        Column names, as in the header line
+
+    Returns:
+    --------
+    tuple
+        (raw pd.DataFrame of the new rows, TailState after them). A
+        trailing line still being written is left for the next read
+    """
+
+    with open(state.filepath, 'rb') as fh:
+        fh.seek(state.offset)
+        data = fh.read()
+    complete = data.rfind(NEWLINE) + 1
+    if complete == 0:
+        return pd.DataFrame(columns=columns), state
+
+    raw = pd.read_csv(io.BytesIO(data[:complete]), header=None, names=columns)
+    return raw, TailState(state.filepath, state.offset + complete)
+
+
+def read_columns(filepath):
+    """Column names from the header line of a CSV file"""
+    return list(pd.read_csv(filepath, nrows=0).columns)
+
+
+def append_rows(df, rows, order_by='transaction_datetime'):
+    """
+    Append prepared rows to a prepared frame
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Resident prepared frame, sorted by `order_by`
+    rows : pd.DataFrame
+        Newly prepared rows, sorted by `order_by`
+
+    Returns:
+    --------
+    tuple
+        (combined pd.DataFrame, bool). The flag is True when the new rows
+        all sort after the existing ones, so rows [0, len(df)) keep their
+        positions and indexes can be extended; otherwise the combined
+        frame was re-sorted and indexes must be rebuilt
+    """
+
+    df, rows = unify_schema(df, rows)
+    combined = pd.concat([df, rows], ignore_index=True)
+    if df.empty or rows.empty or not (rows[order_by].iloc[0] < df[order_by].iloc[-1]):
+        return combined, True
+    # Late rows: stable sort keeps the existing relative order
+    return combined.sort_values(order_by, kind='stable').reset_index(drop=True), False
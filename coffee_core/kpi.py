@@ -0,0 +1,470 @@
+"""
+Incrementally maintained aggregates for the KPI cards
+
+Every page shows a handful of KPI cards (revenue, items sold, number of
+transactions, distinct products...) and each render used to sum the
+filtered rows and hash every `transaction_id` again. `KPIStore` keeps
+instead one row per (date, store, category) with running sums and
+counts, plus a `DistinctCounter` per distinct-count KPI, so the KPIs of
+any combination of date, month, store and category filters are answered
+in O(groups), whatever the number of transactions.
+
+Distinct counts are not additive across groups: a transaction or a
+product present in two selected groups must be counted once. A
+`DistinctCounter` assigns every value to the first group it was seen in
+and only remembers the other (value, group) pairs, which are rare for
+transaction ids; the count over a selection of groups is the sum of the
+per-group counts minus the duplicates among those pairs.
+
+When many values span several groups (transactions with lines in several
+categories, over months of data), that correction grows with the data.
+Given an error bound, `KPIStore` replaces the counter of such a column by
+a `HyperLogLog` sketch per group, merged for the selected groups, whose
+cost only depends on the number of groups; columns whose exact count is
+still cheaper keep their exact counter.
+
+The store is built once from the prepared transactions and extended with
+appended rows (`KPIStore.extended`), like the sales cube.
+"""
+
+import numpy as np
+import pandas as pd
+
+from coffee_core.cube import COUNT_MEASURE, measure_aggregations
+from coffee_core.filters import build_mask, is_active
+from coffee_core.hll import HyperLogLog, precision_for
+from coffee_core.schema import unify_schema
+
+KPI_KEYS = ['transaction_date', 'store_location', 'product_category']
+# Attributes determined by the keys, kept so they can be filtered and grouped on
+KPI_ATTRIBUTES = ['Month Name', 'Day']
+KPI_MEASURES = ['Total_Bill', 'transaction_qty']
+
+# KPI name -> column whose distinct values are counted
+DISTINCT_MEASURES = {
+    'distinct_transactions': 'transaction_id',
+    'distinct_products': 'product_detail',
+}
+
+# Correcting the count for one shared (value, group) pair costs about as
+# much as merging this many sketch registers (measured); with an error
+# bound, a counter turns into a sketch when the sketch becomes cheaper
+SHARED_PAIR_COST = 32
+
+
+def distinct_keys(series):
+    """64-bit keys of a column, equal for equal values"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series.to_numpy(dtype=np.int64)
+    # Two distinct values share a hash with probability ~n^2 / 2^65
+    return pd.util.hash_pandas_object(series, index=False).to_numpy().view(np.int64)
+
+
+def _distinct_pairs(keys, groups):
+    # Distinct (key, group) pairs, sorted by key and then by group
+    order = np.lexsort((groups, keys))
+    keys, groups = keys[order], groups[order]
+    new = np.ones(len(keys), dtype=bool)
+    new[1:] = (keys[1:] != keys[:-1]) | (groups[1:] != groups[:-1])
+    return keys[new], groups[new]
+
+
+def _split_first(keys, groups):
+    # Sorted distinct pairs -> (keys, their first group), (remaining pairs)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return keys[first], groups[first], keys[~first], groups[~first]
+
+
+class DistinctCounter:
+    """
+    Exact distinct count of a column over any union of groups
+
+    Parameters:
+    -----------
+    keys : np.ndarray
+        Sorted distinct keys of the column (see `distinct_keys`)
+    first : np.ndarray
+        Group code of the first group of each key
+    extra_keys, extra_groups : np.ndarray
+        The other (key, group) pairs, distinct and sorted by key
+    n_groups : int
+        Number of groups
+    """
+
+    def __init__(self, keys, first, extra_keys, extra_groups, n_groups):
+        self.keys = keys
+        self.first = first
+        self.extra_keys = extra_keys
+        self.extra_groups = extra_groups
+        self.n_groups = n_groups
+        # Distinct values of every group on its own
+        self.counts = (
+            np.bincount(first, minlength=n_groups) + np.bincount(extra_groups, minlength=n_groups)
+        )
+        # Keys found in several groups, with the codes of all their pairs
+        shared, self._shared_codes = np.unique(extra_keys, return_inverse=True)
+        self._shared_first = first[np.searchsorted(keys, shared)]
+
+    @classmethod
+    def build(cls, keys, groups, n_groups):
+        """
+        Counter of the values `keys`, each belonging to group `groups`
+
+        Returns:
+        --------
+        DistinctCounter
+        """
+
+        return cls(*_split_first(*_distinct_pairs(keys, groups)), n_groups)
+
+    def extended(self, keys, groups, n_groups):
+        """
+        Counter after adding values, possibly to new groups
+
+        Parameters:
+        -----------
+        keys : np.ndarray
+            Keys of the new values
+        groups : np.ndarray
+            Group code of each new value; codes below `self.n_groups` keep
+            their meaning
+        n_groups : int
+            Number of groups after the update
+
+        Returns:
+        --------
+        DistinctCounter
+            New counter; `self` is left untouched
+        """
+
+        keys, groups = _distinct_pairs(keys, groups)
+        position = np.searchsorted(self.keys, keys)
+        known = position < len(self.keys)
+        known[known] = self.keys[position[known]] == keys[known]
+
+        # Known keys only add a pair when seen in a group other than their first
+        other = self.first[position[known]] != groups[known]
+        new_keys, new_first, extra_keys, extra_groups = _split_first(keys[~known], groups[~known])
+        insert = np.searchsorted(self.keys, new_keys)
+        extra_keys, extra_groups = _distinct_pairs(
+            np.concatenate([self.extra_keys, keys[known][other], extra_keys]),
+            np.concatenate([self.extra_groups, groups[known][other], extra_groups]),
+        )
+        return DistinctCounter(
+            np.insert(self.keys, insert, new_keys), np.insert(self.first, insert, new_first),
+            extra_keys, extra_groups, n_groups,
+        )
+
+    @property
+    def shared(self):
+        """Number of (value, group) pairs beyond the first group of each value"""
+        return len(self.extra_keys)
+
+    def pairs(self):
+        """All distinct (key, group) pairs, as two arrays"""
+        return (
+            np.concatenate([self.keys, self.extra_keys]),
+            np.concatenate([self.first, self.extra_groups]),
+        )
+
+    def count(self, selected=None):
+        """
+        Distinct values over the selected groups
+
+        Parameters:
+        -----------
+        selected : np.ndarray, optional
+            Boolean mask over the groups; None selects all of them
+
+        Returns:
+        --------
+        int
+        """
+
+        if selected is None:
+            return len(self.keys)
+        total = self.counts[selected].sum()
+        if len(self._shared_first):
+            # Selected groups of every shared key; each extra one was counted twice
+            hits = np.bincount(
+                self._shared_codes, selected[self.extra_groups], len(self._shared_first)
+            ) + selected[self._shared_first]
+            total -= np.maximum(hits - 1, 0).sum()
+        return int(total)
+
+    def count_by(self, labels, n_labels):
+        """
+        Distinct values of the union of the groups of each label
+
+        Parameters:
+        -----------
+        labels : np.ndarray
+            Label code of every group in range(n_labels), -1 to leave it out
+        n_labels : int
+            Number of labels
+
+        Returns:
+        --------
+        np.ndarray
+            One count per label
+        """
+
+        kept = labels >= 0
+        totals = np.bincount(labels[kept], self.counts[kept], n_labels)
+        if len(self._shared_first):
+            # Every shared key seen k > 1 times under a label was counted k - 1 extra times
+            codes = np.concatenate([self._shared_codes, np.arange(len(self._shared_first))])
+            pair_labels = labels[np.concatenate([self.extra_groups, self._shared_first])]
+            kept = pair_labels >= 0
+            cells, hits = np.unique(
+                codes[kept] * n_labels + pair_labels[kept], return_counts=True
+            )
+            totals -= np.bincount(cells % n_labels, hits - 1, n_labels)
+        return totals.astype(np.int64)
+
+
+class KPIStore:
+    """
+    KPI aggregates per (date, store, category)
+
+    Parameters:
+    -----------
+    groups : pd.DataFrame
+        One row per group with the keys, attributes and measures, as built
+        by `from_transactions`; group codes are row positions
+    counters : dict
+        KPI name -> `DistinctCounter` over the groups
+    selected : np.ndarray, optional
+        Boolean mask of the groups a filter kept; None keeps all of them
+    precision : int, optional
+        HyperLogLog precision of the counters allowed to be approximate;
+        None keeps every distinct count exact
+    """
+
+    def __init__(self, groups, counters, selected=None, precision=None):
+        self.groups = groups
+        self.counters = counters
+        self.selected = selected
+        self.precision = precision
+        self.dimensions = [c for c in KPI_KEYS + KPI_ATTRIBUTES if c in groups.columns]
+        self.measures = [c for c in groups.columns if c not in self.dimensions]
+
+    @classmethod
+    def from_transactions(cls, df, error=None):
+        """
+        Aggregate the prepared transactions into a store
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Prepared sales dataframe
+        error : float, optional
+            Relative standard error allowed on the distinct counts whose
+            exact computation costs more than a sketch (see
+            `SHARED_PAIR_COST`); None keeps them all exact
+
+        Returns:
+        --------
+        KPIStore
+        """
+
+        precision = None if error is None else precision_for(error)
+        groups, codes = _roll_up(df)
+        counters = {
+            name: _bounded(DistinctCounter.build(distinct_keys(df[column]), codes, len(groups)),
+                           precision)
+            for name, column in DISTINCT_MEASURES.items() if column in df.columns
+        }
+        return cls(groups, counters, precision=precision)
+
+    def extended(self, rows):
+        """
+        Store after adding transactions to the ones it was built from
+
+        Groups already present add up the new measures; the others are
+        appended, so existing group codes stay valid in the counters.
+
+        Parameters:
+        -----------
+        rows : pd.DataFrame
+            New prepared transactions, with the dtypes of the frame the
+            store was built from
+
+        Returns:
+        --------
+        KPIStore
+            New unfiltered store; `self` is left untouched
+        """
+
+        if rows.empty:
+            return self
+        added, codes = _roll_up(rows)
+        groups, added = unify_schema(self.groups, added)
+
+        existing = pd.MultiIndex.from_frame(groups[self.dimensions])
+        matches = existing.get_indexer(pd.MultiIndex.from_frame(added[self.dimensions]))
+        found = matches >= 0
+        # Code of every added group in the extended store
+        matches[~found] = len(groups) + np.arange((~found).sum())
+
+        measures = {}
+        for measure in self.measures:
+            # Sums come back in the narrow dtype of the rows when they fit
+            # (e.g. int8 quantities); accumulate in 64 bits so they cannot wrap
+            dtype = np.result_type(groups[measure].dtype, added[measure].dtype, np.int64)
+            values = groups[measure].to_numpy().astype(dtype)
+            values[matches[found]] += added[measure].to_numpy()[found]
+            measures[measure] = values
+        groups = pd.concat([groups.assign(**measures), added[~found]], ignore_index=True)
+
+        codes = matches[codes]
+        counters = {
+            name: _bounded(
+                counter.extended(distinct_keys(rows[DISTINCT_MEASURES[name]]), codes, len(groups)),
+                self.precision,
+            )
+            for name, counter in self.counters.items()
+        }
+        return KPIStore(groups, counters, precision=self.precision)
+
+    def filter(self, filters=None, ranges=None):
+        """
+        Restrict the store to the groups matching the filters
+
+        Parameters:
+        -----------
+        filters : dict, optional
+            dimension -> value or list-like of values, as in `filter_frame`
+        ranges : dict, optional
+            dimension -> (low, high), both inclusive
+
+        Returns:
+        --------
+        KPIStore
+            Store sharing the aggregates of `self`, with a narrower selection
+        """
+
+        active = [c for c, value in (filters or {}).items() if is_active(value)]
+        self._check_columns(active + list(ranges or {}))
+        mask = build_mask(self.groups, filters, ranges)
+        if mask is None:
+            return self
+        if self.selected is not None:
+            mask &= self.selected
+        return KPIStore(self.groups, self.counters, mask, self.precision)
+
+    @property
+    def approximate(self):
+        """Names of the distinct counts estimated by HyperLogLog"""
+        return [name for name, counter in self.counters.items() if isinstance(counter, HyperLogLog)]
+
+    @property
+    def empty(self):
+        """Whether no transaction is selected"""
+        return self.totals()[COUNT_MEASURE] == 0
+
+    def totals(self):
+        """
+        Every KPI over the selected groups
+
+        Returns:
+        --------
+        dict
+            measure -> sum (`transactions` counts the rows), and
+            `DISTINCT_MEASURES` name -> distinct count
+        """
+
+        totals = {}
+        for measure in self.measures:
+            values = self.groups[measure].to_numpy()
+            totals[measure] = (values if self.selected is None else values[self.selected]).sum()
+        for name, counter in self.counters.items():
+            totals[name] = counter.count(self.selected)
+        return totals
+
+    def query(self, by, measures=('Total_Bill',)):
+        """
+        Aggregate the measures of the selected groups over the given dimensions
+
+        Parameters:
+        -----------
+        by : str or list
+            Dimension(s) to group by
+        measures : list, optional
+            Sum measures, plus `DISTINCT_MEASURES` names for the distinct
+            count within each combination of `by`
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per observed combination of `by`, sorted by it
+        """
+
+        by = [by] if isinstance(by, str) else list(by)
+        measures = list(measures)
+        self._check_columns(by)
+        missing = [m for m in measures if m not in self.measures and m not in self.counters]
+        if missing:
+            raise ValueError(f"Not a KPI store measure: {', '.join(missing)}")
+
+        rows = np.arange(len(self.groups)) if self.selected is None else np.flatnonzero(self.selected)
+        grouped = self.groups.take(rows).groupby(by, observed=True)
+        sums = [m for m in measures if m in self.measures]
+        result = grouped[sums].sum().reset_index()
+
+        # Distinct counts: label every selected group with its output row
+        labels = np.full(len(self.groups), -1, dtype=np.int64)
+        labels[rows] = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        for name in measures:
+            if name in self.counters:
+                result[name] = self.counters[name].count_by(labels, len(result))
+        return result[by + measures]
+
+    def _check_columns(self, columns):
+        missing = [c for c in columns if c not in self.dimensions]
+        if missing:
+            raise ValueError(f"Not a KPI store dimension: {', '.join(missing)}")
+
+
+def _bounded(counter, precision):
+    # Exact while cheaper than merging the sketches of every group; beyond
+    # that, a sketch of the same pairs (the exact state is dropped)
+    if (precision is None or isinstance(counter, HyperLogLog)
+            or counter.shared * SHARED_PAIR_COST <= counter.n_groups << precision):
+        return counter
+    return HyperLogLog.build(*counter.pairs(), counter.n_groups, precision)
+
+
+def _roll_up(df):
+    # Groups in order of first appearance and the group code of every row
+    keys = [c for c in KPI_KEYS + KPI_ATTRIBUTES if c in df.columns]
+    measures = [m for m in KPI_MEASURES if m in df.columns] + [COUNT_MEASURE]
+    grouped = df.groupby(keys, observed=True, dropna=False, sort=False)
+    groups = grouped.agg(**measure_aggregations(measures)).reset_index()
+    return groups, grouped.ngroup().to_numpy()
+
+
+def kpi_totals(source):
+    """
+    KPI totals from either raw transactions or a (filtered) `KPIStore`
+
+    Parameters:
+    -----------
+    source : pd.DataFrame or KPIStore
+        Prepared (filtered) transactions, or the store filtered the same way
+
+    Returns:
+    --------
+    dict
+        See `KPIStore.totals`
+    """
+
+    if isinstance(source, KPIStore):
+        return source.totals()
+
+    totals = {m: source[m].sum() for m in KPI_MEASURES}
+    totals[COUNT_MEASURE] = len(source)
+    for name, column in DISTINCT_MEASURES.items():
+        totals[name] = source[column].nunique()
+    return totals
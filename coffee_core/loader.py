@@ -0,0 +1,212 @@
+"""
+Loading and preparation of the coffee shop sales CSV
+
+`prepare_sales` is the single preparation path shared by every dashboard:
+it parses dates and times, derives the calendar columns the dashboards
+use, applies the dtype schema and sorts the rows chronologically.
+`load_sales` wraps it with the columnar cache and, given a chunk size,
+reads the CSV a chunk at a time to bound the memory of the load (see
+`coffee_core.stream`).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from coffee_core.binning import bin_time_periods, day_names, month_names, weekend_flags
+from coffee_core.cache import file_fingerprint, read_cache, write_cache
+from coffee_core.dates import parse_dates
+from coffee_core.schema import apply_schema
+from coffee_core.stream import concat_prepared
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Can be overridden per deployment without touching the dashboards
+DEFAULT_DATA_PATH = os.environ.get(
+    'COFFEE_SALES_CSV',
+    os.path.join(ROOT_DIR, 'Data', 'coffee_shop_sales.csv')
+)
+
+NUMERIC_COLUMNS = ['transaction_qty', 'unit_price', 'Total_Bill', 'Hour', 'Month', 'Day of Week']
+
+
+def load_sales(filepath=None, use_cache=True, cache_dir=None, chunksize=None):
+    """
+    Load the prepared sales dataframe
+
+    Parameters:
+    -----------
+    filepath : str, optional
+        Path to the CSV file, defaults to `DEFAULT_DATA_PATH`
+    use_cache : bool, optional
+        Reuse (and refresh) the columnar cache of the prepared frame
+    cache_dir : str, optional
+        Cache directory, defaults to a `.cache` folder next to the CSV
+    chunksize : int, optional
+        Read and prepare the CSV this many rows at a time (see
+        `read_sales`); None reads it at once
+
+    Returns:
+    --------
+    pd.DataFrame
+        Prepared dataframe with proper dtypes and calculated fields
+    """
+
+    if filepath is None:
+        filepath = DEFAULT_DATA_PATH
+
+    if not use_cache:
+        return read_sales(filepath, chunksize)
+
+    cached = read_cache(filepath, cache_dir)
+    if cached is not None:
+        return cached
+
+    # Fingerprint before reading so a file that changes mid-parse
+    # invalidates the entry on the next start
+    fingerprint = file_fingerprint(filepath)
+    df = read_sales(filepath, chunksize)
+    write_cache(df, filepath, cache_dir, fingerprint=fingerprint)
+
+    return df
+
+
+def read_sales(filepath, chunksize=None):
+    """
+    Read and prepare the CSV, at once or in chunks
+
+    In chunks, each chunk is prepared right after being parsed, so only
+    one chunk of raw string columns is in memory at a time, and the
+    prepared chunks are concatenated column by column (`concat_prepared`).
+    The result is the same frame either way.
+
+    Parameters:
+    -----------
+    filepath : str
+        Path to the CSV file
+    chunksize : int, optional
+        Rows per chunk; None reads the file at once
+
+    Returns:
+    --------
+    pd.DataFrame
+        Prepared dataframe
+    """
+
+    if not chunksize:
+        return prepare_sales(pd.read_csv(filepath))
+    return concat_prepared(iter_prepared_chunks(filepath, chunksize))
+
+
+def iter_prepared_chunks(filepath, chunksize):
+    """
+    Prepared chunks of `chunksize` rows of the CSV, in file order
+
+    Each chunk is sorted on its own; feed them to `concat_prepared` for
+    the full frame or to `coffee_core.stream.fold_chunks` for aggregates.
+    """
+
+    with pd.read_csv(filepath, chunksize=chunksize) as reader:
+        for raw in reader:
+            yield prepare_sales(raw)
+
+
+def prepare_sales(df, compact=True):
+    """
+    Prepare a raw coffee shop sales dataframe as read from the CSV
+
+    Calendar columns that the export already carries (`Month Name`,
+    `Day Name`, `Hour`, `Month`, `Day of Week`, `Total_Bill`) are kept
+    and only derived when missing.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Raw dataframe
+    compact : bool, optional
+        Apply the shared dtype schema (categoricals, downcast numerics)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Prepared dataframe sorted by `transaction_datetime`
+    """
+
+    df.columns = df.columns.str.strip()
+
+    # Handle both date formats in the data: formats detected once and every
+    # distinct date parsed once (see coffee_core.dates); unparseable dates
+    # raise with the offending rows
+    df['transaction_date'], _ = parse_dates(df['transaction_date'])
+    dates = df['transaction_date'].dt
+
+    # Keep time of day as timedelta64 (offset from midnight) so the
+    # datetime is plain date + offset arithmetic, with no Python objects
+    df['transaction_time'] = parse_time_of_day(df['transaction_time'])
+    df['transaction_datetime'] = df['transaction_date'] + df['transaction_time']
+
+    # Labels are binned from the calendar numbers (see coffee_core.binning)
+    if 'Month Name' not in df.columns:
+        df['Month Name'] = month_names(dates.month)
+    if 'Day Name' not in df.columns:
+        df['Day Name'] = day_names(dates.dayofweek)
+    if 'Hour' not in df.columns:
+        df['Hour'] = df['transaction_time'] // pd.Timedelta(hours=1)
+    if 'Month' not in df.columns:
+        df['Month'] = dates.month
+    if 'Day of Week' not in df.columns:
+        df['Day of Week'] = dates.dayofweek
+    df['Day'] = dates.day
+
+    # Ensure numeric columns are proper type
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Add calculated fields
+    df['revenue'] = df['transaction_qty'] * df['unit_price']
+    if 'Total_Bill' not in df.columns:
+        df['Total_Bill'] = df['revenue']
+
+    # Add time-based features
+    df['week'] = dates.isocalendar().week
+    df['quarter'] = dates.quarter
+    df['is_weekend'] = weekend_flags(df['Day of Week'])  # Saturday=5, Sunday=6
+
+    # Add time period classification, one vectorized binning of the hours
+    df['time_period'] = bin_time_periods(df['Hour'])
+
+    # Categoricals and downcast numerics (see coffee_core.schema)
+    if compact:
+        df = apply_schema(df)
+
+    return df.sort_values('transaction_datetime', kind='stable').reset_index(drop=True)
+
+
+def parse_time_of_day(times):
+    """
+    Parse 'HH:MM:SS' strings into a timedelta64 Series (offset from midnight)
+
+    A day has at most 86,400 distinct times, so each distinct string is
+    parsed once and the result is broadcast back with the factorized codes.
+    Missing values become NaT.
+
+    Parameters:
+    -----------
+    times : pd.Series
+        Raw time-of-day strings
+
+    Returns:
+    --------
+    pd.Series
+        timedelta64[ns] Series aligned with `times`
+    """
+
+    codes, uniques = pd.factorize(times)
+    # Trailing NaT so the -1 code of missing values maps onto it
+    parsed = np.append(
+        pd.to_timedelta(uniques).to_numpy(),
+        np.timedelta64('NaT', 'ns')
+    )
+    return pd.Series(parsed[codes], index=times.index, name=times.name)
@@ -0,0 +1,101 @@
+"""
+Bounded in-memory cache for rendered views and figures
+
+Dashboard views depend on a handful of inputs (the route, a month, the
+dataset version), so their serialized output can be memoized. `LRUCache`
+keeps at most `maxsize` entries and evicts the least recently used one
+when full. Keys should include the dataset version so entries built from
+stale data are never served; `clear` drops everything at once after a
+reload.
+"""
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 128
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache
+
+    Parameters:
+    -----------
+    maxsize : int, optional
+        Maximum number of entries kept; must be positive
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the cached value for `key` and mark it as recently used"""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store `value`, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for `key`, computing and storing it on a miss
+
+        Parameters:
+        -----------
+        key : hashable
+            Cache key
+        compute : callable
+            Called without arguments on a miss; its result is cached
+
+        Returns:
+        --------
+        object
+            The cached or freshly computed value
+        """
+
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Computed outside the lock: concurrent misses on the same key
+            # may both compute, but never block unrelated lookups
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (the hit/miss counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Entry count, capacity and hit/miss counters"""
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,230 @@
+"""
+Month x category x store rollup with period-over-period deltas
+
+The monthly views compare the selected month with the one before it, by
+category. They used to filter the full frame a second time for the
+previous month and group it again, and found that month in a hardcoded
+January-June list. `PeriodRollup` keeps instead one row per (month,
+category, store) with the sums of the month, the sums of the same group
+in the month before and their difference, so "current vs previous" by
+category or store is a group-by over a few hundred rows.
+
+Months are calendar periods taken from `transaction_date`, not month
+names, so data spanning more than one year (or with gaps) still compares
+each month with the calendar month right before it. Windows longer than
+one month (a quarter against the previous quarter, ...) are summed from
+the same rows.
+
+The rollup is built once from the prepared transactions and extended with
+appended rows (`PeriodRollup.extended`), like the sales cube.
+"""
+
+import pandas as pd
+
+from coffee_core.cube import COUNT_MEASURE, measure_aggregations
+from coffee_core.filters import filter_frame
+from coffee_core.schema import MONTH_ORDER, unify_schema
+
+PERIOD_COLUMN = 'period'
+PERIOD_KEYS = ['product_category', 'store_location']
+PERIOD_MEASURES = ['Total_Bill', 'transaction_qty', COUNT_MEASURE]
+
+PREVIOUS_SUFFIX = '_previous'
+DELTA_SUFFIX = '_delta'
+
+
+class PeriodRollup:
+    """
+    Sales per (month, category, store) with the previous month alongside
+
+    Parameters:
+    -----------
+    facts : pd.DataFrame
+        Rollup rows, as built by `from_transactions`: `period`, `Month Name`,
+        the keys and, for every measure m, m, m_previous and m_delta
+    """
+
+    def __init__(self, facts):
+        self.facts = facts
+        # Months with sales, in calendar order
+        self.periods = list(facts.loc[facts[COUNT_MEASURE] > 0, PERIOD_COLUMN].drop_duplicates())
+
+    @classmethod
+    def from_transactions(cls, df):
+        """
+        Roll the prepared transactions up by month, category and store
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Prepared sales dataframe
+
+        Returns:
+        --------
+        PeriodRollup
+        """
+
+        return cls(_with_deltas(_roll_up(df)))
+
+    def extended(self, rows):
+        """
+        Rollup after adding transactions to the ones it was built from
+
+        Only the new rows are grouped; they are added to the monthly sums,
+        and the deltas are recomputed over the rollup itself, a few rows
+        per month.
+
+        Returns:
+        --------
+        PeriodRollup
+            New rollup; `self` is left untouched
+        """
+
+        current = self.facts.loc[
+            self.facts[COUNT_MEASURE] > 0, [PERIOD_COLUMN, *PERIOD_KEYS, *PERIOD_MEASURES]
+        ]
+        base, added = unify_schema(current, _roll_up(rows))
+        sums = (
+            pd.concat([base, added], ignore_index=True)
+            .groupby([PERIOD_COLUMN, *PERIOD_KEYS], observed=True, sort=True)[PERIOD_MEASURES]
+            .sum()
+            .reset_index()
+        )
+        return PeriodRollup(_with_deltas(sums))
+
+    def __len__(self):
+        return len(self.facts)
+
+    def month_names(self):
+        """Names of the months with sales, in calendar order and without repeats"""
+        return list(dict.fromkeys(_month_name(period) for period in self.periods))
+
+    def period_of(self, month):
+        """
+        Latest month with sales matching `month`
+
+        Parameters:
+        -----------
+        month : str or pd.Period
+            Month name ('March') or monthly period
+
+        Returns:
+        --------
+        pd.Period or None
+        """
+
+        if isinstance(month, pd.Period):
+            return month if month in self.periods else None
+        matches = [period for period in self.periods if _month_name(period) == month]
+        return matches[-1] if matches else None
+
+    def previous_month(self, month):
+        """
+        Name of the calendar month before `month`, if it had sales
+
+        Returns:
+        --------
+        str or None
+            None when `month` has no sales or the month before has none
+            (the first month of the data)
+        """
+
+        period = self.period_of(month)
+        if period is None or period - 1 not in self.periods:
+            return None
+        return _month_name(period - 1)
+
+    def compare(self, month, months=1, by='product_category', filters=None):
+        """
+        Sums of a window of months next to the window of the same length before it
+
+        Parameters:
+        -----------
+        month : str or pd.Period
+            Last month of the current window (see `period_of`)
+        months : int, optional
+            Length of both windows in months
+        by : str or list, optional
+            Columns among `PERIOD_KEYS` to group by
+        filters : dict, optional
+            Column -> value(s) on `PERIOD_KEYS`, as in `filter_frame`
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per observed value of `by` in either window with, for
+            every measure m, m (current window), m_previous and m_delta.
+            Empty when `month` has no sales or the previous window has none
+        """
+
+        if months < 1:
+            raise ValueError(f"months must be at least 1, got {months!r}")
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = [c for c in by + list(filters or {}) if c not in PERIOD_KEYS]
+        if unknown:
+            raise ValueError(f"Not rollup keys: {unknown}")
+
+        columns = by + [m + suffix for m in PERIOD_MEASURES
+                        for suffix in ('', PREVIOUS_SUFFIX, DELTA_SUFFIX)]
+        period = self.period_of(month)
+        if period is None:
+            return pd.DataFrame(columns=columns)
+
+        facts = filter_frame(self.facts, filters)
+        if months == 1:
+            # The precomputed previous-month columns answer it directly
+            window = facts[facts[PERIOD_COLUMN] == period]
+            comparison = window.groupby(by, observed=True)[columns[len(by):]].sum()
+        else:
+            current = _window_sums(facts, period, months, by)
+            previous = _window_sums(facts, period - months, months, by)
+            comparison = current.join(previous.add_suffix(PREVIOUS_SUFFIX), how='outer').fillna(0)
+            for m in PERIOD_MEASURES:
+                comparison[m + DELTA_SUFFIX] = comparison[m] - comparison[m + PREVIOUS_SUFFIX]
+
+        if not comparison[COUNT_MEASURE + PREVIOUS_SUFFIX].sum():
+            return pd.DataFrame(columns=columns)
+        active = (comparison[COUNT_MEASURE] > 0) | (comparison[COUNT_MEASURE + PREVIOUS_SUFFIX] > 0)
+        return comparison[active].reset_index()[columns]
+
+
+def _month_name(period):
+    return MONTH_ORDER[period.month - 1]
+
+
+def _roll_up(df):
+    measures = [m for m in PERIOD_MEASURES if m == COUNT_MEASURE or m in df.columns]
+    periods = df['transaction_date'].dt.to_period('M').rename(PERIOD_COLUMN)
+    return (
+        df.groupby([periods, *(df[k] for k in PERIOD_KEYS)], observed=True, sort=True)
+        .agg(**measure_aggregations(measures))
+        .reset_index()
+    )
+
+
+def _with_deltas(sums):
+    # Every group shifted one month forward is the "previous" side of the
+    # next month; the outer merge keeps groups that sold in only one of them
+    keys = [PERIOD_COLUMN, *PERIOD_KEYS]
+    shifted = sums.assign(**{PERIOD_COLUMN: sums[PERIOD_COLUMN] + 1})
+    facts = sums.merge(shifted, on=keys, how='outer', suffixes=('', PREVIOUS_SUFFIX))
+    facts = facts[facts[PERIOD_COLUMN] <= sums[PERIOD_COLUMN].max()]
+
+    for m in PERIOD_MEASURES:
+        dtype = sums[m].dtype
+        facts[m] = facts[m].fillna(0).astype(dtype)
+        facts[m + PREVIOUS_SUFFIX] = facts[m + PREVIOUS_SUFFIX].fillna(0).astype(dtype)
+        facts[m + DELTA_SUFFIX] = facts[m] - facts[m + PREVIOUS_SUFFIX]
+    facts.insert(1, 'Month Name', pd.Categorical(
+        [_month_name(p) for p in facts[PERIOD_COLUMN]], categories=MONTH_ORDER, ordered=True
+    ))
+
+    measures = [m + suffix for m in PERIOD_MEASURES for suffix in ('', PREVIOUS_SUFFIX, DELTA_SUFFIX)]
+    return facts.sort_values(keys, kind='stable').reset_index(drop=True)[
+        [PERIOD_COLUMN, 'Month Name', *PERIOD_KEYS, *measures]
+    ]
+
+
+def _window_sums(facts, period, months, by):
+    in_window = (facts[PERIOD_COLUMN] > period - months) & (facts[PERIOD_COLUMN] <= period)
+    return facts[in_window].groupby(by, observed=True)[PERIOD_MEASURES].sum()
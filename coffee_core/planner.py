@@ -0,0 +1,134 @@
+"""
+Shared-pass aggregation for dashboards with many charts
+
+A dashboard callback typically feeds the same filtered data to a dozen
+chart builders, each grouping it again by its own keys. An
+`AggregationPlan` collects those (keys, measures) requests up front and
+scans the data once: it groups by the union of all requested keys with
+the union of all measures. Every request is then a roll-up of that small
+base table, which is exact because all measures are additive (sums and
+transaction counts). When the source is a `SalesCube`, its facts already
+are such a base and the data is not scanned at all.
+"""
+
+import pandas as pd
+
+from coffee_core.cube import SalesCube, aggregate, measure_aggregations
+
+
+def _normalize(by, measures):
+    by = (by,) if isinstance(by, str) else tuple(by)
+    return by, tuple(measures)
+
+
+def rollup(base, by, measures):
+    """Re-aggregate an additive base table to coarser keys"""
+    by, measures = _normalize(by, measures)
+    if not by:
+        return pd.DataFrame({m: [base[m].sum()] for m in measures})
+    return base.groupby(list(by), observed=True)[list(measures)].sum().reset_index()
+
+
+class AggregationPlan:
+    """
+    Set of aggregations to compute together
+
+    Parameters:
+    -----------
+    requests : list, optional
+        (by, measures) pairs, with the same meaning as in `aggregate`
+    """
+
+    def __init__(self, requests=None):
+        self.requests = []
+        for by, measures in requests or []:
+            self.add(by, measures)
+
+    def add(self, by, measures=('Total_Bill',)):
+        """Register an aggregation; duplicates are computed once"""
+        request = _normalize(by, measures)
+        if request not in self.requests:
+            self.requests.append(request)
+        return self
+
+    @property
+    def keys(self):
+        """Union of the requested group keys, in first-seen order"""
+        return list(dict.fromkeys(k for by, _ in self.requests for k in by))
+
+    @property
+    def measures(self):
+        """Union of the requested measures, in first-seen order"""
+        return list(dict.fromkeys(m for _, measures in self.requests for m in measures))
+
+    def execute(self, source):
+        """
+        Compute every registered aggregation
+
+        Parameters:
+        -----------
+        source : pd.DataFrame or SalesCube
+            Filtered transactions or filtered cube
+
+        Returns:
+        --------
+        PlannedAggregates
+            Results that chart builders read through `aggregate`
+        """
+
+        if isinstance(source, SalesCube):
+            base = source.facts
+        else:
+            # The single pass over the rows; missing keys are kept as their
+            # own groups so coarser roll-ups still see those rows
+            base = (
+                source.groupby(self.keys, observed=True, dropna=False)
+                .agg(**measure_aggregations(self.measures))
+                .reset_index()
+            )
+
+        results = {
+            (by, measures): rollup(base, by, measures)
+            for by, measures in self.requests
+        }
+        return PlannedAggregates(results, base, source)
+
+
+class PlannedAggregates:
+    """
+    Precomputed aggregations, queried like a `SalesCube`
+
+    Passing this object instead of a dataframe to a chart builder makes
+    its `aggregate` call a dictionary lookup. Aggregations that were not
+    planned are rolled up from the base table when possible and computed
+    from the original source otherwise.
+
+    Parameters:
+    -----------
+    results : dict
+        (by, measures) -> aggregated dataframe
+    base : pd.DataFrame
+        Additive base table the results were rolled up from
+    source : pd.DataFrame or SalesCube
+        Data the plan was executed on
+    """
+
+    def __init__(self, results, base, source):
+        self.results = results
+        self.base = base
+        self.source = source
+
+    def query(self, by, measures=('Total_Bill',)):
+        """Return (a copy of) the aggregation of `measures` by `by`"""
+        request = _normalize(by, measures)
+        # Copies are cheap at this size and let builders add columns freely
+        if request in self.results:
+            return self.results[request].copy()
+
+        by, measures = request
+        if set(by) <= set(self.base.columns) and set(measures) <= set(self.base.columns):
+            result = rollup(self.base, by, measures)
+        else:
+            result = aggregate(self.source, list(by), list(measures))
+        self.results[request] = result
+        return result.copy()
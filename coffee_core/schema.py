@@ -0,0 +1,211 @@
+"""
+Declared dtype schema for the prepared sales dataframe
+
+Low-cardinality text columns become `category` and small integer columns
+are downcast, which shrinks the resident frame of every dashboard worker
+and makes groupbys on those columns cheaper. The schema lists every
+spelling used across the dashboards (`Month Name`, `Month_Name`,
+`month_name`, ...) and only touches the columns a frame actually has.
+"""
+
+import numpy as np
+import pandas as pd
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIME_PERIOD_ORDER = ['Morning', 'Lunch', 'Afternoon', 'Evening', 'Night']
+
+# Column -> declared category order (None keeps the sorted observed values)
+CATEGORY_COLUMNS = {
+    'store_location': None,
+    'product_category': None,
+    'product_type': None,
+    'product_detail': None,
+    'Size': None,
+    'Month Name': MONTH_ORDER,
+    'Month_Name': MONTH_ORDER,
+    'month_name': MONTH_ORDER,
+    'Day Name': DAY_ORDER,
+    'Day_Name': DAY_ORDER,
+    'day_name': DAY_ORDER,
+    'time_period': TIME_PERIOD_ORDER,
+}
+
+# Column -> target integer dtype, used when every value fits
+INTEGER_COLUMNS = {
+    'transaction_id': 'int32',
+    'transaction_qty': 'int8',
+    'store_id': 'int16',
+    'product_id': 'int16',
+    'Hour': 'int8',
+    'hour': 'int8',
+    'Month': 'int8',
+    'month': 'int8',
+    'Day': 'int8',
+    'Day of Week': 'int8',
+    'day_of_week': 'int8',
+    'week': 'int8',
+    'quarter': 'int8',
+}
+
+# Per-unit prices only: totals such as Total_Bill and revenue stay float64
+# because they are summed over the whole frame for the KPIs
+FLOAT32_COLUMNS = ['unit_price']
+
+
+def to_category(series, order=None):
+    """
+    Convert a column to `category`
+
+    With a declared order the categories are the full declared list
+    (ordered, so sorting follows the calendar) followed by any unexpected
+    observed value, so nothing is silently turned into NaN.
+    """
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    if order is None:
+        return series.astype('category')
+
+    extra = sorted(set(series.dropna().unique()) - set(order))
+    dtype = pd.CategoricalDtype(categories=list(order) + extra, ordered=True)
+    return series.astype(dtype)
+
+
+def downcast_integer(series, target):
+    """
+    Downcast an integer-valued column to `target` when every value fits
+
+    Columns with missing or non-integral values are returned unchanged;
+    integer columns that overflow `target` get the smallest signed dtype
+    that holds them instead.
+    """
+
+    if series.isna().any() or not pd.api.types.is_numeric_dtype(series):
+        return series
+    values = series.to_numpy()
+    if not pd.api.types.is_integer_dtype(values.dtype):
+        if not np.array_equal(values, np.round(values)):
+            return series
+    if series.empty:
+        return series.astype(target)
+
+    info = np.iinfo(target)
+    if info.min <= values.min() and values.max() <= info.max:
+        return series.astype(target)
+    return pd.to_numeric(series.astype('int64'), downcast='integer')
+
+
+def downcast_float(series):
+    """Cast a float column to float32 when the round trip is exact"""
+    if not pd.api.types.is_float_dtype(series) or series.dtype == np.float32:
+        return series
+    values = series.to_numpy()
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def apply_schema(df):
+    """
+    Apply the declared dtypes to the columns present in a dataframe
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Prepared sales dataframe (modified in place)
+
+    Returns:
+    --------
+    pd.DataFrame
+        The same dataframe with compact dtypes
+    """
+
+    for col, order in CATEGORY_COLUMNS.items():
+        if col in df.columns:
+            df[col] = to_category(df[col], order)
+
+    for col, target in INTEGER_COLUMNS.items():
+        if col in df.columns:
+            df[col] = downcast_integer(df[col], target)
+
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = downcast_float(df[col])
+
+    return df
+
+
+def unify_schema(base, extra):
+    """
+    Give two prepared frames the same dtypes so they concatenate losslessly
+
+    Categorical columns get the categories `apply_schema` would give the
+    concatenated frame (declared order, then sorted observed values), so
+    appending rows yields the same dtypes as preparing everything at once.
+    Integer columns of `extra` take the dtype of `base` when every value
+    fits.
+
+    Parameters:
+    -----------
+    base : pd.DataFrame
+        Frame whose dtypes are kept
+    extra : pd.DataFrame
+        Frame to conform, e.g. newly prepared rows
+
+    Returns:
+    --------
+    tuple of pd.DataFrame
+        (base, extra); `base` is copied only if a categorical grew
+    """
+
+    extra = extra.copy()
+    grown = {}
+    for col in base.columns.intersection(extra.columns):
+        dtype = base[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            known = set(dtype.categories)
+            new_values = [v for v in pd.unique(extra[col].dropna().to_numpy()) if v not in known]
+            if new_values:
+                declared = list(CATEGORY_COLUMNS.get(col) or [])
+                extras = sorted((known | set(new_values)) - set(declared))
+                dtype = pd.CategoricalDtype(declared + extras, ordered=dtype.ordered)
+                grown[col] = pd.Categorical(base[col], dtype=dtype)
+            if extra[col].dtype != dtype:
+                extra[col] = extra[col].astype(dtype)
+        elif pd.api.types.is_integer_dtype(dtype):
+            extra[col] = downcast_integer(extra[col], dtype)
+
+    if grown:
+        base = base.assign(**grown)
+    return base, extra
+
+
+def memory_report(before, after):
+    """
+    Compare the deep memory usage of a frame before and after the schema
+
+    Parameters:
+    -----------
+    before, after : pd.DataFrame
+        The frame before and after `apply_schema`
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per column plus a 'TOTAL' row, with dtypes and bytes
+    """
+
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.reindex(before.columns).astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'bytes_after': after.memory_usage(deep=True, index=False).reindex(before.columns),
+    })
+    report.loc['TOTAL'] = [
+        '', '', report['bytes_before'].sum(), report['bytes_after'].sum()
+    ]
+    report['saved_pct'] = (1 - report['bytes_after'] / report['bytes_before']) * 100
+    return report
@@ -0,0 +1,110 @@
+"""
+Bounded-memory assembly of a CSV read in chunks
+
+Reading the whole CSV at once keeps every raw column as Python strings
+while the prepared, compact frame is being built, so loading needs
+several times the memory of the result. Read with a chunk size (see
+`coffee_core.loader.iter_prepared_chunks`), each chunk is prepared as
+soon as it is parsed and its raw strings are dropped, then the prepared
+chunks are either:
+
+- concatenated by `concat_prepared` into the frame `prepare_sales` would
+  have produced from the whole file, one column at a time, so the peak
+  stays close to the size of the compact result; or
+- folded by `fold_chunks` into pre-aggregates (`SalesCube`, `KPIStore`,
+  `PeriodRollup`, ...) without ever keeping the rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from coffee_core.schema import CATEGORY_COLUMNS, downcast_integer
+
+# Rows parsed and prepared at a time when a chunk size is requested
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def concat_prepared(chunks, order_by='transaction_datetime'):
+    """
+    Concatenate prepared chunks into a single prepared frame
+
+    The result has the rows in `order_by` order (ties in chunk order) and
+    the dtypes of preparing all the rows at once: categoricals get the
+    declared categories followed by the sorted values observed in any
+    chunk, and integer columns the smallest dtype that fits every chunk.
+
+    Parameters:
+    -----------
+    chunks : iterable of pd.DataFrame
+        Prepared chunks, in file order, with the same columns
+    order_by : str, optional
+        Column the rows are sorted by
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+
+    chunks = list(chunks)
+    chunks = [chunk for chunk in chunks if not chunk.empty] or chunks[:1]
+    if len(chunks) <= 1:
+        return chunks[0] if chunks else pd.DataFrame()
+
+    order = np.argsort(
+        np.concatenate([chunk[order_by].to_numpy() for chunk in chunks]), kind='stable'
+    )
+    columns = {}
+    for col in chunks[0].columns:
+        # Built one column at a time, dropping the chunks' copy as it goes
+        parts = [chunk.pop(col) for chunk in chunks]
+        column = pd.concat(_conformed(col, parts), ignore_index=True)
+        columns[col] = column.take(order).reset_index(drop=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+def fold_chunks(chunks, aggregates):
+    """
+    Build pre-aggregates from prepared chunks without keeping the rows
+
+    Parameters:
+    -----------
+    chunks : iterable of pd.DataFrame
+        Prepared chunks
+    aggregates : dict
+        name -> class with `from_transactions(df)` and `extended(rows)`,
+        e.g. {'cube': SalesCube, 'kpis': KPIStore}
+
+    Returns:
+    --------
+    dict
+        name -> aggregate of every row of every chunk; None when there
+        are no chunks
+    """
+
+    built = dict.fromkeys(aggregates)
+    for chunk in chunks:
+        for name, cls in aggregates.items():
+            built[name] = (
+                cls.from_transactions(chunk) if built[name] is None else built[name].extended(chunk)
+            )
+    return built
+
+
+def _conformed(col, parts):
+    # Same dtype for every part so concat neither loses categories nor
+    # falls back to object
+    dtypes = {part.dtype for part in parts}
+    if len(dtypes) == 1:
+        return parts
+    if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        observed = set().union(*(set(dtype.categories) for dtype in dtypes))
+        declared = list(CATEGORY_COLUMNS.get(col) or [])
+        dtype = pd.CategoricalDtype(
+            declared + sorted(observed - set(declared)),
+            ordered=any(dtype.ordered for dtype in dtypes)
+        )
+        return [part.astype(dtype) for part in parts]
+    if all(pd.api.types.is_integer_dtype(dtype) for dtype in dtypes):
+        target = np.result_type(*dtypes)
+        return [downcast_integer(part, target) for part in parts]
+    return parts
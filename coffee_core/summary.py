@@ -0,0 +1,41 @@
+"""
+Aggregates over the whole dataset, independent of any filter
+
+A few charts always describe the full dataset (the monthly trend, the
+daily sales of every store over time) whatever month is selected. Their
+group-bys are among the most expensive ones, yet the result only changes
+when the data does. `global_aggregates` computes them once, so front-ends
+can store the result next to the frame at load (and reload) time and
+their views only read it.
+"""
+
+from coffee_core.cube import aggregate
+
+# name -> (group keys, measures)
+GLOBAL_AGGREGATES = {
+    'monthly': (['Month Name'], ['Total_Bill']),
+    'daily_by_store': (['transaction_date', 'store_location'], ['Total_Bill']),
+}
+
+
+def global_aggregates(source):
+    """
+    Compute every aggregate in `GLOBAL_AGGREGATES`
+
+    Parameters:
+    -----------
+    source : pd.DataFrame or SalesCube
+        The full, unfiltered transactions or the cube built from them
+
+    Returns:
+    --------
+    dict
+        name -> aggregated dataframe, one row per observed combination of
+        the keys in chronological order (`Month Name` is an ordered
+        categorical). Views must treat the frames as read-only
+    """
+
+    return {
+        name: aggregate(source, by, measures)
+        for name, (by, measures) in GLOBAL_AGGREGATES.items()
+    }
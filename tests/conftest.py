@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# coffee_core lives at the repository root, as for the dashboards
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from coffee_core.loader import prepare_sales  # noqa: E402
+
+
+def raw_sales(rows, first_id=1):
+    """Raw sales frame, as read from the CSV, from (date, time, qty, store, category, product) tuples"""
+    raw = pd.DataFrame(rows, columns=[
+        'transaction_date', 'transaction_time', 'transaction_qty',
+        'store_location', 'product_category', 'product_detail',
+    ])
+    raw.insert(0, 'transaction_id', range(first_id, first_id + len(raw)))
+    raw['unit_price'] = 2.5
+    return raw
+
+
+@pytest.fixture
+def make_sales():
+    """Prepared sales frame from (date, time, qty, store, category, product) tuples"""
+
+    def make(rows, first_id=1):
+        return prepare_sales(raw_sales(rows, first_id))
+
+    return make
+
+
+@pytest.fixture
+def write_sales():
+    """Write (date, time, qty, store, category, product) tuples to a sales CSV, or append them"""
+
+    def write(path, rows, first_id=1, append=False):
+        raw_sales(rows, first_id).to_csv(path, mode='a' if append else 'w', header=not append,
+                                         index=False)
+        return path
+
+    return write
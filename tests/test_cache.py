@@ -0,0 +1,70 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from coffee_core import cache
+from coffee_core.loader import load_sales
+
+pytest.importorskip('pyarrow')
+
+ROWS = [
+    ('01-03-2023', '08:00:00', 2, 'Astoria', 'Coffee', 'Latte Rg'),
+    ('01-03-2023', '09:30:00', 1, "Hell's Kitchen", 'Tea', 'Earl Grey Rg'),
+    ('02/03/2023', '10:15:00', 3, 'Lower Manhattan', 'Bakery', 'Scone Sm'),
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path, write_sales):
+    path = write_sales(str(tmp_path / 'sales.csv'), ROWS)
+    load_sales(path)  # writes the cache entry
+    return path
+
+
+def shift_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+def test_hit_returns_the_prepared_frame(csv_path):
+    cached = cache.read_cache(csv_path)
+
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached, load_sales(csv_path, use_cache=False))
+
+
+def test_size_change_is_a_miss(csv_path):
+    with open(csv_path, 'a') as fh:
+        fh.write('4,03-03-2023,11:00:00,1,Astoria,Coffee,Latte Rg,2.5\n')
+
+    assert cache.read_cache(csv_path) is None
+    assert len(load_sales(csv_path)) == 4
+
+
+def test_touched_file_with_the_same_content_is_a_hit(csv_path):
+    shift_mtime(csv_path)
+
+    assert cache.read_cache(csv_path) is not None
+    # The stored fingerprint follows the new mtime, so the next check skips the hash
+    _, meta_path = cache.cache_paths(csv_path)
+    with open(meta_path) as fh:
+        assert json.load(fh)['mtime_ns'] == os.stat(csv_path).st_mtime_ns
+
+
+def test_same_size_rewrite_is_a_miss_on_the_hash(csv_path):
+    with open(csv_path) as fh:
+        text = fh.read()
+    with open(csv_path, 'w') as fh:
+        fh.write(text.replace('Latte Rg', 'Mocha Rg'))
+    shift_mtime(csv_path)
+
+    assert cache.read_cache(csv_path) is None
+    assert load_sales(csv_path)['product_detail'].iloc[0] == 'Mocha Rg'
+
+
+def test_schema_version_change_is_a_miss(csv_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_SCHEMA_VERSION', cache.CACHE_SCHEMA_VERSION + 1)
+
+    assert cache.read_cache(csv_path) is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffee_core.dates import detect_formats, parse_dates
+
+
+def reference(values):
+    # Every row inferred on its own, as the loader used to parse them
+    return pd.to_datetime(values, format='mixed', dayfirst=True)
+
+
+def test_mixed_formats_parse_like_the_per_row_parser():
+    values = pd.Series(['03-06-2023', '03/06/2023', '13-01-2023', '03-06-2023', '28/02/2023',
+                        '2023-04-05', None], name='transaction_date')
+
+    parsed, failed = parse_dates(values)
+
+    pd.testing.assert_series_equal(parsed, reference(values))
+    assert parsed.iloc[0] == pd.Timestamp('2023-06-03')
+    assert len(failed) == 0
+
+
+def test_formats_are_detected_in_order():
+    assert detect_formats(['03/06/2023', '03-06-2023', '13-01-2023']) == ['%d-%m-%Y', '%d/%m/%Y']
+    assert detect_formats(['03-06-2023']) == ['%d-%m-%Y']
+
+
+def test_strings_past_the_sample_use_every_format():
+    # The sample only holds dashes; the slashed dates come later
+    dashes = [f'{day:02d}-01-2023' for day in range(1, 29)]
+    slashes = [f'{day:02d}/02/2023' for day in range(1, 29)]
+    values = pd.Series(dashes + slashes)
+
+    parsed, failed = parse_dates(values, sample_size=10)
+
+    pd.testing.assert_series_equal(parsed, reference(values))
+    assert len(failed) == 0
+
+
+def test_unparseable_dates_are_reported():
+    values = pd.Series(['01-03-2023', 'not a date', '02-03-2023', 'not a date', np.nan])
+
+    with pytest.raises(ValueError, match=r"2 rows have unparseable dates .* 1: 'not a date'"):
+        parse_dates(values)
+
+    parsed, failed = parse_dates(values, errors='coerce')
+    assert failed.tolist() == [1, 3]
+    assert parsed.isna().tolist() == [False, True, False, True, True]
+
+
+def test_datetime_column_is_returned_as_is():
+    values = pd.Series(pd.to_datetime(['2023-03-01', '2023-03-02']))
+
+    parsed, failed = parse_dates(values)
+
+    assert parsed is values
+    assert len(failed) == 0
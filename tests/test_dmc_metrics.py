@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'DMC-Dashboard'))
+
+from utils.data_loader import build_kpi_store, calculate_metrics, filter_sales  # noqa: E402
+
+
+@pytest.fixture
+def sales(make_sales):
+    # 5 days with sales: 6, 7, 8, 9 and 10 transactions of one item at 2.5
+    rows = []
+    for day, count in zip(range(1, 6), range(6, 11)):
+        rows += [(f'0{day}-03-2023', '09:00:00', 1, 'Astoria', 'Tea', 'Earl Grey Rg')] * count
+    return make_sales(rows)
+
+
+def test_growth_compares_the_later_half_of_the_days(sales):
+    metrics = calculate_metrics(sales)
+
+    # Days 4-5 against days 1-2, day 3 in neither half
+    assert metrics['transaction_growth'] == pytest.approx((19 - 13) / 13 * 100)
+    assert metrics['revenue_growth'] == pytest.approx((19 - 13) / 13 * 100)
+
+
+def test_store_and_rows_give_the_same_metrics(sales):
+    store = build_kpi_store(sales)
+
+    assert calculate_metrics(store) == pytest.approx(calculate_metrics(sales))
+    assert (calculate_metrics(filter_sales(store, months=['March'], stores=['Astoria']))
+            == pytest.approx(calculate_metrics(filter_sales(sales, months=['March'], stores=['Astoria']))))
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from coffee_core.hll import DEFAULT_ERROR, HyperLogLog, precision_for
+from coffee_core.kpi import KPIStore
+
+# Relative standard error, as set with KPI_DISTINCT_ERROR
+ERROR = DEFAULT_ERROR
+N_GROUPS = 8
+
+
+def draw(rng, n):
+    keys = rng.integers(0, 1 << 62, size=n)
+    # Every key lands in one or two groups, as transactions in one or two categories
+    groups = rng.integers(0, N_GROUPS, size=n)
+    repeated = rng.random(n) < 0.3
+    return (np.concatenate([keys, keys[repeated]]),
+            np.concatenate([groups, (groups[repeated] + 1) % N_GROUPS]))
+
+
+@pytest.fixture
+def values():
+    return draw(np.random.default_rng(2023), 100_000)
+
+
+def distinct(keys, groups, selected):
+    return len(np.unique(keys[np.isin(groups, selected)]))
+
+
+def test_precision_meets_the_error():
+    for error in (0.1, 0.05, ERROR, 0.01):
+        assert 1.04 / np.sqrt(1 << precision_for(error)) <= error
+    assert 1.04 / np.sqrt(1 << (precision_for(ERROR) - 1)) > ERROR
+
+
+@pytest.mark.parametrize('n', [500, 2_000, 8_000, 40_000])
+def test_estimates_stay_within_the_error(n):
+    # The error is a standard error: over repeated draws the relative
+    # errors have an RMS within it, and no estimate is 3 of them off
+    rng = np.random.default_rng(n)
+    selected = np.isin(np.arange(N_GROUPS), [0, 1, 5])
+    labels = np.array([0, 0, 1, 1, 1, -1, 2, 2])
+    errors = []
+    for _ in range(10):
+        keys, groups = draw(rng, n)
+        sketch = HyperLogLog.build(keys, groups, N_GROUPS, precision_for(ERROR))
+        errors.append(sketch.count() / len(np.unique(keys)) - 1)
+        errors.append(sketch.count(selected) / distinct(keys, groups, [0, 1, 5]) - 1)
+        for label, estimate in enumerate(sketch.count_by(labels, 3)):
+            errors.append(estimate / distinct(keys, groups, np.flatnonzero(labels == label)) - 1)
+
+    errors = np.array(errors)
+    assert np.sqrt(np.mean(errors ** 2)) <= ERROR
+    assert np.abs(errors).max() <= 3 * ERROR
+
+
+def test_empty_selection_counts_nothing(values):
+    keys, groups = values
+    sketch = HyperLogLog.build(keys, groups, N_GROUPS + 1, precision_for(ERROR))
+
+    assert sketch.count(np.arange(N_GROUPS + 1) == N_GROUPS) == 0
+    assert sketch.count(np.zeros(N_GROUPS + 1, dtype=bool)) == 0
+    assert sketch.count_by(np.array([0] * N_GROUPS + [1]), 3)[1:].tolist() == [0, 0]
+
+
+def test_extended_equals_a_single_build(values):
+    keys, groups = values
+    half = len(keys) // 2
+    precision = precision_for(ERROR)
+
+    sketch = HyperLogLog.build(keys[:half], groups[:half] % 4, 4, precision)
+    sketch = sketch.extended(keys[half:], groups[half:], N_GROUPS)
+
+    np.testing.assert_array_equal(
+        sketch.registers,
+        HyperLogLog.build(np.concatenate([keys[:half], keys[half:]]),
+                          np.concatenate([groups[:half] % 4, groups[half:]]),
+                          N_GROUPS, precision).registers,
+    )
+
+
+def test_kpi_store_sketches_shared_transactions(make_sales):
+    # 3000 transactions with a line in two categories each
+    rows = []
+    for _ in range(3000):
+        rows += [('01-03-2023', '08:00:00', 1, 'Astoria', 'Coffee', 'Latte Rg'),
+                 ('01-03-2023', '08:00:00', 1, 'Astoria', 'Tea', 'Earl Grey Rg')]
+    df = make_sales(rows)
+    df['transaction_id'] = np.arange(len(df)) // 2
+
+    exact = KPIStore.from_transactions(df)
+    store = KPIStore.from_transactions(df, error=ERROR)
+
+    assert store.approximate == ['distinct_transactions']
+    assert exact.totals()['distinct_transactions'] == 3000
+    assert store.totals()['distinct_transactions'] == pytest.approx(3000, rel=3 * ERROR)
+    assert store.totals()['distinct_products'] == 2
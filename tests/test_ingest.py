@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffee_core.cube import SalesCube
+from coffee_core.dataset import SalesDataset
+from coffee_core.filters import filter_frame
+from coffee_core.kpi import KPIStore
+from coffee_core.loader import load_sales
+from coffee_core.periods import PeriodRollup
+
+BASE = [
+    ('30-01-2023', '08:00:00', 2, 'Astoria', 'Coffee', 'Latte Rg'),
+    ('30-01-2023', '09:00:00', 1, "Hell's Kitchen", 'Tea', 'Earl Grey Rg'),
+    ('14/02/2023', '10:00:00', 3, 'Astoria', 'Bakery', 'Scone Sm'),
+    ('01-03-2023', '07:30:00', 1, 'Lower Manhattan', 'Coffee', 'Latte Rg'),
+]
+# Later rows: existing groups, a new product and a new month
+TAIL = [
+    ('01-03-2023', '11:00:00', 2, 'Lower Manhattan', 'Coffee', 'Latte Rg'),
+    ('02-03-2023', '12:00:00', 100, 'Astoria', 'Tea', 'Chai Lg'),
+    ('03/04/2023', '08:45:00', 1, "Hell's Kitchen", 'Bakery', 'Scone Sm'),
+]
+
+FILTERS = [
+    ({}, None),
+    ({'store_location': 'Astoria'}, None),
+    ({'Month Name': ['March', 'April'], 'product_category': ['Coffee', 'Bakery']}, None),
+    ({'product_detail': ['Latte Rg', 'Chai Lg']},
+     {'transaction_date': (pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-01'))}),
+    ({'store_location': []}, {'transaction_date': (pd.Timestamp('2023-03-02'), None)}),
+]
+# The KPI store does not keep products
+KPI_FILTERS = [(filters, ranges) for filters, ranges in FILTERS if 'product_detail' not in filters]
+
+
+@pytest.fixture
+def dataset(tmp_path, write_sales):
+    path = write_sales(str(tmp_path / 'sales.csv'), BASE)
+    dataset = SalesDataset(path, check_interval=0, use_cache=False, incremental=True)
+    dataset.snapshot(cube=True, kpis=True, periods=True)
+    return dataset
+
+
+def test_appended_rows_equal_a_full_rebuild(dataset, write_sales):
+    write_sales(dataset.filepath, TAIL, first_id=len(BASE) + 1, append=True)
+
+    df, cube, kpis, periods, _ = dataset.snapshot(cube=True, kpis=True, periods=True)
+
+    assert dataset.last_refresh['mode'] == 'append'
+    assert dataset.last_refresh['rows'] == len(TAIL)
+    full = load_sales(dataset.filepath, use_cache=False)
+    pd.testing.assert_frame_equal(df, full)
+    pd.testing.assert_frame_equal(cube.facts, SalesCube.from_transactions(full).facts,
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(periods.facts, PeriodRollup.from_transactions(full).facts,
+                                  check_dtype=False)
+    rebuilt = KPIStore.from_transactions(full)
+    for filters, ranges in KPI_FILTERS:
+        assert kpis.filter(filters, ranges).totals() == rebuilt.filter(filters, ranges).totals()
+
+
+def test_extended_index_filters_like_the_masks(dataset, write_sales):
+    write_sales(dataset.filepath, TAIL, first_id=len(BASE) + 1, append=True)
+
+    df = dataset.frame
+
+    assert dataset.last_refresh['mode'] == 'append'
+    for filters, ranges in FILTERS:
+        pd.testing.assert_frame_equal(filter_frame(df, filters, ranges, index=dataset.index),
+                                      filter_frame(df, filters, ranges))
+
+
+def test_late_rows_are_sorted_in(dataset, write_sales):
+    late = [('14-02-2023', '09:00:00', 5, 'Astoria', 'Tea', 'Chai Lg')]
+    write_sales(dataset.filepath, late, first_id=len(BASE) + 1, append=True)
+
+    df = dataset.frame
+
+    assert dataset.last_refresh['mode'] == 'append'
+    assert df['transaction_datetime'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(df, load_sales(dataset.filepath, use_cache=False))
+    for filters, ranges in FILTERS:
+        pd.testing.assert_frame_equal(filter_frame(df, filters, ranges, index=dataset.index),
+                                      filter_frame(df, filters, ranges))
+
+
+def test_partial_line_waits_for_its_end(dataset):
+    version = dataset.version
+    with open(dataset.filepath, 'a') as fh:
+        fh.write('5,01-03-2023,11:00:00,2,Lower')
+
+    assert not dataset.refresh()
+    assert dataset.version == version
+
+    with open(dataset.filepath, 'a') as fh:
+        fh.write(' Manhattan,Coffee,Latte Rg,2.5\n')
+
+    assert dataset.refresh()
+    assert dataset.last_refresh['mode'] == 'append'
+    assert dataset.last_refresh['rows'] == 1
+    assert dataset.frame['store_location'].iloc[-1] == 'Lower Manhattan'
+
+
+def rewrite_in_place(path, old, new):
+    # Same file (inode), so only the content tells the rewrite from an append
+    with open(path, 'r+b') as fh:
+        data = fh.read()
+        fh.seek(0)
+        fh.write(data.replace(old, new, 1))
+
+
+@pytest.mark.parametrize('old, new', [
+    (b',transaction_qty,', b', transaction_qty,'),  # header, same columns once stripped
+    (b'Earl Grey Rg', b'Earl Grey Lg'),  # a row before the offset
+])
+def test_rewritten_file_is_reloaded(dataset, write_sales, old, new):
+    rewrite_in_place(dataset.filepath, old, new)
+    write_sales(dataset.filepath, TAIL, first_id=len(BASE) + 1, append=True)
+
+    df, _, kpis, _, _ = dataset.snapshot(kpis=True)
+
+    assert dataset.last_refresh['mode'] == 'load'
+    assert len(df) == len(BASE) + len(TAIL)
+    pd.testing.assert_frame_equal(df, load_sales(dataset.filepath, use_cache=False))
+    assert kpis.totals()['transaction_qty'] == np.sum(df['transaction_qty'])
@@ -0,0 +1,37 @@
+import numpy as np
+
+from coffee_core.kpi import KPIStore
+
+
+def test_extended_sums_past_the_rows_dtype(make_sales):
+    # 10 x 10 items fits in int8, the 5 x 10 appended push the group to 150
+    base = make_sales([('01-03-2023', '08:00:00', 10, 'Astoria', 'Tea', 'Earl Grey Rg')] * 10)
+    tail = make_sales([('01-03-2023', '09:00:00', 10, 'Astoria', 'Tea', 'Earl Grey Rg')] * 5,
+                      first_id=11)
+    assert base['transaction_qty'].dtype == np.int8
+
+    store = KPIStore.from_transactions(base).extended(tail)
+
+    totals = store.totals()
+    assert totals['transaction_qty'] == 150
+    assert totals['Total_Bill'] == 375
+    assert totals['transactions'] == 15
+    assert totals['distinct_transactions'] == 15
+    assert store.groups['transaction_qty'].tolist() == [150]
+
+
+def test_extended_matches_a_full_build(make_sales):
+    rows = [
+        ('01-03-2023', '08:00:00', 90, 'Astoria', 'Tea', 'Earl Grey Rg'),
+        ('01-03-2023', '08:30:00', 2, 'Lower Manhattan', 'Coffee', 'Latte Rg'),
+        ('02-03-2023', '10:00:00', 3, 'Astoria', 'Bakery', 'Scone Sm'),
+        ('02-03-2023', '11:00:00', 60, 'Astoria', 'Tea', 'Earl Grey Rg'),
+        ('01-03-2023', '12:00:00', 80, 'Astoria', 'Tea', 'Chai Lg'),
+    ]
+    full = KPIStore.from_transactions(make_sales(rows))
+    store = KPIStore.from_transactions(make_sales(rows[:3])).extended(make_sales(rows[3:], first_id=4))
+
+    for name, value in full.totals().items():
+        assert store.totals()[name] == value, name
+    march_1 = {'transaction_date': np.datetime64('2023-03-01')}
+    assert store.filter(march_1).totals()['transaction_qty'] == 172
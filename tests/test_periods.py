@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from coffee_core.periods import PeriodRollup
+
+
+@pytest.fixture
+def sales(make_sales):
+    # January to June 2023: month m sells m Latte in Astoria and 10 * m Earl Grey
+    # in the other two stores; no Bakery before April
+    rows = []
+    for month in range(1, 7):
+        date = f'15-{month:02d}-2023'
+        rows += [(date, '08:00:00', month, 'Astoria', 'Coffee', 'Latte Rg'),
+                 (date, '09:00:00', 10 * month, "Hell's Kitchen", 'Tea', 'Earl Grey Rg'),
+                 (date, '10:00:00', 10 * month, 'Lower Manhattan', 'Tea', 'Earl Grey Rg')]
+        if month >= 4:
+            rows.append((date, '11:00:00', 1, 'Astoria', 'Bakery', 'Scone Sm'))
+    return make_sales(rows)
+
+
+def reference(df, months, previous, by='product_category'):
+    # Direct group-by of the rows of both windows
+    def sums(names):
+        return df[df['Month Name'].isin(names)].groupby(by, observed=True)['transaction_qty'].sum()
+
+    return pd.DataFrame({'current': sums(months), 'previous': sums(previous)}).fillna(0)
+
+
+def test_quarter_against_the_previous_quarter(sales):
+    rollup = PeriodRollup.from_transactions(sales)
+
+    result = rollup.compare('June', months=3).set_index('product_category')
+
+    expected = reference(sales, ['April', 'May', 'June'], ['January', 'February', 'March'])
+    assert sorted(result.index) == sorted(expected.index)
+    for category, row in expected.iterrows():
+        assert result.loc[category, 'transaction_qty'] == row['current']
+        assert result.loc[category, 'transaction_qty_previous'] == row['previous']
+        assert result.loc[category, 'transaction_qty_delta'] == row['current'] - row['previous']
+    assert result.loc['Bakery', 'transaction_qty_previous'] == 0
+
+
+def test_window_by_store_with_filters(sales):
+    rollup = PeriodRollup.from_transactions(sales)
+
+    result = rollup.compare('May', months=2, by='store_location',
+                            filters={'product_category': ['Tea']}).set_index('store_location')
+
+    tea = sales[sales['product_category'] == 'Tea']
+    expected = reference(tea, ['April', 'May'], ['February', 'March'], by='store_location')
+    assert list(result.index) == ["Hell's Kitchen", 'Lower Manhattan']
+    for store, row in expected.iterrows():
+        assert result.loc[store, 'transaction_qty'] == row['current']
+        assert result.loc[store, 'transaction_qty_previous'] == row['previous']
+        assert result.loc[store, 'Total_Bill_delta'] == (row['current'] - row['previous']) * 2.5
+
+
+def test_start_of_the_year_compares_the_months_it_has(sales):
+    rollup = PeriodRollup.from_transactions(sales)
+
+    # February-March against December-January: only January has sales
+    result = rollup.compare('March', months=2).set_index('product_category')
+
+    expected = reference(sales, ['February', 'March'], ['January'])
+    for category, row in expected.iterrows():
+        assert result.loc[category, 'transaction_qty'] == row['current']
+        assert result.loc[category, 'transaction_qty_previous'] == row['previous']
+
+
+@pytest.mark.parametrize('month, months', [('January', 1), ('February', 2), ('March', 3)])
+def test_start_of_the_year_without_a_previous_window_is_empty(sales, month, months):
+    rollup = PeriodRollup.from_transactions(sales)
+
+    result = rollup.compare(month, months=months)
+
+    assert result.empty
+    assert 'transaction_qty_previous' in result.columns
+
+
+def test_window_must_hold_a_month(sales):
+    rollup = PeriodRollup.from_transactions(sales)
+
+    with pytest.raises(ValueError, match='months must be at least 1'):
+        rollup.compare('June', months=0)
@@ -0,0 +1,47 @@
+import base64
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+
+from coffee_core.serialize import encode_typed_arrays, figure_to_json
+
+
+def _decode(spec):
+    return np.frombuffer(base64.b64decode(spec['bdata']), dtype='<' + spec['dtype'])
+
+
+def test_only_data_arrays_become_typed_arrays():
+    n = 2000
+    x = np.random.default_rng(0).normal(size=n)
+    fig = go.Figure(go.Scatter(
+        x=x,
+        y=np.arange(n),
+        customdata=np.arange(n) * 1.5,
+        text=np.arange(n),
+        hovertext=np.arange(n),
+        ids=[str(i) for i in range(n)],
+        marker=dict(size=np.full(n, 6), color=np.linspace(0, 1, n)),
+    ))
+
+    trace = encode_typed_arrays(fig, min_length=1000)['data'][0]
+
+    np.testing.assert_array_equal(_decode(trace['x']), x)
+    np.testing.assert_array_equal(_decode(trace['y']), np.arange(n))
+    np.testing.assert_array_equal(_decode(trace['marker']['size']), np.full(n, 6))
+    original = fig.to_plotly_json()['data'][0]
+    for key in ('customdata', 'text', 'hovertext', 'ids'):
+        np.testing.assert_array_equal(trace[key], original[key])
+    np.testing.assert_array_equal(trace['marker']['color'], original['marker']['color'])
+
+
+def test_non_data_arrays_round_trip_through_json():
+    n = 1500
+    fig = go.Figure(go.Bar(x=np.arange(n), y=np.ones(n) * 2.5,
+                           customdata=np.arange(n) * 0.5, text=np.arange(n)))
+
+    trace = json.loads(figure_to_json(fig, engine='json', typed_arrays=1000))['data'][0]
+
+    assert 'bdata' in trace['x']
+    assert trace['customdata'] == (np.arange(n) * 0.5).tolist()
+    assert trace['text'] == list(range(n))
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from coffee_core.cube import SalesCube
+from coffee_core.kpi import KPIStore
+from coffee_core.loader import iter_prepared_chunks, read_sales
+from coffee_core.stream import fold_chunks
+
+# Out of order across chunks, a store and a product first seen in a later
+# chunk, and quantities that only outgrow int8 there
+ROWS = [
+    ('02-03-2023', '08:00:00', 2, 'Astoria', 'Coffee', 'Latte Rg'),
+    ('01-03-2023', '09:00:00', 1, "Hell's Kitchen", 'Tea', 'Earl Grey Rg'),
+    ('01/03/2023', '09:00:00', 3, 'Astoria', 'Bakery', 'Scone Sm'),
+    ('03-03-2023', '10:00:00', 1, 'Astoria', 'Coffee', 'Latte Rg'),
+    ('01-03-2023', '07:00:00', 300, 'Lower Manhattan', 'Tea', 'Chai Lg'),
+    ('02/03/2023', '12:00:00', 1, 'Lower Manhattan', 'Drinking Chocolate', 'Dark Chocolate Lg'),
+    ('01-04-2023', '08:30:00', 2, "Hell's Kitchen", 'Coffee', 'Latte Rg'),
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path, write_sales):
+    return write_sales(str(tmp_path / 'sales.csv'), ROWS)
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 3, len(ROWS)])
+def test_chunked_read_equals_a_full_read(csv_path, chunksize):
+    pd.testing.assert_frame_equal(read_sales(csv_path, chunksize=chunksize), read_sales(csv_path))
+
+
+def test_folded_chunks_equal_aggregates_of_the_full_frame(csv_path):
+    full = read_sales(csv_path)
+
+    built = fold_chunks(iter_prepared_chunks(csv_path, 3), {'cube': SalesCube, 'kpis': KPIStore})
+
+    pd.testing.assert_frame_equal(built['cube'].facts, SalesCube.from_transactions(full).facts,
+                                  check_dtype=False)
+    assert built['kpis'].totals() == KPIStore.from_transactions(full).totals()